@@ -0,0 +1,76 @@
+import sys
+
+import numpy as np
+
+# Внутренняя "бесконечность": сумма двух таких значений ещё помещается в int64,
+# поэтому проверки на sys.maxsize из исходного алгоритма не нужны.
+INF = np.iinfo(np.int64).max // 2
+
+# Сколько байт временных массивов допускаем на один блок строк (порядок размера L2-кэша)
+BLOCK_BYTES = 1 << 18
+
+
+def weight_matrix(size, edges):
+    """
+    Строит матрицу расстояний для алгоритма Флойда.
+    :param size: количество вершин
+    :param edges: тройка массивов (rows, cols, weights) рёбер верхнего треугольника
+    :return: матрица int64, где отсутствующие рёбра равны INF, а диагональ нулевая
+    """
+    rows, cols, weights = edges
+    dist = np.full((size, size), INF, dtype=np.int64)
+    dist[rows, cols] = weights
+    np.fill_diagonal(dist, 0)
+    return dist
+
+
+def floyd_warshall(dist, block_rows=None):
+    """
+    Алгоритм Флойда на NumPy. Цикл по k выполняется целыми матрицами через minimum.
+    Порядок релаксаций и правило строгого сравнения совпадают с исходной
+    реализацией, поэтому совпадает и таблица next_node.
+    :param dist: квадратная матрица int64 (см. weight_matrix), изменяется на месте
+    :param block_rows: если задано, строки обрабатываются блоками такого размера,
+                       чтобы временные массивы помещались в кэш
+    :return: (dist, next_node), где отсутствие следующей вершины обозначено -1
+    """
+    size = dist.shape[0]
+    next_node = np.where(dist < INF, np.arange(size, dtype=np.int64), -1)
+    np.fill_diagonal(next_node, -1)
+
+    if block_rows is None or block_rows >= size:
+        for k in range(size):
+            _relax(dist, next_node, k, 0, size)
+    else:
+        for k in range(size):
+            for lo in range(0, size, block_rows):
+                _relax(dist, next_node, k, lo, min(lo + block_rows, size))
+
+    return dist, next_node
+
+
+def tiled_block_rows(size):
+    """Размер блока строк, при котором временные массивы занимают около BLOCK_BYTES."""
+    return max(1, BLOCK_BYTES // (8 * max(size, 1)))
+
+
+def _relax(dist, next_node, k, lo, hi):
+    """Релаксация строк lo..hi через вершину k."""
+    column = dist[lo:hi, k:k + 1]
+    candidate = column + dist[k]
+    improved = candidate < dist[lo:hi]
+    if improved.any():
+        np.minimum(dist[lo:hi], candidate, out=dist[lo:hi])
+        rows = next_node[lo:hi]
+        np.copyto(rows, next_node[lo:hi, k:k + 1], where=improved)
+
+
+def to_lists(dist, next_node):
+    """
+    Переводит результат в формат исходной реализации:
+    списки списков, sys.maxsize вместо отсутствующего пути и None вместо -1.
+    """
+    dist_list = np.where(dist >= INF, sys.maxsize, dist).tolist()
+    next_obj = next_node.astype(object)
+    next_obj[next_node < 0] = None
+    return dist_list, next_obj.tolist()
@@ -0,0 +1,403 @@
+import sys
+from array import array
+
+import numpy as np
+
+from algorithm.chromosome import Chromosome
+from algorithm.selection import smallest_order
+from algorithm.visited import FINGERPRINT_LENGTH, fingerprint_powers
+
+# Множитель длины пути в отпечатке как int64: хеши буфера хранятся в int64 (те же 64 бита)
+_LENGTH = np.array(FINGERPRINT_LENGTH).view(np.int64)[()]
+# Младшие 52 бита (мантисса) числа из [1, 2)
+_MANTISSA = np.int64((1 << 52) - 1)
+
+
+def _random_integers(rng, floats, out, high):
+    """
+    Случайные целые 0..high-1 в out без новых массивов: числа rng.random из [0, 1) сдвигаются
+    в [1, 2), где 52 бита мантиссы равномерны, и берутся по модулю high (смещение от модуля
+    не больше high / 2^52). Преобразование float в int через numpy выделяло бы буфер приведения.
+    :param floats: временный массив float64 формы out
+    """
+    rng.random(out=floats)
+    floats += 1.0
+    np.bitwise_and(floats.view(np.int64), _MANTISSA, out=out)
+    np.remainder(out, high, out=out)
+
+
+class PopulationBuffers:
+    """
+    Популяция с заранее выделенными двойными буферами для шага поколения без копий путей.
+    Пул - матрица путей int64 (строка - путь, дополненный нулями до width), длины, фитнес
+    и 64-битные хеши путей (отпечатки visited.fingerprints); строки 0..count-1 - родители, за ними пишутся потомки.
+    Кроссовер и мутация меняют строки потомков на месте, а отбор уникальных лучших
+    переносит выживших в другой пул, после чего пулы меняются местами. Временные массивы,
+    в том числе ключи и индексы отбора, тоже выделены заранее, поэтому шаг не создаёт
+    ни хромосом, ни копий путей, ни массивов размером с популяцию.
+    Пути с одинаковыми старшими битами хеша считаются одинаковыми: младшие bits битов ключа
+    отбора занимает номер строки (совпадение разных путей маловероятно, около 2^(bits-64) на пару).
+    """
+
+    def __init__(self, network, population_size, offspring_size, width):
+        """
+        :param population_size: наибольшее число родителей
+        :param offspring_size: наибольшее число потомков за поколение (чётное)
+        :param width: наибольшая длина пути (при загрузке более длинных путей буферы растут)
+        """
+        self.network = network
+        self.population_size = population_size
+        self.offspring_size = offspring_size
+        self.count = 0  # Число родителей в текущем пуле
+        self.ordered = False  # Родители упорядочены по фитнесу (после survive)
+        self.children = 0  # Число потомков последнего кроссовера (строки count..count+children-1)
+        self._allocate(max(width, 2))
+
+    def _allocate(self, width):
+        rows = self.population_size + self.offspring_size
+        half = self.offspring_size // 2
+        self.width = width
+        self._pools = [(np.zeros((rows, width), dtype=np.int64), np.zeros(rows, dtype=np.int64),
+                        np.zeros(rows, dtype=np.int64), np.zeros(rows, dtype=np.int64)) for _ in range(2)]
+        self._current = 0
+        powers = fingerprint_powers(width)
+        self._powers = powers.view(np.int64)
+        # Суммы BASE^0 .. BASE^(L - 1): вклад единиц из (v + 1) у пути длины L (заполнение нулями не входит)
+        self._power_sums = np.cumsum(powers).view(np.int64)
+        # Номера столбцов и границы по строкам в виде полных матриц: сравнение с границей-столбцом
+        # через трансляцию заставило бы numpy выделять буфер итерации
+        self._columns = np.tile(np.arange(width, dtype=np.int64), (self.offspring_size, 1))
+        self._bounds = np.zeros((self.offspring_size, width), dtype=np.int64)
+        # Временные массивы шага
+        self._parents = np.zeros(2 * half, dtype=np.int64)  # Строки первых, затем вторых родителей
+        self._lines = np.zeros(half, dtype=np.int64)
+        self._line_zero = np.zeros(half, dtype=bool)
+        self._line_floats = np.zeros(half, dtype=np.float64)
+        self._line_limits = np.zeros(half, dtype=np.int64)
+        self._old = np.zeros((self.offspring_size, width), dtype=np.int64)
+        self._old_fitness = np.zeros(self.offspring_size, dtype=np.int64)
+        self._floats = np.zeros((self.offspring_size, width), dtype=np.float64)
+        self._values = np.zeros((self.offspring_size, width), dtype=np.int64)
+        self._mask = np.zeros((self.offspring_size, width), dtype=bool)
+        self._inner = np.zeros((self.offspring_size, width), dtype=bool)
+        self._edges = np.zeros((self.offspring_size, width - 1), dtype=bool)
+        self._lo = np.zeros((self.offspring_size, width - 1), dtype=np.int64)
+        self._hi = np.zeros((self.offspring_size, width - 1), dtype=np.int64)
+        self._weights = np.zeros((self.offspring_size, width - 1), dtype=np.int64)
+        self._last = np.zeros((self.offspring_size, 1), dtype=np.int64)
+        self._lengths = np.zeros(self.offspring_size, dtype=np.int64)
+        self._invalid = np.zeros(self.offspring_size, dtype=bool)
+        self.dirty = np.zeros(self.offspring_size, dtype=bool)
+        # Отбор: ключ строки - (значение << bits) | номер строки, поэтому сортировка ключей на месте
+        # заменяет argsort, а номера строк выделяются из ключа маской
+        self.bits = max(rows - 1, 1).bit_length()
+        self._row_mask = np.int64((1 << self.bits) - 1)
+        self._fitness_cap = np.int64((1 << (63 - self.bits)) - 2)  # Неправильные пути; ключ < sys.maxsize
+        self._rows = np.arange(rows, dtype=np.int64)
+        self._row_starts = self._rows * width  # Начала строк в развёрнутой матрице путей
+        self._keys = np.zeros(rows, dtype=np.int64)
+        self._shifted = np.zeros(rows, dtype=np.int64)
+        self._survivors = np.zeros(rows, dtype=np.int64)
+        self._flags = np.zeros(rows, dtype=bool)
+        self._duplicate = np.zeros(rows, dtype=bool)
+        self._terms = np.zeros(rows, dtype=np.int64)
+        self._last_positions = np.zeros(rows, dtype=np.int64)
+
+    @property
+    def pool(self):
+        """Текущий пул: (пути, длины, фитнес, хеши)."""
+        return self._pools[self._current]
+
+    def load(self, chromosomes):
+        """Записывает хромосомы в строки родителей (фитнес берётся у хромосом)."""
+        if len(chromosomes) > self.population_size:
+            raise ValueError(f"Хромосом больше, чем мест в буфере: {len(chromosomes)} > {self.population_size}")
+        longest = max((len(chromosome.path) for chromosome in chromosomes), default=0)
+        if longest > self.width:
+            self._allocate(longest)
+        paths, lengths, fitness, hashes = self.pool
+        paths[:len(chromosomes)] = 0
+        for i, chromosome in enumerate(chromosomes):
+            paths[i, :len(chromosome.path)] = chromosome.path
+            lengths[i] = len(chromosome.path)
+            fitness[i] = chromosome.fitness
+        self.count = len(chromosomes)
+        self.children = 0
+        self.ordered = False
+        self._hash(0, self.count)
+
+    def _hash(self, first, stop):
+        paths, lengths, _, hashes = self.pool
+        out = hashes[first:stop]
+        # Отпечаток как visited.fingerprints: sum((v_i + 1) * BASE^i) + длина * LENGTH по модулю 2^64
+        terms = self._terms[:stop - first]
+        last = self._last_positions[:stop - first]
+        np.matmul(paths[first:stop], self._powers, out=out)
+        np.subtract(lengths[first:stop], 1, out=last)
+        np.take(self._power_sums, last, out=terms, mode="clip")
+        out += terms
+        np.multiply(lengths[first:stop], _LENGTH, out=terms)
+        out += terms
+
+    def path(self, row):
+        """Путь строки row текущего пула (array('i'))."""
+        paths, lengths, _, _ = self.pool
+        return array("i", paths[row, :lengths[row]].astype(np.int32).tobytes())
+
+    def chromosome(self, row, incremental=False):
+        """Хромосома со строкой row текущего пула и её фитнесом."""
+        chromosome = Chromosome(self.path(row), self.network, evaluate=False, incremental=incremental)
+        chromosome.fitness = int(self.pool[2][row])
+        return chromosome
+
+    def chromosomes(self, incremental=False):
+        """Родители в виде хромосом."""
+        return [self.chromosome(row, incremental) for row in range(self.count)]
+
+    def best(self):
+        """Строка лучшего родителя."""
+        return int(np.argmin(self.pool[2][:self.count]))
+
+    def fitness_values(self):
+        """Фитнес родителей (представление буфера)."""
+        return self.pool[2][:self.count]
+
+    def crossover(self, pairs, rng):
+        """
+        Кроссовер лучших родителей (пары 0-1, 2-3, ...), как Chromosome.crossover(random_or_not=True):
+        потомок 1 пары i пишется в строку count + i, потомок 2 - в строку count + пар + i.
+        :param pairs: сколько пар нужно (берётся не больше, чем позволяют родители)
+        :return: число пар
+        """
+        pairs = max(min(pairs, self.count // 2), 0)
+        self.children = 2 * pairs
+        if pairs == 0:
+            return 0
+        paths, lengths, _, _ = self.pool
+        start, end = self.network.start, self.network.end
+        first = self._parents[:pairs]
+        second = self._parents[pairs:2 * pairs]
+        if self.ordered:
+            # После отбора строки уже идут по фитнесу: лучшие - первые 2 * pairs строк
+            np.multiply(self._rows[:pairs], 2, out=first)
+            np.add(first, 1, out=second)
+        else:
+            order = smallest_order(self.pool[2][:self.count], 2 * pairs)
+            first[:] = order[0::2]
+            second[:] = order[1::2]
+        child1 = slice(self.count, self.count + pairs)
+        child2 = slice(self.count + pairs, self.count + 2 * pairs)
+        rows = slice(self.count, self.count + 2 * pairs)
+        # Потомки - копии родителей (через временный буфер: источник и цель - один пул),
+        # затем обмен промежуточных позиций line..m-1
+        copies = self._values[:2 * pairs]
+        np.take(paths, self._parents[:2 * pairs], axis=0, out=copies, mode="clip")
+        np.copyto(paths[rows], copies)
+        np.take(lengths, self._parents[:2 * pairs], out=self._lengths[:2 * pairs], mode="clip")
+        np.copyto(lengths[rows], self._lengths[:2 * pairs])
+
+        # Точка разбиения: случайная позиция 0..max_length-1 (max_length - длина более длинного
+        # промежуточного пути, не меньше 1), 0 заменяется на 2
+        lines = self._lines[:pairs]
+        limits = self._line_limits[:pairs]
+        np.maximum(lengths[child1], lengths[child2], out=limits)
+        limits -= 2
+        np.maximum(limits, 1, out=limits)
+        _random_integers(rng, self._line_floats[:pairs], lines, limits)
+        np.equal(lines, 0, out=self._line_zero[:pairs])
+        np.copyto(lines, 2, where=self._line_zero[:pairs])
+
+        # Обмениваемые позиции полного пути: line + 1 .. m (m - длина более короткого промежуточного пути)
+        swap = self._mask[:pairs]
+        inner = self._inner[:pairs]
+        limit = self._last[:pairs]
+        np.add(lines, 1, out=limit[:, 0])
+        np.greater_equal(self._columns[:pairs], self._bounds_of(limit), out=swap)
+        np.minimum(lengths[child1], lengths[child2], out=limit[:, 0])
+        limit -= 1
+        np.less(self._columns[:pairs], self._bounds_of(limit), out=inner)
+        swap &= inner
+        np.copyto(paths[child1], copies[pairs:], where=swap)
+        np.copyto(paths[child2], copies[:pairs], where=swap)
+        self._set_ends(rows, start, end)
+        return pairs
+
+    def _bounds_of(self, limit):
+        """Граница-столбец limit (n x 1), размноженная по столбцам."""
+        bounds = self._bounds[:len(limit)]
+        np.copyto(bounds, limit)
+        return bounds
+
+    def _set_ends(self, rows, start, end):
+        paths, lengths, _, _ = self.pool
+        block = paths[rows]
+        block[:, 0] = start
+        # Позиции концов в развёрнутой матрице: начало строки + длина - 1
+        last = self._last[:len(block), 0]
+        np.add(self._row_starts[rows], lengths[rows], out=last)
+        last -= 1
+        np.put(paths.reshape(-1), last, end)
+
+    def parent_rows(self, pairs):
+        """Строки родителей последнего кроссовера: (первые, вторые)."""
+        return self._parents[:pairs], self._parents[pairs:2 * pairs]
+
+    def line(self, pair):
+        """Точка разбиения пары pair последнего кроссовера."""
+        return int(self._lines[pair])
+
+    def save_offspring(self):
+        """Запоминает пути и фитнес потомков до мутации (для подписчиков на мутации)."""
+        paths, _, fitness, _ = self.pool
+        rows = slice(self.count, self.count + self.children)
+        np.copyto(self._old[:self.children], paths[rows])
+        np.copyto(self._old_fitness[:self.children], fitness[rows])
+
+    def old_path(self, i):
+        """Путь потомка i до мутации (см. save_offspring)."""
+        length = self.pool[1][self.count + i]
+        return array("i", self._old[i, :length].astype(np.int32).tobytes())
+
+    def old_fitness(self, i):
+        return int(self._old_fitness[i])
+
+    def mutate(self, mutation_probability, rng):
+        """
+        Мутация потомков на месте, как Chromosome.mutation: каждая промежуточная вершина
+        с вероятностью mutation_probability заменяется случайной вершиной от start + 1 до end - 1.
+        Потомки, путь которых изменился, отмечаются в dirty.
+        """
+        children = self.children
+        if children == 0:
+            return
+        paths, lengths, _, _ = self.pool
+        start, end = self.network.start, self.network.end
+        block = paths[self.count:self.count + children]
+        mask = self._mask[:children]
+        inner = self._inner[:children]
+        floats = self._floats[:children]
+        values = self._values[:children]
+        limit = self._last[:children]
+        np.subtract(lengths[self.count:self.count + children, None], 1, out=limit)
+        np.less(self._columns[:children], self._bounds_of(limit), out=inner)
+        inner[:, 0] = False
+        rng.random(out=floats)
+        np.less(floats, mutation_probability, out=mask)
+        mask &= inner
+        _random_integers(rng, floats, values, end - start - 1)
+        values += start + 1
+        # Изменились вершины, где маска стоит и новое значение отличается от старого
+        np.not_equal(values, block, out=inner)
+        inner &= mask
+        np.any(inner, axis=1, out=self.dirty[:children])
+        np.copyto(block, values, where=mask)
+
+    def evaluate(self):
+        """Фитнес потомков по тем же правилам, что evaluate_flat; пересчитывает и их хеши."""
+        children = self.children
+        if children == 0:
+            return
+        paths, lengths, fitness, _ = self.pool
+        rows = slice(self.count, self.count + children)
+        block = paths[rows]
+        edges = self._edges[:children]
+        limit = self._last[:children]
+        np.subtract(lengths[rows, None], 1, out=limit)
+        # Позиции за концом пути (ребро k - k+1 есть, только если k < длина - 1)
+        beyond = self._mask[:children]
+        np.greater_equal(self._columns[:children], self._bounds_of(limit), out=beyond)
+        lo = self._lo[:children]
+        hi = self._hi[:children]
+        weights = self._weights[:children]
+        # Концы рёбер копируются в отдельные массивы: ufunc над пересекающимися срезами одной
+        # матрицы выделял бы буфер
+        np.copyto(lo, block[:, :-1])
+        np.copyto(hi, block[:, 1:])
+        np.minimum(lo, hi, out=weights)
+        np.maximum(lo, hi, out=hi)
+        np.copyto(lo, weights)
+        if self.network.backend == "sparse":
+            weights[:] = self.network.graph.lookup(lo, hi)
+        else:
+            lo *= self.network.size
+            lo += hi
+            np.take(self.network.weight_array(), lo, out=weights, mode="clip")
+        np.copyto(weights, 0, where=beyond[:, :-1])
+        invalid = self._invalid[:children]
+        np.less(weights, 0, out=edges)
+        np.any(edges, axis=1, out=invalid)
+        # Концы потомков всегда start и end, поэтому неправильны только пути с отсутствующим ребром
+        np.sum(weights, axis=1, out=fitness[rows])
+        np.copyto(fitness[rows], sys.maxsize, where=invalid)
+        self._hash(self.count, self.count + children)
+
+    def survive(self, count):
+        """
+        Отбор count лучших уникальных путей среди родителей и потомков (как best_unique) в другой
+        пул; пулы меняются местами. Выжившие записываются по возрастанию фитнеса.
+        """
+        total = self.count + self.children
+        paths, lengths, fitness, hashes = self.pool
+        fitness_all = fitness[:total]
+        rows = self._rows[:total]
+        keys = self._keys[:total]
+        shifted = self._shifted[:total]
+        flags = self._flags[:total]
+        duplicate = self._duplicate[:total]
+        # Фитнес правильных путей должен уместиться в ключ; иначе - отбор с выделением массивов
+        np.greater_equal(fitness_all, self._fitness_cap, out=flags)
+        oversized = np.count_nonzero(flags)
+        np.equal(fitness_all, sys.maxsize, out=flags)
+        if oversized != np.count_nonzero(flags):
+            return self._survive_unpacked(count)
+
+        # Повторы: ключи (старшие биты хеша, строка) после сортировки стоят группами одинаковых
+        # хешей, первой в группе - строка с меньшим номером; остальные отмечаются в duplicate
+        np.bitwise_and(hashes[:total], ~self._row_mask, out=keys)
+        keys |= rows
+        keys.sort()
+        np.right_shift(keys, self.bits, out=shifted)
+        same = flags[:total - 1]
+        np.equal(shifted[1:], shifted[:-1], out=same)
+        np.bitwise_and(keys, self._row_mask, out=shifted)
+        duplicate.fill(False)
+        np.put(duplicate, shifted[1:], same)
+        unique = total - np.count_nonzero(duplicate)
+
+        # Ключи (фитнес, строка): сортировка даёт порядок устойчивой сортировки по фитнесу,
+        # повторы получают наибольший ключ и оказываются в конце
+        np.minimum(fitness_all, self._fitness_cap, out=keys)
+        keys <<= self.bits
+        keys |= rows
+        np.copyto(keys, sys.maxsize, where=duplicate)
+        keys.sort()
+        size = min(max(count, 0), unique)
+        survivors = self._survivors[:size]
+        np.bitwise_and(keys[:size], self._row_mask, out=survivors)
+        self._swap(survivors)
+
+    def _survive_unpacked(self, count):
+        """survive для фитнеса, не умещающегося в ключ: сортировки с новыми массивами индексов."""
+        total = self.count + self.children
+        fitness_all = self.pool[2][:total]
+        hashes_all = self.pool[3][:total]
+        # Одинаковые пути имеют одинаковый фитнес и хеш и после сортировки стоят рядом;
+        # сортировка устойчивая, поэтому первым в группе остаётся путь с меньшим индексом
+        order = np.lexsort((hashes_all, fitness_all))
+        keep = np.ones(total, dtype=bool)
+        sorted_fitness = fitness_all[order]
+        sorted_hashes = hashes_all[order]
+        keep[1:] = (sorted_fitness[1:] != sorted_fitness[:-1]) | (sorted_hashes[1:] != sorted_hashes[:-1])
+        kept = np.sort(order[keep])
+        self._swap(kept[smallest_order(fitness_all[kept], count)])
+
+    def _swap(self, survivors):
+        """Переносит строки survivors в другой пул и делает его текущим."""
+        other = self._pools[1 - self._current]
+        size = len(survivors)
+        for source, target in zip(self.pool, other):
+            np.take(source, survivors, axis=0, out=target[:size], mode="clip")
+        self._current = 1 - self._current
+        self.count = size
+        self.children = 0
+        self.ordered = True
@@ -0,0 +1,93 @@
+import threading
+from array import array
+from collections import OrderedDict
+
+
+class FitnessCache:
+    """
+    Ограниченный LRU-кэш фитнеса, ключ - путь в компактном виде (байты array('i')).
+    Хранятся только пути с правильными концами, поэтому значение зависит лишь от весов
+    графа, и кэш можно делить между несколькими запусками ГА на одной сети.
+    """
+
+    def __init__(self, maxsize=100000):
+        """
+        :param maxsize: максимальное количество путей в кэше
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize должен быть положительным")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path):
+        """Компактный хешируемый ключ пути."""
+        if type(path) is array and path.typecode == "i":
+            return path.tobytes()
+        return array("i", path).tobytes()
+
+    def get(self, path):
+        """Возвращает фитнес пути или None, если его нет в кэше."""
+        key = self.key(path)
+        with self._lock:
+            fitness = self._data.get(key)
+            if fitness is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return fitness
+
+    def put(self, path, fitness):
+        """Запоминает фитнес пути, вытесняя давно не использованные записи."""
+        key = self.key(path)
+        with self._lock:
+            self._data[key] = fitness
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Очищает кэш (например, после изменения весов графа). Счётчики сохраняются."""
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self):
+        """Содержимое кэша от давно использованных записей к недавним (для контрольной точки)."""
+        with self._lock:
+            return list(self._data.items())
+
+    def restore(self, items):
+        """Заменяет содержимое кэша записями snapshot (лишние давние записи отбрасываются)."""
+        with self._lock:
+            self._data = OrderedDict(items[-self.maxsize:])
+
+    def stats(self):
+        """Счётчики попаданий, промахов и вытеснений."""
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"FitnessCache(size={len(self._data)}, maxsize={self.maxsize})"
@@ -0,0 +1,63 @@
+import os
+import pickle
+import random
+
+from algorithm.events import EventLevel
+from algorithm.generation import Generation
+
+# Версия формата контрольной точки
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(path, generation, generation_number=0, extra=None):
+    """
+    Сохраняет полное состояние запуска: поколение (см. Generation.get_state), номер поколения,
+    состояние random, сеть и содержимое её кэша фитнеса. Файл заменяется атомарно, поэтому
+    прерванная запись не портит предыдущую контрольную точку.
+    :param extra: дополнительные данные (например, критерии остановки RunController)
+    """
+    network = generation.network
+    cache = network.fitness_cache
+    checkpoint = {
+        "version": CHECKPOINT_VERSION,
+        "generation_number": generation_number,
+        "random_state": random.getstate(),
+        # Сеть, загруженная из файла, сохраняется как путь к нему (см. Network.__getstate__)
+        "network": network,
+        "fitness_cache": cache.snapshot() if cache is not None else None,
+        "generation": generation.get_state(),
+        "extra": extra,
+    }
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path, network=None, verbosity=EventLevel.OFF, profiler=None):
+    """
+    Восстанавливает запуск из контрольной точки, включая состояние random: продолжение
+    эволюции совпадает с непрерванным запуском.
+    :param network: сеть, на которой продолжить (None - сохранённая в контрольной точке)
+    :param verbosity: уровень печати событий восстановленного поколения
+    :param profiler: профайлер для восстановленного поколения
+    :return: словарь с поколением (generation), номером поколения (generation_number) и extra
+    """
+    with open(path, "rb") as file:
+        checkpoint = pickle.load(file)
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"{path}: неподдерживаемая версия контрольной точки {checkpoint.get('version')}")
+    if network is None:
+        network = checkpoint["network"]
+    cache = network.fitness_cache
+    if cache is not None and checkpoint["fitness_cache"] is not None:
+        cache.restore(checkpoint["fitness_cache"])
+    generation = Generation.from_state(network, checkpoint["generation"], verbosity, profiler)
+    random.setstate(checkpoint["random_state"])
+    return {
+        "generation": generation,
+        "generation_number": checkpoint["generation_number"],
+        "extra": checkpoint["extra"],
+    }
@@ -1,16 +1,63 @@
 import random
 import sys
+from array import array
+from itertools import accumulate
+
+
+def as_path(path):
+    """Путь в компактном виде array('i') (без копирования, если он уже такой)."""
+    if type(path) is array and path.typecode == "i":
+        return path
+    return array("i", path)
+
 
 class Chromosome:
-    def __init__(self, path, network):
+    """
+    Хромосома - путь в сети и его фитнес.
+    Путь хранится как array('i'), у объекта нет __dict__. Сеть не хранится в каждой хромосоме:
+    Chromosome(path, network) создаёт экземпляр подкласса, привязанного к сети
+    (см. bound_class), и network - атрибут этого класса.
+    """
+    __slots__ = ("path", "fitness", "incremental", "_edges", "_prefix")
+    network = None
+
+    def __new__(cls, path, network, *args, **kwargs):
+        if cls.network is not network:
+            cls = network._chromosome_classes.get(cls) or cls.bound_class(network)
+        return object.__new__(cls)
+
+    @classmethod
+    def bound_class(cls, network):
+        """Подкласс хромосомы, привязанный к сети; создаётся один раз на сеть."""
+        if cls.network is not None:
+            cls = cls.__bases__[0]
+        classes = network._chromosome_classes
+        bound = classes.get(cls)
+        if bound is None:
+            bound = type(cls.__name__, (cls,), {"__slots__": (), "network": network,
+                                                "__module__": cls.__module__})
+            classes[cls] = bound
+        return bound
+
+    def __init__(self, path, network, evaluate=True, incremental=False):
         """
-        path: путь хромосомы (список вершин)
+        path: путь хромосомы (последовательность вершин, хранится как array('i'))
         network: объект сети
+        evaluate: если False, фитнес не считается (его выставит пакетная оценка)
+        incremental: если True, мутация и кроссовер пересчитывают фитнес по изменённым рёбрам,
+                     а не проходят весь путь заново
         """
-        self.path = path
-        self.network = network
+        self.path = as_path(path)
         self.fitness = None
-        self.calculate_fitness()
+        self.incremental = incremental
+        self._edges = None  # Веса рёбер пути (None - ребра нет), считаются по требованию
+        self._prefix = None  # Префиксные суммы весов и числа отсутствующих рёбер
+        if evaluate:
+            self.calculate_fitness()
+
+    def __reduce__(self):
+        # Привязанный к сети класс создаётся динамически, поэтому сохраняем базовый класс и сеть
+        return _restore, (self.path, self.network, self.fitness, self.incremental)
 
     def calculate_fitness(self):
         """
@@ -18,45 +65,213 @@ class Chromosome:
         Если путь неправильный (не совпадает с начальной/конечной точкой), присваиваем максимальный фитнес.
         Если путь существует и правильный, то считаем его длину.
         """
-        start = self.network.start
-        end = self.network.end
+        network = self.network
+        start = network.start
+        end = network.end
 
         if self.path[0] != start or self.path[-1] != end:
             self.fitness = sys.maxsize  # Если путь неправильный, ставим максимально возможный фитнес
             return
 
+        cache = network.fitness_cache
+        if cache is not None:
+            fitness = cache.get(self.path)
+            if fitness is None:
+                fitness = self.path_length()
+                cache.put(self.path, fitness)
+            self.fitness = fitness
+        else:
+            self.fitness = self.path_length()
+
+    def path_length(self):
+        """Сумма весов рёбер пути или sys.maxsize, если какого-то ребра нет."""
         total_path_length = 0
         for i in range(len(self.path) - 1):
-            if self.network.get_weight(self.path[i], self.path[i+1]) is None:
-                self.fitness = sys.maxsize
-                return
-            total_path_length += self.network.get_weight(self.path[i], self.path[i+1])
+            weight = self.network.get_weight(self.path[i], self.path[i+1])
+            if weight is None:
+                return sys.maxsize
+            total_path_length += weight
+
+        return total_path_length  # Чем меньше путь, тем лучше фитнес
+
+    def edge_weights(self):
+        """Веса рёбер пути (None для отсутствующих рёбер), кэшируются до изменения пути."""
+        if self._edges is None:
+            path = self.path
+            get_weight = self.network.get_weight
+            self._edges = [get_weight(path[i], path[i + 1]) for i in range(len(path) - 1)]
+        return self._edges
+
+    def edge_prefix(self):
+        """
+        Префиксные суммы по рёбрам: (веса, число отсутствующих рёбер).
+        Сумма по рёбрам lo..hi-1 равна prefix[hi] - prefix[lo].
+        """
+        if self._prefix is None:
+            edges = self.edge_weights()
+            self._prefix = (list(accumulate((w or 0 for w in edges), initial=0)),
+                            list(accumulate((w is None for w in edges), initial=0)))
+        return self._prefix
+
+    def _set_incremental_fitness(self, total, missing):
+        """Выставляет фитнес по сумме весов и числу отсутствующих рёбер."""
+        if missing or self.path[0] != self.network.start or self.path[-1] != self.network.end:
+            self.fitness = sys.maxsize
+        else:
+            self.fitness = total
+
+    def _update_edges(self, old_edges, changed):
+        """
+        Пересчитывает только рёбра, соседние с изменёнными позициями пути.
+        :param old_edges: веса рёбер до изменения
+        :param changed: индексы изменённых вершин в полном пути
+        """
+        path = self.path
+        get_weight = self.network.get_weight
+        edges = old_edges[:]
+        if self._prefix is not None:
+            total, missing = self._prefix[0][-1], self._prefix[1][-1]
+        else:
+            total = sum(w for w in edges if w is not None)
+            missing = sum(w is None for w in edges)
+
+        touched = set()
+        for position in changed:
+            touched.add(position - 1)
+            touched.add(position)
+        for t in touched:
+            old_weight = edges[t]
+            new_weight = get_weight(path[t], path[t + 1])
+            if old_weight is None:
+                missing -= 1
+            else:
+                total -= old_weight
+            if new_weight is None:
+                missing += 1
+            else:
+                total += new_weight
+            edges[t] = new_weight
 
-        self.fitness = total_path_length  # Чем меньше путь, тем лучше фитнес
+        self._edges = edges
+        self._prefix = None
+        self._set_incremental_fitness(total, missing)
+
+    def _set_from_segments(self, segments):
+        """
+        Собирает веса рёбер и фитнес потомка из отрезков родителей.
+        :param segments: список (родитель, lo, hi) - позиции lo..hi-1 потомка совпадают с позициями родителя
+        Рёбра внутри отрезка берутся из префиксных сумм родителя, заново считаются только рёбра на стыках.
+        """
+        edges = []
+        total = 0
+        missing = 0
+        for index, (parent, lo, hi) in enumerate(segments):
+            parent_edges = parent.edge_weights()
+            if index > 0:
+                if segments[index - 1][0] is parent:
+                    weight = parent_edges[lo - 1]
+                else:
+                    weight = self.network.get_weight(self.path[lo - 1], self.path[lo])
+                edges.append(weight)
+                if weight is None:
+                    missing += 1
+                else:
+                    total += weight
+            prefix_w, prefix_m = parent.edge_prefix()
+            total += prefix_w[hi - 1] - prefix_w[lo]
+            missing += prefix_m[hi - 1] - prefix_m[lo]
+            edges.extend(parent_edges[lo:hi - 1])
+
+        self._edges = edges
+        self._set_incremental_fitness(total, missing)
+
+    def replace_path(self, path):
+        """Заменяет путь (например, после пакетной мутации); фитнес сбрасывается до новой оценки."""
+        self.path = as_path(path)
+        self.fitness = None
+        self._edges = None
+        self._prefix = None
 
     def __repr__(self):
-        return f"Chromosome(path={self.path}, fitness={self.fitness})"
+        return f"Chromosome(path={self.path.tolist()}, fitness={self.fitness})"
 
-    def mutation(self, mutation_probability=0.5):
-        """Мутация без проверки рёбер. Заменяем вершины на случайные."""
+    def mutation(self, mutation_probability=0.5, evaluate=True, neighbors=None):
+        """
+        Мутация. Без neighbors рёбра не проверяются: вершины заменяются на случайные от start+1 до end-1.
+        evaluate: если False, фитнес не пересчитывается (его выставит пакетная оценка)
+        neighbors: NeighborIndex сети; если задан, вершина заменяется на случайного общего соседа
+                   её соседей по пути (рёбра с обеих сторон есть), а если такого нет - не меняется
+        """
         start = self.network.start
         end = self.network.end
+        incremental = self.incremental and evaluate and self.path[0] == start and self.path[-1] == end
+        changed = []
 
         # Пример случайной замены вершины на пути (кроме начальной и конечной)
         path = self.path[1:-1]  # Оставляем только промежуточные вершины
+        last = len(path) - 1
         for i in range(len(path)):
             if random.random() < mutation_probability:  # Используем заданную вероятность мутации вершины
-                new_vertex = random.randint(start + 1, end - 1)  # Генерируем случайную вершину от start+1 до end-1
+                if neighbors is None:
+                    new_vertex = random.randint(start + 1, end - 1)  # Генерируем случайную вершину от start+1 до end-1
+                else:
+                    new_vertex = neighbors.random_common(path[i - 1] if i else start,
+                                                         path[i + 1] if i < last else end, exclude=path[i])
+                    if new_vertex is None:
+                        continue
+                if incremental and new_vertex != path[i]:
+                    changed.append(i + 1)  # Индекс в полном пути
                 path[i] = new_vertex  # Заменяем на случайную вершину
 
-        self.path = [start] + path + [end]  # Восстанавливаем начальную и конечную вершины
-        self.calculate_fitness()  # Пересчитываем фитнес после мутации
+        old_edges = self.edge_weights() if incremental else None
+        # Восстанавливаем начальную и конечную вершины
+        path.insert(0, start)
+        path.append(end)
+        self._apply_changes(path, changed, old_edges, incremental, evaluate)
 
-    def crossover(self, other, random_or_not=False, cross_line=None):
+    def repair(self, neighbors, evaluate=True):
+        """
+        Починка пути: промежуточная вершина, у которой нет ребра к соседу по пути, заменяется
+        на общего соседа её соседей по пути (если такой есть).
+        :param neighbors: NeighborIndex сети
+        :return: True, если путь изменился
+        """
+        incremental = self.incremental and evaluate and self.fitness is not None
+        path = self.path[:]
+        changed = []
+        for i in range(1, len(path) - 1):
+            if neighbors.is_adjacent(path[i - 1], path[i]) and neighbors.is_adjacent(path[i], path[i + 1]):
+                continue
+            new_vertex = neighbors.random_common(path[i - 1], path[i + 1])
+            if new_vertex is not None and new_vertex != path[i]:
+                path[i] = new_vertex
+                changed.append(i)
+        if not changed:
+            return False
+        old_edges = self.edge_weights() if incremental else None
+        self._apply_changes(path, changed, old_edges, incremental, evaluate)
+        return True
+
+    def _apply_changes(self, path, changed, old_edges, incremental, evaluate):
+        """Записывает изменённый путь и пересчитывает фитнес (по изменённым рёбрам или целиком)."""
+        self.path = path
+        if incremental:
+            if changed:
+                self._update_edges(old_edges, changed)
+            elif self.fitness is None:
+                self.calculate_fitness()
+            return
+        self._edges = None
+        self._prefix = None
+        if evaluate:
+            self.calculate_fitness()  # Пересчитываем фитнес после мутации
+
+    def crossover(self, other, random_or_not=False, cross_line=None, evaluate=True):
         """
         Кроссовер с возможностью случайной точки разбиения.
         random_or_not: если True, точка разбиения выбирается случайно.
         cross_line: если указано, то используется точка разбиения, иначе случайная.
+        evaluate: если False, фитнес потомков не считается (его выставит пакетная оценка)
         """
         start = self.network.start
         end = self.network.end
@@ -77,25 +292,46 @@ class Chromosome:
         if line_to_cross == 0:
             line_to_cross = 2
 
-        # Создаём новые промежуточные пути
-        new_path1 = path1[:]
+        # Обмениваем части после точки разбиения: позиции line_to_cross..m-1, где m - длина
+        # более короткого пути; остаток более длинного пути остаётся на месте
+        new_path1 = path1  # Срезы self.path[1:-1] уже копии, родители не меняются
         new_path2 = path2[:]
-
-        # Обмениваем части после точки разбиения
-        for i in range(line_to_cross, max_length):
-            if i < len(path1) and i < len(path2):
-                new_path1[i], new_path2[i] = new_path2[i], new_path1[i]
-            elif i < len(path1):  # Если path1 длиннее, оставляем остаток
-                new_path1[i] = path1[i]
-            elif i < len(path2):  # Если path2 длиннее, оставляем остаток
-                new_path2[i] = path2[i]
+        m = min(len(path1), len(path2))
+        if line_to_cross < m:
+            new_path1[line_to_cross:m], new_path2[line_to_cross:m] = path2[line_to_cross:m], path1[line_to_cross:m]
 
         # Собираем полные пути с начальной и конечной точками
-        child_path1 = [start] + new_path1 + [end]
-        child_path2 = [start] + new_path2 + [end]
+        new_path1.insert(0, start)
+        new_path1.append(end)
+        new_path2.insert(0, start)
+        new_path2.append(end)
 
         # Создаём потомков
-        child1 = Chromosome(child_path1, self.network)
-        child2 = Chromosome(child_path2, self.network)
+        incremental = (self.incremental and evaluate and self.path[0] == start and self.path[-1] == end
+                       and other.path[0] == start and other.path[-1] == end)
+        child_class = type(self)
+        child1 = child_class(new_path1, self.network, evaluate and not incremental, self.incremental)
+        child2 = child_class(new_path2, self.network, evaluate and not incremental, self.incremental)
+        if incremental:
+            # Потомок 1: позиции 0..a от первого родителя, a+1..m от второго, остальное снова от первого
+            # (a - фактическая точка обмена, m - длина более короткого промежуточного пути)
+            a = min(line_to_cross, m)
+            child1._set_from_segments(self._segments(self, other, a, m, len(self.path)))
+            child2._set_from_segments(self._segments(other, self, a, m, len(other.path)))
 
         return child1, child2, line_to_cross
+
+    @staticmethod
+    def _segments(own, foreign, a, m, length):
+        """Отрезки потомка, который наследует длину и края от own, а середину от foreign."""
+        segments = [(own, 0, a + 1)]
+        if m > a:
+            segments.append((foreign, a + 1, m + 1))
+        segments.append((own, segments[-1][2], length))
+        return segments
+
+
+def _restore(path, network, fitness, incremental):
+    chromosome = Chromosome(path, network, evaluate=False, incremental=incremental)
+    chromosome.fitness = fitness
+    return chromosome
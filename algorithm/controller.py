@@ -0,0 +1,344 @@
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from algorithm.checkpoint import load_checkpoint, save_checkpoint
+from algorithm.fitness import pack_flat
+from algorithm.history import numeric_fitness
+
+
+class OptimumReached:
+    """Остановка, когда лучший фитнес достиг кратчайшего пути (или отстаёт от него не больше чем на gap)."""
+
+    def __init__(self, gap=0.0):
+        """
+        :param gap: допустимое относительное отставание от оптимума (0.05 - не хуже оптимума на 5%)
+        """
+        self.gap = gap
+
+    def reset(self, controller):
+        pass
+
+    def check(self, controller):
+        optimal = controller.generation.optimal_fitness
+        if optimal >= sys.maxsize:
+            return None  # Пути нет, оптимум недостижим
+        best = controller.best_fitness()
+        if best <= optimal * (1 + self.gap):
+            if self.gap:
+                return f"достигнут оптимум с отставанием не более {self.gap:.0%} ({best} при оптимуме {optimal})"
+            return f"достигнут оптимум ({best})"
+        return None
+
+
+class Stagnation:
+    """Остановка, если лучший (или средний) фитнес не улучшился за window поколений."""
+
+    def __init__(self, window=20, metric="best", tolerance=0):
+        """
+        :param window: за сколько поколений оценивается улучшение
+        :param metric: "best" - лучший фитнес, "average" - средний фитнес популяции
+        :param tolerance: улучшение не больше этого значения считается застоем
+        """
+        if metric not in ("best", "average"):
+            raise ValueError(f"Неизвестная метрика: {metric}")
+        self.window = window
+        self.metric = metric
+        self.tolerance = tolerance
+        self.values = deque(maxlen=window + 1)
+
+    def reset(self, controller):
+        self.values.clear()
+
+    def check(self, controller):
+        if self.metric == "best":
+            value = numeric_fitness(controller.best_fitness())
+        else:
+            value = numeric_fitness(controller.average_fitness())
+        self.values.append(value)
+        if len(self.values) <= self.window:
+            return None
+        oldest = self.values[0]
+        if oldest == value or oldest - value <= self.tolerance:
+            name = "лучший" if self.metric == "best" else "средний"
+            return f"{name} фитнес не улучшался {self.window} поколений"
+        return None
+
+
+class DiversityCollapse:
+    """
+    Остановка при потере разнообразия: доля различных рёбер среди всех рёбер путей популяции
+    упала ниже порога. Пути в популяции всегда различны, но при схождении они отличаются
+    одной-двумя вершинами, и почти все рёбра у них общие.
+    """
+
+    def __init__(self, min_diversity=0.1):
+        """
+        :param min_diversity: минимальная доля различных рёбер (1.0 - у путей нет общих рёбер)
+        """
+        self.min_diversity = min_diversity
+
+    def reset(self, controller):
+        pass
+
+    def check(self, controller):
+        value = edge_diversity(controller.generation.population, controller.generation.network.size)
+        if value < self.min_diversity:
+            return f"разнообразие популяции упало до {value:.3f}"
+        return None
+
+
+class TimeBudget:
+    """Остановка по истечении времени работы."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def reset(self, controller):
+        pass
+
+    def check(self, controller):
+        if controller.elapsed() >= self.seconds:
+            return f"исчерпан бюджет времени ({self.seconds} с)"
+        return None
+
+
+class EvaluationBudget:
+    """Остановка, когда число оценённых хромосом достигло бюджета."""
+
+    def __init__(self, evaluations):
+        self.evaluations = evaluations
+
+    def reset(self, controller):
+        self._initial = controller.generation.evaluations
+
+    def check(self, controller):
+        if controller.generation.evaluations - self._initial >= self.evaluations:
+            return f"исчерпан бюджет оценок ({self.evaluations})"
+        return None
+
+
+def edge_diversity(population, size):
+    """Доля различных рёбер среди всех рёбер путей популяции (0, если рёбер нет)."""
+    buffer, offsets = pack_flat([chromosome.path for chromosome in population])
+    if len(buffer) < 2:
+        return 0.0
+    edge_mask = np.ones(len(buffer) - 1, dtype=bool)
+    edge_mask[offsets[1:-1] - 1] = False
+    a = buffer[:-1][edge_mask].astype(np.int64)
+    b = buffer[1:][edge_mask].astype(np.int64)
+    if len(a) == 0:
+        return 0.0
+    keys = np.minimum(a, b) * size + np.maximum(a, b)
+    return len(np.unique(keys)) / len(keys)
+
+
+class RunController:
+    """
+    Запуск эволюции с критериями остановки. Критерии проверяются после каждого поколения
+    в порядке перечисления; срабатывает первый, вернувший причину. Хотя бы одно поколение
+    выполняется всегда, чтобы у запуска была история.
+    """
+
+    def __init__(self, generation, criteria=(), max_generations=None, mutation_probability=0.5,
+                 checkpoint_path=None, checkpoint_every=None, checkpoint_seconds=None):
+        """
+        :param generation: поколение (Generation), которое нужно развивать
+        :param criteria: критерии остановки (объекты с методами reset и check)
+        :param max_generations: предельное число поколений (None - без предела)
+        :param mutation_probability: вероятность мутации вершины
+        :param checkpoint_path: файл контрольной точки (см. algorithm.checkpoint); она пишется
+                                каждые checkpoint_every поколений и/или checkpoint_seconds секунд,
+                                а также в конце запуска
+        :param checkpoint_every: интервал контрольных точек в поколениях
+        :param checkpoint_seconds: интервал контрольных точек в секундах
+        """
+        self.generation = generation
+        self.criteria = list(criteria)
+        self.max_generations = max_generations
+        self.mutation_probability = mutation_probability
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.generation_number = 0
+        self._started = None
+        self._last_checkpoint = None
+        self._stop_requested = False
+        # Критерии восстановленного запуска продолжают со своим сохранённым состоянием
+        self._resumed = False
+
+    @classmethod
+    def resume(cls, checkpoint_path, network=None, **kwargs):
+        """
+        Продолжает запуск из контрольной точки: поколение, номер поколения, состояние random,
+        критерии остановки и параметры запуска восстанавливаются, поэтому продолжение совпадает
+        с непрерванным запуском (критерии по времени отсчитывают время заново).
+        :param network: сеть (None - сохранённая в контрольной точке)
+        :param kwargs: параметры RunController, заменяющие сохранённые (например, max_generations)
+        """
+        restored = load_checkpoint(checkpoint_path, network)
+        settings = dict(restored["extra"] or {})
+        settings.setdefault("checkpoint_path", checkpoint_path)
+        settings.update(kwargs)
+        controller = cls(restored["generation"], **settings)
+        controller.generation_number = restored["generation_number"]
+        controller._resumed = True
+        return controller
+
+    def save_checkpoint(self):
+        """Пишет контрольную точку: поколение, номер, random, критерии и параметры запуска."""
+        settings = {
+            "criteria": self.criteria,
+            "max_generations": self.max_generations,
+            "mutation_probability": self.mutation_probability,
+            "checkpoint_every": self.checkpoint_every,
+            "checkpoint_seconds": self.checkpoint_seconds,
+        }
+        save_checkpoint(self.checkpoint_path, self.generation, self.generation_number, settings)
+        self._last_checkpoint = time.perf_counter()
+
+    def stop(self):
+        """Просит остановить run() после текущего поколения (можно вызывать из другого потока)."""
+        self._stop_requested = True
+
+    def _checkpoint_due(self):
+        if self.checkpoint_path is None:
+            return False
+        if self.checkpoint_every is not None and self.generation_number % self.checkpoint_every == 0:
+            return True
+        return (self.checkpoint_seconds is not None
+                and time.perf_counter() - self._last_checkpoint >= self.checkpoint_seconds)
+
+    def elapsed(self):
+        """Секунды с начала run()."""
+        return time.perf_counter() - self._started
+
+    def best_fitness(self):
+        return self.generation.get_best_chromosome().fitness
+
+    def average_fitness(self):
+        population = self.generation.population
+        return sum(chromosome.fitness for chromosome in population) / len(population)
+
+    def _check(self):
+        for criterion in self.criteria:
+            reason = criterion.check(self)
+            if reason is not None:
+                return criterion, reason
+        return None, None
+
+    def run(self, callback=None):
+        """
+        Развивает поколение, пока не сработает критерий или не кончится max_generations.
+        :param callback: вызывается после каждого поколения с его номером
+        :return: словарь с причиной остановки, числом поколений, временем, числом оценок и лучшим решением
+        """
+        self._started = self._last_checkpoint = time.perf_counter()
+        initial_evaluations = self.generation.evaluations
+        if not self._resumed:
+            for criterion in self.criteria:
+                criterion.reset(self)
+        self._resumed = False
+        self._stop_requested = False
+
+        criterion, reason = None, None
+        while reason is None:
+            if self._stop_requested and self.generation_number > 0:
+                reason = "остановлено по запросу"
+                break
+            if self.max_generations is not None and self.generation_number >= self.max_generations:
+                reason = f"выполнено {self.max_generations} поколений"
+                break
+            self.generation_number += 1
+            self.generation.evolve(self.generation_number, self.mutation_probability)
+            if callback is not None:
+                callback(self.generation_number)
+            criterion, reason = self._check()
+            if reason is None and self._checkpoint_due():
+                self.save_checkpoint()
+
+        if self.checkpoint_path is not None:
+            self.save_checkpoint()
+        best = self.generation.get_best_chromosome()
+        return {
+            "reason": reason,
+            "criterion": type(criterion).__name__ if criterion is not None else None,
+            "generations": self.generation_number,
+            "elapsed": self.elapsed(),
+            "evaluations": self.generation.evaluations - initial_evaluations,
+            "best_path": list(best.path),
+            "best_fitness": best.fitness,
+        }
+
+
+class AnytimeRun:
+    """
+    Эволюция до срока в фоновом потоке. После каждого поколения лучшее решение публикуется
+    заменой одной ссылки, поэтому best() доступен в любой момент и не ждёт цикл эволюции.
+    Срок проверяется после поколения, то есть может быть превышен на одно поколение.
+    """
+
+    def __init__(self, generation, seconds, criteria=(), **controller_kwargs):
+        """
+        :param generation: поколение (Generation)
+        :param seconds: срок в секундах от start()
+        :param criteria: дополнительные критерии остановки
+        :param controller_kwargs: параметры RunController (max_generations, контрольные точки и т.д.)
+        """
+        self.controller = RunController(generation, [TimeBudget(seconds), *criteria], **controller_kwargs)
+        self.result = None
+        self._best = None
+        self._thread = None
+        self._callback = None
+
+    def start(self, callback=None):
+        """
+        Запускает эволюцию в фоновом потоке.
+        :param callback: вызывается в фоновом потоке после каждого поколения с его номером
+        """
+        if self._thread is not None:
+            raise RuntimeError("Запуск уже начат")
+        self._callback = callback
+        self._publish(self.controller.generation_number)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        self.result = self.controller.run(self._after_generation)
+
+    def _after_generation(self, generation_number):
+        self._publish(generation_number)
+        if self._callback is not None:
+            self._callback(generation_number)
+
+    def _publish(self, generation_number):
+        best = self.controller.generation.get_best_chromosome()
+        self._best = {"path": list(best.path), "fitness": best.fitness, "generation": generation_number}
+
+    def best(self):
+        """Лучшее на сейчас решение: словарь с путём, фитнесом и номером поколения."""
+        return self._best
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        """Останавливает эволюцию после текущего поколения, не дожидаясь срока."""
+        self.controller.stop()
+
+    def wait(self, timeout=None):
+        """Ждёт окончания запуска; возвращает результат RunController.run (None, если не дождались)."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.result
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        self.wait()
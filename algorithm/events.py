@@ -0,0 +1,92 @@
+import sys
+from enum import IntEnum
+
+
+class EventLevel(IntEnum):
+    """Уровень подробности событий эволюции."""
+    OFF = 0  # Ничего не сообщаем
+    SUMMARY = 1  # Начало и итог поколения
+    OPERATIONS = 2  # Плюс каждый кроссовер и каждая мутация
+
+
+# События Generation и минимальный уровень, на котором они нужны
+EVENTS = {
+    "generation_started": EventLevel.SUMMARY,  # (generation_number)
+    "crossover": EventLevel.OPERATIONS,  # (parent1, parent2, child1, child2, cross_line)
+    "mutation_phase": EventLevel.OPERATIONS,  # (generation_number)
+    "mutation": EventLevel.OPERATIONS,  # (old_path, old_fitness, new_path, new_fitness)
+    "generation_finished": EventLevel.SUMMARY,  # (generation_number, population)
+}
+
+
+def format_fitness(fitness):
+    """Фитнес для вывода: "-" для неправильного пути."""
+    return "-" if fitness >= sys.maxsize else f"{fitness}"
+
+
+def format_stats(stats):
+    """
+    Числовая статистика популяции (см. Generation.get_numeric_stats) в текстовом виде:
+    лучший и худший фитнес - целые, средний - дробный, "-" - нет пути.
+    """
+    def text(value, kind):
+        return "-" if value == float("inf") else f"{kind(value)}"
+
+    return {
+        "best_fitness": text(stats["best_fitness"], int),
+        "worst_fitness": text(stats["worst_fitness"], int),
+        "average_fitness": text(stats["average_fitness"], float),
+    }
+
+
+def format_path(path):
+    """Путь для вывода в виде списка вершин."""
+    return f"{list(path)}"
+
+
+class PrintSink:
+    """
+    Подписчик, печатающий ход эволюции в текстовом виде.
+    На уровне OPERATIONS вывод совпадает с прежним поведением evolve без callback'ов.
+    """
+
+    def __init__(self, level=EventLevel.OPERATIONS, stream=None):
+        """
+        :param level: уровень подробности (EventLevel)
+        :param stream: куда печатать (по умолчанию sys.stdout на момент печати)
+        """
+        self.level = EventLevel(level)
+        self.stream = stream
+
+    def attach(self, generation):
+        """Подписывает обработчики на события поколения согласно уровню."""
+        for name, level in EVENTS.items():
+            if self.level >= level:
+                generation.subscribe(name, getattr(self, name))
+        return self
+
+    def _print(self, text):
+        print(text, file=self.stream if self.stream is not None else sys.stdout)
+
+    def generation_started(self, generation_number):
+        self._print(f"\nПоколение {generation_number}:")
+
+    def crossover(self, parent1, parent2, child1, child2, cross_line):
+        self._print(f"\nРодитель 1: {format_path(parent1.path)}, фитнес: {format_fitness(parent1.fitness)}")
+        self._print(f"Родитель 2: {format_path(parent2.path)}, фитнес: {format_fitness(parent2.fitness)}")
+        self._print(f"Линия кроссовера: {cross_line}")
+        self._print(f"Потомок 1: {format_path(child1.path)}, фитнес: {format_fitness(child1.fitness)}")
+        self._print(f"Потомок 2: {format_path(child2.path)}, фитнес: {format_fitness(child2.fitness)}")
+
+    def mutation_phase(self, generation_number):
+        self._print("\nХромосомы после мутации:")
+
+    def mutation(self, old_path, old_fitness, new_path, new_fitness):
+        self._print(f"  Хромосома: {format_path(old_path)} (фитнес: {format_fitness(old_fitness)}) -> "
+                    f"{format_path(new_path)} (фитнес: {format_fitness(new_fitness)})")
+
+    def generation_finished(self, generation_number, population):
+        self._print("\nФинальная популяция после эволюции:")
+        for i, chromosome in enumerate(population):
+            self._print(f"  Хромосома {i + 1}: {format_path(chromosome.path)}, "
+                        f"фитнес: {format_fitness(chromosome.fitness)}")
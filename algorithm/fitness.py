@@ -0,0 +1,96 @@
+import sys
+from array import array
+from itertools import chain
+
+import numpy as np
+
+
+def pack_flat(paths):
+    """
+    Упаковывает пути подряд в один буфер без заполнения.
+    :return: (buffer, offsets) - вершины всех путей (int32) и смещения начала каждого пути
+             (int64, на один элемент длиннее числа путей)
+    """
+    lengths = np.fromiter(map(len, paths), dtype=np.int64, count=len(paths))
+    offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if paths and all(type(path) is array and path.typecode == "i" for path in paths):
+        buffer = np.frombuffer(b"".join(map(bytes, paths)), dtype=np.int32)
+    else:
+        buffer = np.fromiter(chain.from_iterable(paths), dtype=np.int32, count=int(offsets[-1]))
+    return buffer, offsets
+
+
+def evaluate_flat(network, buffer, offsets):
+    """
+    Оценивает пути, упакованные подряд (см. pack_flat), одним векторным проходом.
+    Правила те же, что в Chromosome.calculate_fitness: путь с неверными концами
+    или с отсутствующим ребром получает sys.maxsize, иначе - сумму весов рёбер.
+    :return: вектор фитнеса int64
+    """
+    count = len(offsets) - 1
+    fitness = np.full(count, sys.maxsize, dtype=np.int64)
+    if count == 0:
+        return fitness
+
+    starts = offsets[:-1]
+    ends = offsets[1:] - 1
+    lengths = offsets[1:] - starts
+    nonempty = lengths > 0
+    valid = nonempty.copy()
+    valid[nonempty] = (buffer[starts[nonempty]] == network.start) & (buffer[ends[nonempty]] == network.end)
+
+    totals = np.zeros(count, dtype=np.int64)
+    if len(buffer) > 1:
+        # Пары соседних вершин буфера; пара через границу двух путей ребром не является
+        edge_mask = np.ones(len(buffer) - 1, dtype=bool)
+        edge_mask[ends[nonempty & (ends < len(buffer) - 1)]] = False
+        weights = network.lookup_weights(buffer[:-1][edge_mask].astype(np.int64),
+                                         buffer[1:][edge_mask].astype(np.int64))
+        # Рёбра пути идут подряд: у пути длины L их L - 1, начало - сумма рёбер предыдущих путей.
+        # Суммы по отрезкам считаются в int64 (reduceat), пути без рёбер в отрезки не входят
+        edge_counts = np.maximum(lengths - 1, 0)
+        has_edges = edge_counts > 0
+        if len(weights):
+            edge_starts = (np.cumsum(edge_counts) - edge_counts)[has_edges]
+            valid[has_edges] &= ~np.logical_or.reduceat(weights < 0, edge_starts)
+            totals[has_edges] = np.add.reduceat(weights, edge_starts)
+
+    fitness[valid] = totals[valid]
+    return fitness
+
+
+def evaluate_paths(network, paths):
+    """
+    Оценивает список путей; возвращает список фитнесов (int).
+    Если у сети есть кэш фитнеса, векторно считаются только пути, которых в нём нет.
+    """
+    cache = network.fitness_cache
+    if cache is None:
+        return evaluate_flat(network, *pack_flat(paths)).tolist()
+
+    fitness_values = [sys.maxsize] * len(paths)
+    missing = []
+    for i, path in enumerate(paths):
+        if path[0] != network.start or path[-1] != network.end:
+            continue
+        fitness = cache.get(path)
+        if fitness is None:
+            missing.append(i)
+        else:
+            fitness_values[i] = fitness
+
+    if missing:
+        missing_paths = [paths[i] for i in missing]
+        for i, path, fitness in zip(missing, missing_paths, evaluate_flat(network, *pack_flat(missing_paths)).tolist()):
+            fitness_values[i] = fitness
+            cache.put(path, fitness)
+    return fitness_values
+
+
+def evaluate_population(network, chromosomes):
+    """Пересчитывает фитнес всех хромосом одним вызовом."""
+    fitness_values = evaluate_paths(network, [chromosome.path for chromosome in chromosomes])
+    for chromosome, fitness in zip(chromosomes, fitness_values):
+        chromosome.fitness = fitness
+
@@ -1,10 +1,30 @@
 import random
-import sys
+from time import perf_counter_ns
+
+import numpy as np
+
+from algorithm.buffers import PopulationBuffers
 from algorithm.chromosome import Chromosome
+from algorithm.events import EVENTS, EventLevel, PrintSink, format_stats
+from algorithm.fitness import evaluate_population
+from algorithm.history import numeric_stats
+from algorithm.operators import crossover_packed, draw_cut_lines, mutate_packed
+from algorithm.population import PackedPopulation
+from algorithm.selection import SELECTIONS, best_unique, smallest
+from algorithm.visited import VisitedIndex
+
+# Настройки и счётчики поколения, которые сохраняются в контрольной точке (см. get_state)
+STATE_FIELDS = ("batch_fitness", "incremental_fitness", "batch_operators", "initialization", "mutation", "repair",
+                "rng", "_batch_offspring", "selection", "tournament_size", "evaluations", "population_size",
+                "min_length", "max_length", "optimal_fitness", "visited", "resample_attempts")
 
 
 class Generation:
-    def __init__(self, network, k=1, min_population=10, max_population=100, min_length=3, max_length=None):
+    def __init__(self, network, k=1, min_population=10, max_population=100, min_length=3, max_length=None,
+                 batch_fitness=True, incremental_fitness=False, verbosity=EventLevel.OFF, profiler=None,
+                 selection="truncation", tournament_size=3, batch_operators=False, rng=None,
+                 initialization="uniform", mutation="uniform", repair=False, visited_capacity=None,
+                 resample_attempts=3, buffered=False):
         """
         Инициализация поколения.
         :param network: объект сети, в которой будут создаваться хромосомы
@@ -13,19 +33,116 @@ class Generation:
         :param max_population: максимальное количество хромосом
         :param min_length: минимальная длина хромосомы (должна быть >= 2)
         :param max_length: максимальная длина хромосомы (если None, будет вычислена автоматически)
+        :param batch_fitness: если True, новые хромосомы оцениваются одним векторным вызовом
+                              на всю группу, иначе каждая считает свой фитнес сама
+        :param incremental_fitness: если True, потомки кроссовера и мутанты пересчитывают фитнес
+                                    только по изменённым рёбрам (пакетная оценка тогда
+                                    используется лишь для начальной популяции)
+        :param verbosity: уровень печати хода эволюции (EventLevel); по умолчанию ничего не печатается
+        :param profiler: GenerationProfiler для замера фаз каждого поколения (None - без замеров)
+        :param selection: отбор родителей для кроссовера: "truncation" - лучшие по фитнесу,
+                          "tournament" - турнирный, "rank" - ранговый (см. algorithm.selection)
+        :param tournament_size: размер турнира для selection="tournament"
+        :param batch_operators: если True, кроссовер всех пар и мутация всех потомков выполняются
+                                векторно над упакованными путями (см. algorithm.operators),
+                                потомки тогда всегда оцениваются пакетно
+        :param rng: numpy.random.Generator или зерно для пакетных операторов; по умолчанию
+                    зерно берётся из random, поэтому random.seed задаёт и этот генератор
+        :param initialization: начальные пути: "uniform" - случайные вершины,
+                               "walk" - случайное блуждание по рёбрам (см. NeighborIndex.random_walk)
+        :param mutation: "uniform" - замена вершины на случайную, "adjacent" - на общего соседа
+                         её соседей по пути (с batch_operators мутация тогда выполняется по хромосомам)
+        :param repair: если True, потомки после мутации чинятся (Chromosome.repair)
+        :param visited_capacity: если задан, ведётся индекс уже оценённых путей на весь запуск
+                                 (VisitedIndex такой ёмкости): мутанты с уже виденными путями
+                                 мутируются заново, а если это не помогло - отбрасываются до оценки;
+                                 потомки до мутации тогда оцениваются, только если есть подписчики
+                                 на кроссовер или мутации
+        :param resample_attempts: сколько раз заново мутировать потомка с уже виденным путём
+        :param buffered: если True, шаг поколения идёт на заранее выделенных двойных буферах
+                         (PopulationBuffers): кроссовер и мутация пишут прямо в буфер потомков,
+                         хромосомы собираются только по запросу (population, подписчики).
+                         Случайные числа берутся из rng, как с batch_operators; потомки оцениваются
+                         после кроссовера, только если есть подписчики на кроссовер или мутации.
+                         Нужны mutation="uniform", selection="truncation", без repair и visited_capacity
         """
+        if selection not in SELECTIONS:
+            raise ValueError(f"Неизвестный способ отбора: {selection}")
+        if initialization not in ("uniform", "walk"):
+            raise ValueError(f"Неизвестный способ инициализации: {initialization}")
+        if mutation not in ("uniform", "adjacent"):
+            raise ValueError(f"Неизвестный способ мутации: {mutation}")
+        if buffered:
+            unsupported = [f"{name}={value!r}" for name, value, supported in (
+                ("mutation", mutation, mutation == "uniform"),
+                ("selection", selection, selection == "truncation"),
+                ("repair", repair, not repair),
+                ("visited_capacity", visited_capacity, not visited_capacity),
+            ) if not supported]
+            if unsupported:
+                raise ValueError(f"buffered несовместим с {', '.join(unsupported)}: нужны mutation=\"uniform\", "
+                                 "selection=\"truncation\", без repair и visited_capacity")
         self.network = network
+        self.batch_fitness = batch_fitness
+        self.incremental_fitness = incremental_fitness
+        self.batch_operators = batch_operators
+        self.initialization = initialization
+        self.mutation = mutation
+        self.repair = repair
+        # Индекс соседей нужен только операторам, учитывающим рёбра
+        uses_edges = initialization == "walk" or mutation == "adjacent" or repair
+        self.neighbors = network.neighbor_index() if uses_edges else None
+        if (batch_operators or buffered) and not isinstance(rng, np.random.Generator):
+            rng = np.random.default_rng(random.getrandbits(64) if rng is None else rng)
+        self.rng = rng
+        # Пакетно оцениваем потомков и мутантов, только если они не считаются инкрементально
+        self._batch_offspring = batch_operators or (batch_fitness and not incremental_fitness)
+        # Подписчики на события эволюции
+        self._listeners = {event: [] for event in EVENTS}
+        if verbosity > EventLevel.OFF:
+            PrintSink(verbosity).attach(self)
+        self.profiler = profiler
+        self.selection = selection
+        self.tournament_size = tournament_size
+        self.evaluations = 0  # Сколько хромосом оценено за всё время
+        self.visited = VisitedIndex(visited_capacity) if visited_capacity else None
+        self.resample_attempts = resample_attempts
+        self._novelty = None  # Счётчики новизны последнего поколения (см. get_novelty)
         self.population_size = self.calculate_population_size(network.size, k, min_population, max_population)
         self.min_length = max(min_length, 2)
         self.max_length = max_length if max_length is not None else min(2 * network.size, 20)
 
-        # Вычисляем оптимальное решение один раз
-        dist_matrix, _ = network.floyd()
-        self.optimal_fitness = dist_matrix[network.start][network.end]
+        # Оптимум - Дейкстра из начальной вершины (запоминается сетью), Флойд для этого не нужен
+        self.optimal_fitness = network.shortest_distance(network.start, network.end)
+
+        self.buffered = buffered
+        self._buffers = None
+        self._population = None
+        if buffered:
+            self._buffers = PopulationBuffers(network, self.population_size, 2 * self.crossover_pairs(),
+                                              self.max_length)
 
         # Создаём начальную популяцию
         self.population = self.create_initial_population()
 
+    @property
+    def population(self):
+        """
+        Текущая популяция (список Chromosome). С buffered хромосомы собираются из буфера
+        при первом обращении после шага и хранятся до следующего шага; изменения этих хромосом
+        в буфер не попадают, заменить популяцию можно присваиванием. Лучшая хромосома
+        и статистика популяции хромосомы не собирают.
+        """
+        if self._population is None:
+            self._population = self._buffers.chromosomes(self.incremental_fitness)
+        return self._population
+
+    @population.setter
+    def population(self, population):
+        self._population = population
+        if self._buffers is not None:
+            self._buffers.load(population)
+
     def calculate_population_size(self, number_of_vertices, k, min_population, max_population):
         """
         Вычисляет population_size на основе количества вершин.
@@ -43,14 +160,24 @@ class Generation:
         for _ in range(self.population_size):
             chromosome_length = random.randint(self.min_length, self.max_length)
             path = self.generate_random_path(chromosome_length)
-            chromosome = Chromosome(path, self.network)
+            chromosome = Chromosome(path, self.network, evaluate=not self.batch_fitness,
+                                    incremental=self.incremental_fitness)
             population.append(chromosome)
+        if self.batch_fitness:
+            evaluate_population(self.network, population)
+        self.evaluations += len(population)
+        if self.visited is not None:
+            self.visited.add_paths([chromosome.path for chromosome in population])
         return population
 
     def generate_random_path(self, length):
-        """Генерация случайного пути для хромосомы заданной длины."""
+        """Генерация случайного пути для хромосомы заданной длины (при initialization="walk" - по рёбрам, если удалось)."""
         start = self.network.start
         end = self.network.end
+        if self.initialization == "walk":
+            path = self.neighbors.random_walk(start, end, length)
+            if path is not None:
+                return path
         intermediate = random.sample(range(0, self.network.size), length - 2)  # Выбираем уникальные вершины
         return [start] + intermediate + [end]
 
@@ -59,25 +186,29 @@ class Generation:
         unique_population = []
         seen_paths = set()
         for chromosome in self.population:
-            path_tuple = tuple(chromosome.path)
-            if path_tuple not in seen_paths:
-                seen_paths.add(path_tuple)
+            path_key = chromosome.path.tobytes()
+            if path_key not in seen_paths:
+                seen_paths.add(path_key)
                 unique_population.append(chromosome)
         self.population = unique_population
 
     def select_best(self):
         """Отбор лучших хромосом в популяции."""
-        sorted_population = sorted(self.population, key=lambda x: x.fitness)
-        self.population = sorted_population[:self.population_size]
+        self.population = smallest(self.population, self.population_size)
+
+    def select_parents(self, count):
+        """Выбирает count родителей способом, заданным параметром selection."""
+        if self.selection == "tournament":
+            return SELECTIONS["tournament"](self.population, count, self.tournament_size)
+        return SELECTIONS[self.selection](self.population, count)
 
     def select_pairs_for_crossover(self):
         """
         Выбирает пары для кроссовера, исключая одинаковые хромосомы.
         :return: список пар для кроссовера
         """
-        sorted_population = sorted(self.population, key=lambda x: x.fitness)
-        num_pairs = max(1, int(self.population_size * 0.2))  # 20% популяции
-        parents = sorted_population[:num_pairs * 2]  # Берём лучших
+        num_pairs = self.crossover_pairs()
+        parents = self.select_parents(num_pairs * 2)  # По умолчанию берём лучших
         pairs = []
         used_indices = set()  # Отслеживаем использованные хромосомы
 
@@ -95,64 +226,291 @@ class Generation:
 
         return pairs
 
-    def perform_crossover(self, pairs, crossover_callback=None):
-        new_population = []
-        for parent1, parent2 in pairs:
-            child1, child2, cross_line = parent1.crossover(parent2, random_or_not=True)
-            new_population.extend([child1, child2])
-            if crossover_callback:
-                crossover_callback(parent1, parent2, child1, child2, cross_line)
-            else:
-                # Оставляем вывод для случаев, когда callback не передан
-                def format_fitness(fitness):
-                    return "-" if fitness >= sys.maxsize else f"{fitness}"
-
-                print(f"\nРодитель 1: {parent1.path}, фитнес: {format_fitness(parent1.fitness)}")
-                print(f"Родитель 2: {parent2.path}, фитнес: {format_fitness(parent2.fitness)}")
-                print(f"Линия кроссовера: {cross_line}")
-                print(f"Потомок 1: {child1.path}, фитнес: {format_fitness(child1.fitness)}")
-                print(f"Потомок 2: {child2.path}, фитнес: {format_fitness(child2.fitness)}")
+    def crossover_pairs(self):
+        """Сколько пар скрещивается за поколение (20% популяции)."""
+        return max(1, int(self.population_size * 0.2))
+
+    def perform_crossover(self, pairs, crossover_callback=None, evaluate=True):
+        """
+        Кроссовер пар и оценка потомков.
+        :param evaluate: если False, фитнес потомков не считается (его посчитают после мутации)
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            mark = perf_counter_ns()
+        if self.batch_operators:
+            new_population, cross_lines = self.batch_crossover(pairs)
+        else:
+            new_population = []
+            cross_lines = []
+            for parent1, parent2 in pairs:
+                child1, child2, cross_line = parent1.crossover(parent2, random_or_not=True,
+                                                               evaluate=evaluate and not self._batch_offspring)
+                new_population.extend([child1, child2])
+                cross_lines.append(cross_line)
+        if profiler is not None:
+            mark = profiler.lap("crossover", mark)
+        evaluated = len(new_population) if evaluate else 0
+        if evaluate and self._batch_offspring:
+            evaluate_population(self.network, new_population)
+        self.evaluations += evaluated
+        if profiler is not None:
+            profiler.lap("evaluation", mark)
+            profiler.count(allocated=len(new_population), evaluated=evaluated)
+
+        listeners = self._listeners["crossover"]
+        if crossover_callback:
+            listeners = listeners + [crossover_callback]
+        if listeners:
+            for (parent1, parent2), cross_line, child1, child2 in zip(pairs, cross_lines, new_population[0::2],
+                                                                      new_population[1::2]):
+                for listener in listeners:
+                    listener(parent1, parent2, child1, child2, cross_line)
         return new_population
 
+    def batch_crossover(self, pairs):
+        """
+        Кроссовер всех пар одним векторным шагом (фитнес потомков не считается).
+        :return: (потомки в порядке потомок 1, потомок 2 каждой пары, точки разбиения)
+        """
+        if not pairs:
+            return [], []
+        first = [parent1.path for parent1, _ in pairs]
+        second = [parent2.path for _, parent2 in pairs]
+        lines = draw_cut_lines(self.rng, np.fromiter(map(len, first), dtype=np.int64, count=len(first)),
+                               np.fromiter(map(len, second), dtype=np.int64, count=len(second)))
+        children = crossover_packed(self.network, first, second, lines)
+        new_population = [Chromosome(path, self.network, evaluate=False, incremental=self.incremental_fitness)
+                          for path in children.paths()]
+        return new_population, lines.tolist()
+
+    def batch_mutation(self, population, mutation_probability):
+        """Мутация всех хромосом одним векторным шагом (фитнес сбрасывается до пакетной оценки)."""
+        if not population:
+            return
+        packed = PackedPopulation.from_paths([chromosome.path for chromosome in population])
+        mutated = mutate_packed(self.network, packed, mutation_probability, self.rng)
+        for chromosome, path in zip(population, mutated.paths()):
+            chromosome.replace_path(path)
+
     def evolve(self, generation_number, mutation_probability=0.5, crossover_callback=None, mutation_callback=None):
-        print(f"\nПоколение {generation_number}:")
+        """
+        Одно поколение эволюции: кроссовер лучших, мутация потомков, отбор уникальных лучших.
+        О ходе эволюции сообщается подписчикам (см. subscribe); crossover_callback и
+        mutation_callback - разовые подписчики только на это поколение.
+        """
+        if self._buffers is not None:
+            return self._evolve_buffered(generation_number, mutation_probability, crossover_callback,
+                                         mutation_callback)
+        listeners = self._listeners
+        profiler = self.profiler
+        for listener in listeners["generation_started"]:
+            listener(generation_number)
+        if profiler is not None:
+            mark = profiler.start_generation(generation_number)
+        visited = self.visited
+        if visited is not None:
+            self._novelty = {"evaluated": 0, "novel": 0, "resampled": 0, "rejected": 0}
         chromosome_bank = []
         chromosome_bank.extend(self.population)
         pairs = self.select_pairs_for_crossover()
-        new_population = self.perform_crossover(pairs, crossover_callback)
+        if profiler is not None:
+            profiler.lap("selection", mark)
+        mutation_listeners = listeners["mutation"]
+        if mutation_callback:
+            mutation_listeners = mutation_listeners + [mutation_callback]
+        # С индексом виденных путей потомки до мутации оцениваются, только если их фитнес нужен
+        # подписчикам: известные пути отсеиваются после мутации, до оценки
+        score_offspring = (visited is None or bool(listeners["crossover"]) or crossover_callback is not None
+                           or bool(mutation_listeners))
+        new_population = self.perform_crossover(pairs, crossover_callback, score_offspring)
+        for listener in listeners["mutation_phase"]:
+            listener(generation_number)
+        if profiler is not None:
+            mark = perf_counter_ns()
+
+        # Старые пути копируем, только если кому-то нужно сообщить об изменениях
+        old_states = None
+        if mutation_listeners:
+            old_states = [(chromosome.path[:], chromosome.fitness) for chromosome in new_population]
+        # С индексом виденных путей фитнес считается только после отсева известных мутантов
+        evaluate_inline = not self._batch_offspring and visited is None
+        originals = [chromosome.path for chromosome in new_population] if visited is not None else None
+        self.mutate_offspring(new_population, mutation_probability, evaluate_inline)
+        if visited is not None:
+            new_population, old_states = self._resample_known(new_population, originals, old_states,
+                                                              mutation_probability)
+        if profiler is not None:
+            mark = profiler.lap("mutation", mark)
+        if self._batch_offspring:
+            evaluate_population(self.network, new_population)
+        elif not evaluate_inline:
+            for chromosome in new_population:
+                chromosome.calculate_fitness()
+        self.evaluations += len(new_population)
+        if visited is not None:
+            self._count_novel([chromosome.path for chromosome in new_population])
+        if profiler is not None:
+            profiler.lap("evaluation", mark)
+            profiler.count(evaluated=len(new_population))
         chromosome_bank.extend(new_population)
-        print("\nХромосомы после мутации:")
-        mutated_population = []
-        for chromosome in new_population:
-            old_path = chromosome.path.copy()
-            old_fitness = chromosome.fitness
-            chromosome.mutation(mutation_probability)
-            if chromosome.path != old_path:
-                if mutation_callback:
-                    mutation_callback(old_path, old_fitness, chromosome.path, chromosome.fitness)
-                else:
-                    old_fitness_str = "-" if old_fitness >= sys.maxsize else f"{old_fitness}"
-                    new_fitness_str = "-" if chromosome.fitness >= sys.maxsize else f"{chromosome.fitness}"
-                    print(
-                        f"  Хромосома: {old_path} (фитнес: {old_fitness_str}) -> {chromosome.path} (фитнес: {new_fitness_str})")
-            mutated_population.append(chromosome)
-        chromosome_bank.extend(mutated_population)
-        unique_bank = []
-        seen_paths = set()
-        for chromosome in sorted(chromosome_bank, key=lambda x: x.fitness):
-            path_tuple = tuple(chromosome.path)
-            if path_tuple not in seen_paths:
-                seen_paths.add(path_tuple)
-                unique_bank.append(chromosome)
-        self.population = unique_bank[:self.population_size]
-        if len(self.population) < self.population_size and len(unique_bank) > len(self.population):
-            additional_chromosomes = unique_bank[len(self.population):self.population_size]
-            self.population.extend(additional_chromosomes)
-        print("\nФинальная популяция после эволюции:")
-        for i, chromosome in enumerate(self.population):
-            fitness_str = "-" if chromosome.fitness >= sys.maxsize else f"{chromosome.fitness}"
-            print(f"  Хромосома {i + 1}: {chromosome.path}, фитнес: {fitness_str}")
+        if old_states is not None:
+            for chromosome, (old_path, old_fitness) in zip(new_population, old_states):
+                if chromosome.path != old_path:
+                    for listener in mutation_listeners:
+                        listener(old_path, old_fitness, chromosome.path, chromosome.fitness)
+        if profiler is not None:
+            mark = perf_counter_ns()
+
+        # Лучшие уникальные пути без полной сортировки банка
+        self.population = best_unique(chromosome_bank, self.population_size)
+        if profiler is not None:
+            profiler.lap("survivors", mark)
+            profiler.finish_generation(len(self.population))
+        for listener in listeners["generation_finished"]:
+            listener(generation_number, self.population)
 
+    def _evolve_buffered(self, generation_number, mutation_probability, crossover_callback, mutation_callback):
+        """Поколение на двойных буферах (см. buffered): те же фазы и события, что в evolve."""
+        listeners = self._listeners
+        profiler = self.profiler
+        buffers = self._buffers
+        for listener in listeners["generation_started"]:
+            listener(generation_number)
+        if profiler is not None:
+            mark = profiler.start_generation(generation_number)
+        crossover_listeners = listeners["crossover"]
+        if crossover_callback:
+            crossover_listeners = crossover_listeners + [crossover_callback]
+        mutation_listeners = listeners["mutation"]
+        if mutation_callback:
+            mutation_listeners = mutation_listeners + [mutation_callback]
+        incremental = self.incremental_fitness
+
+        pairs = buffers.crossover(self.crossover_pairs(), self.rng)
+        children = 2 * pairs
+        if profiler is not None:
+            mark = profiler.lap("crossover", mark)
+        # Фитнес потомков до мутации нужен только подписчикам
+        if crossover_listeners or mutation_listeners:
+            buffers.evaluate()
+            self.evaluations += children
+            if profiler is not None:
+                mark = profiler.lap("evaluation", mark)
+                profiler.count(evaluated=children)
+        if crossover_listeners:
+            first, second = buffers.parent_rows(pairs)
+            for i, (row1, row2) in enumerate(zip(first.tolist(), second.tolist())):
+                parent1, parent2 = buffers.chromosome(row1, incremental), buffers.chromosome(row2, incremental)
+                child1 = buffers.chromosome(buffers.count + i, incremental)
+                child2 = buffers.chromosome(buffers.count + pairs + i, incremental)
+                for listener in crossover_listeners:
+                    listener(parent1, parent2, child1, child2, buffers.line(i))
+        for listener in listeners["mutation_phase"]:
+            listener(generation_number)
+        if profiler is not None:
+            mark = perf_counter_ns()
+
+        if mutation_listeners:
+            buffers.save_offspring()
+        buffers.mutate(mutation_probability, self.rng)
+        if profiler is not None:
+            mark = profiler.lap("mutation", mark)
+        buffers.evaluate()
+        self.evaluations += children
+        if profiler is not None:
+            profiler.lap("evaluation", mark)
+            profiler.count(evaluated=children)
+        if mutation_listeners:
+            # Изменившиеся потомки отмечены в dirty, копии путей для сравнения не нужны
+            for i in np.flatnonzero(buffers.dirty[:children]).tolist():
+                chromosome = buffers.chromosome(buffers.count + i, incremental)
+                for listener in mutation_listeners:
+                    listener(buffers.old_path(i), buffers.old_fitness(i), chromosome.path, chromosome.fitness)
+        if profiler is not None:
+            mark = perf_counter_ns()
+
+        buffers.survive(self.population_size)
+        self._population = None
+        if profiler is not None:
+            profiler.lap("survivors", mark)
+            profiler.finish_generation(buffers.count)
+        if listeners["generation_finished"]:
+            for listener in listeners["generation_finished"]:
+                listener(generation_number, self.population)
+
+    def mutate_offspring(self, chromosomes, mutation_probability, evaluate):
+        """Мутация (и починка, если включена) потомков способом, заданным параметрами поколения."""
+        if self.batch_operators and self.mutation == "uniform":
+            self.batch_mutation(chromosomes, mutation_probability)
+        else:
+            neighbors = self.neighbors if self.mutation == "adjacent" else None
+            for chromosome in chromosomes:
+                chromosome.mutation(mutation_probability, evaluate=evaluate, neighbors=neighbors)
+        if self.repair:
+            for chromosome in chromosomes:
+                chromosome.repair(self.neighbors, evaluate=evaluate)
+
+    def _resample_known(self, chromosomes, originals, old_states, mutation_probability):
+        """
+        Мутанты, чьи пути уже есть в индексе, мутируются заново из пути до мутации
+        (до resample_attempts раз); оставшиеся известными отбрасываются до оценки.
+        Потомки этого поколения попадают в индекс только после оценки (см. _count_novel),
+        поэтому неизменившийся потомок с новым путём сам себя известным не делает.
+        :return: (оставленные мутанты, их old_states или None)
+        """
+        known = self.visited.contains([chromosome.path for chromosome in chromosomes])
+        for _ in range(self.resample_attempts):
+            redo = [i for i, is_known in enumerate(known) if is_known]
+            if not redo:
+                break
+            again = [chromosomes[i] for i in redo]
+            for i, chromosome in zip(redo, again):
+                chromosome.replace_path(originals[i])
+            self.mutate_offspring(again, mutation_probability, False)
+            self._novelty["resampled"] += len(again)
+            for i, is_known in zip(redo, self.visited.contains([chromosome.path for chromosome in again])):
+                known[i] = is_known
+        keep = [i for i, is_known in enumerate(known) if not is_known]
+        self._novelty["rejected"] += len(chromosomes) - len(keep)
+        if old_states is not None:
+            old_states = [old_states[i] for i in keep]
+        return [chromosomes[i] for i in keep], old_states
+
+    def _count_novel(self, paths):
+        """Добавляет оценённые пути в индекс и учитывает, сколько из них новых."""
+        novel = self.visited.add_paths(paths)
+        if self._novelty is not None:
+            self._novelty["evaluated"] += len(paths)
+            self._novelty["novel"] += novel
+
+    def get_novelty(self):
+        """
+        Новизна оценок последнего поколения: сколько хромосом оценено, сколько из них с впервые
+        встреченными путями, доля новых (novel_rate), сколько мутантов мутировано заново
+        и сколько отброшено до оценки. None, если индекс виденных путей не ведётся.
+        """
+        if self._novelty is None:
+            return None
+        novelty = dict(self._novelty)
+        novelty["novel_rate"] = novelty["novel"] / novelty["evaluated"] if novelty["evaluated"] else 0.0
+        return novelty
+
+    def subscribe(self, event, callback):
+        """
+        Подписывает callback на событие эволюции.
+        :param event: имя события из algorithm.events.EVENTS
+        :param callback: вызывается с аргументами события (см. EVENTS)
+        :return: callback, чтобы его можно было потом отписать
+        """
+        if event not in self._listeners:
+            raise ValueError(f"Неизвестное событие: {event}")
+        self._listeners[event].append(callback)
+        return callback
+
+    def unsubscribe(self, event, callback):
+        """Отписывает callback от события."""
+        self._listeners[event].remove(callback)
 
     def apply_mutations(self, population, mutation_probability):
         """
@@ -168,40 +526,82 @@ class Generation:
         :return: список элитных хромосом
         """
         num_elites = int(self.population_size * elitism_ratio)
-        sorted_population = sorted(self.population, key=lambda x: x.fitness)
-        return sorted_population[:num_elites]
+        return smallest(self.population, num_elites)
 
     def trim_population(self, population):
         """
         Обрезает популяцию до population_size, оставляя лучшие хромосомы.
         """
-        population.sort(key=lambda x: x.fitness)
-        return population[:self.population_size]
+        return smallest(population, self.population_size)
 
     def get_best_chromosome(self):
         """Возвращает лучшую хромосому в текущем поколении."""
+        if self._population is None:
+            return self._buffers.chromosome(self._buffers.best(), self.incremental_fitness)
         return min(self.population, key=lambda x: x.fitness)
 
+    def _fitness_values(self):
+        """Фитнес популяции списком int (с buffered - из буфера, без сборки хромосом)."""
+        if self._population is None:
+            return self._buffers.fitness_values().tolist()
+        return [chromosome.fitness for chromosome in self._population]
+
     def get_population_stats(self):
         """
-        Возвращает статистику популяции без процентов.
+        Возвращает статистику популяции без процентов в текстовом виде (format_stats от get_numeric_stats).
         """
-        fitness_values = [chromosome.fitness for chromosome in self.population]
-        best_fitness = min(fitness_values)
-        worst_fitness = max(fitness_values)
-        average_fitness = sum(fitness_values) / len(fitness_values)
+        return format_stats(self.get_numeric_stats())
+
+    def get_numeric_stats(self):
+        """Лучший, худший и средний фитнес популяции числами (inf - нет пути), как в индексе истории."""
+        return numeric_stats(self._fitness_values())
 
-        # Функция для форматирования фитнеса
-        def format_fitness(fitness):
-            if fitness >= sys.maxsize:
-                return "-"
-            return f"{fitness}"
+    def pack_population(self):
+        """Текущая популяция в компактном виде (PackedPopulation): общий буфер путей и вектор фитнеса."""
+        return PackedPopulation.from_chromosomes(self.population)
 
-        return {
-            "best_fitness": format_fitness(best_fitness),
-            "worst_fitness": format_fitness(worst_fitness),
-            "average_fitness": format_fitness(average_fitness),
-        }
+    def get_state(self):
+        """
+        Состояние поколения для контрольной точки (см. algorithm.checkpoint): настройки, счётчики,
+        генератор пакетных операторов и популяция в компактном виде. Подписчики и профайлер
+        не сохраняются.
+        """
+        state = {name: getattr(self, name) for name in STATE_FIELDS}
+        state["buffered"] = self.buffered
+        state["population"] = self.pack_population()
+        return state
+
+    @classmethod
+    def from_state(cls, network, state, verbosity=EventLevel.OFF, profiler=None):
+        """Поколение из состояния get_state на той же сети; начальная популяция не создаётся."""
+        generation = cls.__new__(cls)
+        generation.network = network
+        for name in STATE_FIELDS:
+            setattr(generation, name, state[name])
+        uses_edges = generation.initialization == "walk" or generation.mutation == "adjacent" or generation.repair
+        generation.neighbors = network.neighbor_index() if uses_edges else None
+        generation._listeners = {event: [] for event in EVENTS}
+        if verbosity > EventLevel.OFF:
+            PrintSink(verbosity).attach(generation)
+        generation.profiler = profiler
+        generation._novelty = None
+        generation.buffered = state.get("buffered", False)
+        generation._buffers = None
+        generation._population = None
+        if generation.buffered:
+            generation._buffers = PopulationBuffers(network, generation.population_size,
+                                                    2 * generation.crossover_pairs(), generation.max_length)
+        generation.population = state["population"].to_chromosomes(network, generation.incremental_fitness)
+        return generation
+
+    def get_generation_profile(self):
+        """
+        Замеры последнего поколения (словарь из простых типов, пригодный для JSON)
+        или None, если профайлер не задан.
+        """
+        if self.profiler is None:
+            return None
+        return self.profiler.last()
 
     def __repr__(self):
         return f"Generation(population_size={self.population_size}, population={self.population})"
\ No newline at end of file
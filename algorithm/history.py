@@ -0,0 +1,272 @@
+import mmap
+import struct
+import sys
+from array import array
+
+import numpy as np
+
+# Файл индекса: сигнатура, затем записи фиксированного размера, по одной на поколение:
+# смещение и длина записи поколения в файле данных, номер поколения, лучший/худший/средний фитнес
+INDEX_MAGIC = b"GAHIST1\0"
+INDEX_RECORD = struct.Struct("<QIIddd")
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4"), ("gen", "<u4"),
+                        ("best", "<f8"), ("worst", "<f8"), ("average", "<f8")])
+
+_COUNT = struct.Struct("<I")
+_FITNESS = struct.Struct("<q")
+_CROSS_LINE = struct.Struct("<i")
+
+
+def index_path(path):
+    """Путь к файлу индекса для файла данных path."""
+    return f"{path}.idx"
+
+
+def numeric_fitness(fitness):
+    """Фитнес как число: inf для неправильного пути."""
+    return float("inf") if fitness >= sys.maxsize else float(fitness)
+
+
+def numeric_stats(fitness_values):
+    """Лучший, худший и средний фитнес (числа, inf - нет пути) по списку фитнесов популяции."""
+    return {
+        "best_fitness": numeric_fitness(min(fitness_values)),
+        "worst_fitness": numeric_fitness(max(fitness_values)),
+        "average_fitness": numeric_fitness(sum(fitness_values) / len(fitness_values)),
+    }
+
+
+class HistoryWriter:
+    """
+    Потоковая запись истории запуска: каждое поколение дописывается в конец файла данных,
+    а в индекс добавляется запись фиксированного размера. В памяти держится только
+    текущее поколение.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: путь к файлу данных (индекс пишется рядом, см. index_path)
+        """
+        self.path = path
+        self._data = open(path, "wb")
+        self._index = open(index_path(path), "wb")
+        self._index.write(INDEX_MAGIC)
+        self._offset = 0
+        self._crossovers = []
+        self._mutations = []
+        self._generation = None
+
+    def attach(self, generation):
+        """
+        Подписывается на события поколения и пишет каждое завершённое поколение;
+        статистика в индекс берётся из generation.get_numeric_stats.
+        """
+        self._generation = generation
+        generation.subscribe("crossover", self._on_crossover)
+        generation.subscribe("mutation", self._on_mutation)
+        generation.subscribe("generation_finished", self._on_generation_finished)
+        return self
+
+    def _on_crossover(self, parent1, parent2, child1, child2, cross_line):
+        self._crossovers.append(((parent1.path, parent1.fitness), (parent2.path, parent2.fitness),
+                                 (child1.path, child1.fitness), (child2.path, child2.fitness), cross_line))
+
+    def _on_mutation(self, old_path, old_fitness, new_path, new_fitness):
+        self._mutations.append(((old_path, old_fitness), (new_path, new_fitness)))
+
+    def _on_generation_finished(self, generation_number, population):
+        self.append(generation_number, [(chromosome.path, chromosome.fitness) for chromosome in population],
+                    self._crossovers, self._mutations, self._generation.get_numeric_stats())
+        self._crossovers = []
+        self._mutations = []
+
+    def append(self, generation_number, population, crossovers=(), mutations=(), stats=None):
+        """
+        Дописывает поколение.
+        :param population: список (путь, фитнес)
+        :param crossovers: список (родитель1, родитель2, потомок1, потомок2, линия), элементы - (путь, фитнес)
+        :param mutations: список (было, стало), элементы - (путь, фитнес)
+        :param stats: числовая статистика популяции (см. numeric_stats); None - посчитать по population
+        """
+        parts = [_COUNT.pack(len(population))]
+        for path, fitness in population:
+            _encode(parts, path, fitness)
+        parts.append(_COUNT.pack(len(crossovers)))
+        for parent1, parent2, child1, child2, cross_line in crossovers:
+            for path, fitness in (parent1, parent2, child1, child2):
+                _encode(parts, path, fitness)
+            parts.append(_CROSS_LINE.pack(cross_line))
+        parts.append(_COUNT.pack(len(mutations)))
+        for (old_path, old_fitness), (new_path, new_fitness) in mutations:
+            _encode(parts, old_path, old_fitness)
+            _encode(parts, new_path, new_fitness)
+        payload = b"".join(parts)
+
+        if stats is None and population:
+            stats = numeric_stats([fitness for _, fitness in population])
+        if stats is not None:
+            best, worst, average = stats["best_fitness"], stats["worst_fitness"], stats["average_fitness"]
+        else:
+            best = worst = average = float("nan")
+
+        self._data.write(payload)
+        self._data.flush()
+        # Индекс пишется после данных, чтобы читатель никогда не увидел запись без данных
+        self._index.write(INDEX_RECORD.pack(self._offset, len(payload), generation_number, best, worst, average))
+        self._index.flush()
+        self._offset += len(payload)
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HistoryReader:
+    """
+    Чтение истории через отображение файлов в память: поколение N декодируется
+    по требованию, остальные поколения не загружаются.
+    Поддерживает len() и history[i] с тем же форматом словаря, что и история в main.py.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._files = []
+        self._maps = []
+        self._data = self._map(path)
+        index = self._map(index_path(path))
+        if index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{index_path(path)} не является индексом истории")
+        count = (len(index) - len(INDEX_MAGIC)) // INDEX_RECORD.size
+        self.index = np.frombuffer(index, dtype=INDEX_DTYPE, count=count, offset=len(INDEX_MAGIC))
+
+    def _map(self, path):
+        file = open(path, "rb")
+        self._files.append(file)
+        size = file.seek(0, 2)
+        if size == 0:
+            return b""
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapping)
+        return mapping
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("нет такого поколения")
+        record = self.index[i]
+        offset = int(record["offset"])
+        view = memoryview(self._data)[offset:offset + int(record["length"])]
+
+        pos = 0
+        population, pos = _decode_list(view, pos, 1)
+        crossovers = []
+        count, = _COUNT.unpack_from(view, pos)
+        pos += _COUNT.size
+        for _ in range(count):
+            items = []
+            for _ in range(4):
+                item, pos = _decode(view, pos)
+                items.append(item)
+            cross_line, = _CROSS_LINE.unpack_from(view, pos)
+            pos += _CROSS_LINE.size
+            crossovers.append({"parent1": items[0], "parent2": items[1], "child1": items[2], "child2": items[3],
+                               "cross_line": cross_line})
+        mutations, pos = _decode_list(view, pos, 2)
+        view.release()
+
+        return {
+            "gen": int(record["gen"]),
+            "stats": self.stats(i),
+            "population": [item for item, in population],
+            "crossover": crossovers,
+            "mutation": [{"old": old, "new": new} for old, new in mutations],
+        }
+
+    def stats(self, i):
+        """Числовая статистика поколения i из индекса, как get_numeric_stats (текст - format_stats)."""
+        record = self.index[i]
+        return {
+            "best_fitness": float(record["best"]),
+            "worst_fitness": float(record["worst"]),
+            "average_fitness": float(record["average"]),
+        }
+
+    def fitness_series(self):
+        """Лучший, худший и средний фитнес всех поколений (numpy-массивы без копирования, inf - нет пути)."""
+        return {
+            "best_fitness": self.index["best"],
+            "worst_fitness": self.index["worst"],
+            "average_fitness": self.index["average"],
+        }
+
+    def close(self):
+        self.index = None
+        self._data = None
+        for mapping in self._maps:
+            try:
+                mapping.close()
+            except BufferError:
+                # На отображение ещё ссылаются массивы из fitness_series; его освободит сборщик мусора
+                pass
+        for file in self._files:
+            file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def fitness_series(history):
+    """
+    Лучший, худший и средний фитнес по поколениям в виде массивов float64 (inf - нет пути).
+    HistoryReader отдаёт их из индекса; для истории-списка они считаются по фитнесу популяций,
+    без разбора текстовой статистики.
+    """
+    if hasattr(history, "fitness_series"):
+        return history.fitness_series()
+    stats = [numeric_stats([fitness for _, fitness in entry["population"]]) for entry in history]
+    return {name: np.array([item[name] for item in stats], dtype=np.float64)
+            for name in ("best_fitness", "worst_fitness", "average_fitness")}
+
+
+def _encode(parts, path, fitness):
+    parts.append(_COUNT.pack(len(path)))
+    parts.append(array("i", path).tobytes())
+    parts.append(_FITNESS.pack(fitness))
+
+
+def _decode(view, pos):
+    length, = _COUNT.unpack_from(view, pos)
+    pos += _COUNT.size
+    path = array("i")
+    path.frombytes(view[pos:pos + 4 * length])
+    pos += 4 * length
+    fitness, = _FITNESS.unpack_from(view, pos)
+    pos += _FITNESS.size
+    return (path.tolist(), fitness), pos
+
+
+def _decode_list(view, pos, width):
+    count, = _COUNT.unpack_from(view, pos)
+    pos += _COUNT.size
+    items = []
+    for _ in range(count):
+        group = []
+        for _ in range(width):
+            item, pos = _decode(view, pos)
+            group.append(item)
+        items.append(tuple(group))
+    return items, pos
+
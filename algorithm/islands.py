@@ -0,0 +1,166 @@
+import os
+import random
+import time
+
+from algorithm.generation import Generation
+from algorithm.parallel import pool_context
+from algorithm.population import PackedPopulation
+from algorithm.selection import smallest
+
+
+class IslandModel:
+    """
+    Островная модель: несколько независимых популяций Generation в отдельных процессах
+    над одной сетью. Каждые migration_interval поколений лучшие migration_size хромосом
+    каждого острова переселяются на соседние острова согласно топологии.
+    """
+
+    def __init__(self, network, islands=4, migration_interval=10, migration_size=2, topology="ring",
+                 seed=None, **generation_kwargs):
+        """
+        :param network: общая для всех островов сеть (только для чтения)
+        :param islands: количество островов (процессов)
+        :param migration_interval: через сколько поколений происходит миграция
+        :param migration_size: сколько лучших хромосом отправляет каждый остров
+        :param topology: "ring" - остров i отправляет мигрантов острову i + 1,
+                         "full" - каждый остров отправляет мигрантов всем остальным
+        :param seed: зерно генератора; у каждого острова своё производное зерно
+        :param generation_kwargs: параметры Generation для каждого острова
+        """
+        if topology not in ("ring", "full"):
+            raise ValueError(f"Неизвестная топология: {topology}")
+        self.network = network
+        self.islands = max(1, islands)
+        self.migration_interval = max(1, migration_interval)
+        self.migration_size = migration_size
+        self.topology = topology
+        self.generation_kwargs = generation_kwargs
+        seeder = random.Random(seed)
+        self.seeds = [seeder.getrandbits(32) for _ in range(self.islands)]
+
+    def destinations(self, index):
+        """Острова, которым остров index отправляет мигрантов."""
+        if self.islands == 1:
+            return []
+        if self.topology == "ring":
+            return [(index + 1) % self.islands]
+        return [other for other in range(self.islands) if other != index]
+
+    def run(self, max_generations, mutation_probability=0.5, target_fitness=None):
+        """
+        Запускает эволюцию на всех островах.
+        :param max_generations: максимальное количество поколений на каждом острове
+        :param mutation_probability: вероятность мутации вершины
+        :param target_fitness: если задан, остановиться, как только глобальный лучший фитнес его достигнет
+        :return: словарь с глобальным лучшим путём, его фитнесом и статистикой по островам
+        """
+        # Оптимум и общие данные сети считаем до запуска процессов, чтобы острова получили их
+        # вместе со снимком сети
+        self.network.shortest_distance(self.network.start, self.network.end)
+        self.network.prepare_shared()
+        context = pool_context()
+        connections = []
+        processes = []
+        for index in range(self.islands):
+            parent_conn, child_conn = context.Pipe()
+            # При fork сеть достаётся процессу из снимка памяти, при spawn передаётся один раз при запуске
+            process = context.Process(target=_island_worker,
+                                      args=(child_conn, self.network, self.seeds[index], self.generation_kwargs,
+                                            mutation_probability, self.migration_size),
+                                      daemon=True)
+            process.start()
+            child_conn.close()
+            connections.append(parent_conn)
+            processes.append(process)
+
+        max_generations = max(1, max_generations)
+        started = time.perf_counter()
+        time_to_target = None
+        generations = 0
+        inbox = [[] for _ in range(self.islands)]
+        try:
+            while generations < max_generations:
+                steps = min(self.migration_interval, max_generations - generations)
+                for conn, immigrants in zip(connections, inbox):
+                    conn.send((steps, immigrants))
+                replies = [conn.recv() for conn in connections]
+                generations += steps
+
+                inbox = [[] for _ in range(self.islands)]
+                for index, (emigrants, _) in enumerate(replies):
+                    for destination in self.destinations(index):
+                        inbox[destination].append(emigrants)
+
+                best_fitness = min(stats["best_fitness"] for _, stats in replies)
+                if target_fitness is not None and best_fitness <= target_fitness:
+                    time_to_target = time.perf_counter() - started
+                    break
+        finally:
+            for conn in connections:
+                conn.send(None)
+            for process in processes:
+                process.join()
+
+        island_stats = [stats for _, stats in replies]
+        best = min(island_stats, key=lambda stats: stats["best_fitness"])
+        return {
+            "best_path": best["best_path"],
+            "best_fitness": best["best_fitness"],
+            "generations": generations,
+            "elapsed": time.perf_counter() - started,
+            "time_to_target": time_to_target,
+            "islands": island_stats,
+        }
+
+
+def pack_migrants(chromosomes):
+    """Мигранты в компактном виде: общий буфер путей, смещения и вектор фитнеса (PackedPopulation)."""
+    return PackedPopulation.from_chromosomes(chromosomes)
+
+
+def accept_migrants(generation, packed):
+    """
+    Заменяет худшие хромосомы популяции мигрантами, пропуская уже имеющиеся пути.
+    Фитнес мигрантов не пересчитывается: все острова работают с одной и той же сетью.
+    """
+    seen = {chromosome.path.tobytes() for chromosome in generation.population}
+    newcomers = []
+    for chromosome in packed.to_chromosomes(generation.network, generation.incremental_fitness):
+        path_key = chromosome.path.tobytes()
+        if path_key not in seen:
+            seen.add(path_key)
+            newcomers.append(chromosome)
+    if not newcomers:
+        return
+    keep = max(0, min(len(generation.population), generation.population_size) - len(newcomers))
+    generation.population = smallest(generation.population, keep) + newcomers
+
+
+def _island_worker(conn, network, seed, generation_kwargs, mutation_probability, migration_size):
+    """Процесс острова: хранит свою популяцию и выполняет команды координатора."""
+    random.seed(seed)
+    generation = Generation(network, **generation_kwargs)
+    generation_number = 0
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        steps, immigrants = message
+        for packed in immigrants:
+            accept_migrants(generation, packed)
+        for _ in range(steps):
+            generation_number += 1
+            generation.evolve(generation_number, mutation_probability)
+
+        top = smallest(generation.population, max(1, migration_size))
+        fitness_values = [chromosome.fitness for chromosome in generation.population]
+        stats = {
+            "best_path": list(top[0].path),
+            "best_fitness": top[0].fitness,
+            "worst_fitness": max(fitness_values),
+            "average_fitness": sum(fitness_values) / len(fitness_values),
+            "generations": generation_number,
+            "pid": os.getpid(),
+        }
+        conn.send((pack_migrants(top[:migration_size]), stats))
+    conn.close()
@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+
+
+class NeighborIndex:
+    """
+    Соседи вершин без учёта направления (как в get_weight): CSR-массивы indptr/indices,
+    где соседи вершины v - indices[indptr[v]:indptr[v + 1]] по возрастанию.
+    Для поиска общих соседей строки по требованию превращаются в множества; случайный выбор
+    идёт из отсортированных кандидатов, чтобы не зависеть от порядка обхода множеств.
+    """
+
+    def __init__(self, size, indptr, indices):
+        self.size = size
+        self.indptr = indptr
+        self.indices = indices
+        self._sets = [None] * size
+
+    @classmethod
+    def from_adjacency(cls, size, indptr, indices):
+        """Индекс по спискам смежности верхнего треугольника (см. Network.adjacency)."""
+        rows = np.repeat(np.arange(size, dtype=np.int64), np.diff(indptr))
+        cols = indices.astype(np.int64)
+        sources = np.concatenate([rows, cols])
+        targets = np.concatenate([cols, rows])
+        order = np.lexsort((targets, sources))
+        neighbor_indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=size), out=neighbor_indptr[1:])
+        return cls(size, neighbor_indptr, targets[order].astype(np.int32))
+
+    def neighbors(self, v):
+        """Соседи вершины v (массив int32, по возрастанию)."""
+        return self.indices[self.indptr[v]:self.indptr[v + 1]]
+
+    def degree(self, v):
+        return int(self.indptr[v + 1] - self.indptr[v])
+
+    def neighbor_set(self, v):
+        """Соседи вершины v в виде множества (строится один раз на вершину)."""
+        neighbors = self._sets[v]
+        if neighbors is None:
+            neighbors = frozenset(self.neighbors(v).tolist())
+            self._sets[v] = neighbors
+        return neighbors
+
+    def is_adjacent(self, a, b):
+        """Есть ли ребро a - b (вершина смежна сама с собой, как в get_weight)."""
+        return a == b or b in self.neighbor_set(a)
+
+    def common(self, a, b):
+        """Общие соседи вершин a и b (множество)."""
+        return self.neighbor_set(a) & self.neighbor_set(b)
+
+    def random_common(self, a, b, exclude=None):
+        """Случайный общий сосед a и b, отличный от exclude, или None, если такого нет."""
+        candidates = self.common(a, b)
+        if exclude in candidates:
+            candidates = candidates - {exclude}
+        if not candidates:
+            return None
+        return random.choice(sorted(candidates))
+
+    def random_walk(self, start, end, length, attempts=10):
+        """
+        Путь из length вершин от start до end по рёбрам графа: случайное блуждание из start
+        на length - 3 шага, затем общий сосед текущей вершины и end. Вершины не повторяются.
+        :param attempts: сколько раз начинать блуждание заново, если оно зашло в тупик
+        :return: список вершин или None, если за attempts попыток путь не нашёлся
+        """
+        if length <= 2:
+            return [start, end] if self.is_adjacent(start, end) else None
+        for _ in range(attempts):
+            path = [start]
+            visited = {start, end}
+            current = start
+            for _ in range(length - 3):
+                choices = self.neighbor_set(current) - visited
+                if not choices:
+                    break
+                current = random.choice(sorted(choices))
+                visited.add(current)
+                path.append(current)
+            if len(path) < length - 2:
+                continue
+            candidates = self.common(current, end) - visited
+            if candidates:
+                path.append(random.choice(sorted(candidates)))
+                path.append(end)
+                return path
+        return None
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f"NeighborIndex(size={self.size}, edges={len(self.indices) // 2})"
@@ -1,12 +1,45 @@
+import os
 import random
-import sys
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from algorithm import apsp, sssp, storage
+from algorithm.cache import FitnessCache
+from algorithm.neighbors import NeighborIndex
+from algorithm.sparse import CSRGraph
 
 class Network:
-    def __init__(self, size, density=0.5, max_weight=10, start=None, end=None):
-        if size < 10:
+    # Сколько источников Дейкстры помнить (см. shortest_paths)
+    SHORTEST_PATHS_CACHE = 256
+
+    def __init__(self, size, density=0.5, max_weight=10, start=None, end=None, backend="dense",
+                 fitness_cache_size=None, graph=None):
+        """
+        :param backend: "dense" - матрица смежности списком списков,
+                        "sparse" - CSR-массивы, память и время генерации O(V + E)
+        :param fitness_cache_size: размер LRU-кэша фитнеса путей (None - без кэша)
+        :param graph: готовый граф (CSRGraph или список списков) вместо случайного;
+                      backend тогда определяется по нему, а size берётся из графа
+        """
+        if graph is not None:
+            size = len(graph)
+            backend = "sparse" if isinstance(graph, CSRGraph) else "dense"
+        elif size < 10:
             size = 10
+        if backend not in ("dense", "sparse"):
+            raise ValueError(f"Неизвестный backend: {backend}")
         self.size = size
-        self.graph = self.generate_upper_triangular_graph(size, density, max_weight)
+        self.backend = backend
+        if graph is not None:
+            self.graph = graph
+        elif backend == "sparse":
+            self.graph = CSRGraph.generate(size, density, max_weight)
+        else:
+            self.graph = self.generate_upper_triangular_graph(size, density, max_weight)
+        # Файл, из которого сеть загружена (см. load); пока граф не менялся, процессам передаётся только путь
+        self.source = None
 
         # Если начальная вершина не задана, выбираем случайно
         if start is None:
@@ -25,6 +58,76 @@ class Network:
         self.dist_matrix = None
         self.next_node = None
 
+        # Матрица весов в виде массива для векторной оценки путей (строится по требованию)
+        self._weight_array = None
+
+        # Списки смежности (CSR) и кратчайшие пути из отдельных вершин, по требованию
+        self._adjacency = None
+        self._neighbors = None
+        self._shortest_paths = OrderedDict()
+
+        # Общий для всех запусков ГА на этой сети кэш фитнеса
+        self.fitness_cache = FitnessCache(fitness_cache_size) if fitness_cache_size else None
+
+        # Классы хромосом, привязанные к этой сети (см. Chromosome.bound_class)
+        self._chromosome_classes = {}
+
+    def __getstate__(self):
+        if self.source is not None:
+            # Загруженная сеть передаётся путём к файлу: получатель отображает тот же файл
+            cache_size = self.fitness_cache.maxsize if self.fitness_cache is not None else None
+            return {"_load": (self.source, self.start, self.end, cache_size)}
+        state = self.__dict__.copy()
+        # Привязанные классы создаются динамически, на стороне получателя они создаются заново
+        state["_chromosome_classes"] = {}
+        return state
+
+    def __setstate__(self, state):
+        if "_load" in state:
+            source, start, end, cache_size = state["_load"]
+            state = Network.load(source, fitness_cache_size=cache_size).__dict__
+            state["start"], state["end"] = start, end
+        self.__dict__.update(state)
+
+    def save(self, path, indexes=True):
+        """
+        Сохраняет сеть в компактный двоичный файл (см. algorithm.storage): граф в виде CSR,
+        start/end и уже вычисленные данные (Флойд, индекс соседей), если indexes=True.
+        """
+        storage.save_network(self, path, indexes)
+
+    @classmethod
+    def load(cls, path, verify=False, fitness_cache_size=None):
+        """
+        Открывает сеть из файла (см. save). Массивы не копируются, а отображаются в память
+        только для чтения, поэтому время открытия не зависит от размера графа.
+        Сохранённые данные Флойда и индекса соседей используются, только если их подтверждает
+        файл контрольных сумм. Сеть всегда получается с backend="sparse".
+        :param verify: пересчитать хеши разделов (см. storage.NetworkFile)
+        """
+        data = storage.NetworkFile(path, verify)
+        graph = CSRGraph(data.size, data.get("indptr"), data.get("indices"), data.get("weights"))
+        network = cls(data.size, start=data.start, end=data.end, graph=graph, fitness_cache_size=fitness_cache_size)
+        network.source = os.path.abspath(path)
+        dist, next_node = data.get("dist"), data.get("next")
+        if dist is not None and next_node is not None:
+            network.dist_matrix, network.next_node = dist, next_node
+            network.calculated = True
+        neighbor_indptr, neighbor_indices = data.get("neighbor_indptr"), data.get("neighbor_indices")
+        if neighbor_indptr is not None and neighbor_indices is not None:
+            network._neighbors = NeighborIndex(data.size, neighbor_indptr, neighbor_indices)
+        # Массивы сети - представления отображения файла: оно закрывается вместе с сетью
+        weakref.finalize(network, data.close)
+        return network
+
+    def route(self, start, end):
+        """
+        Вид сети с другими начальной и конечной вершинами (Route) для решения нескольких запросов
+        на одном графе: граф, массив весов, кратчайшие пути
+        (Флойд и Дейкстра) и кэш фитнеса общие с этой сетью.
+        """
+        return Route(self, start, end)
+
     def generate_upper_triangular_graph(self, size, density, max_weight):
         """Создаёт верхнюю треугольную матрицу смежности."""
         graph = [[None] * size for _ in range(size)]
@@ -41,8 +144,114 @@ class Network:
         """Возвращает вес пути между вершинами a и b (или None, если пути нет)."""
         if a > b:
             a, b = b, a  # Теперь меняем местами наоборот
+        if self.backend == "sparse":
+            return self.graph.weight(a, b)
         return self.graph[a][b]
 
+    def set_weight(self, a, b, weight):
+        """
+        Изменяет вес ребра между a и b (None - удалить ребро).
+        Сбрасывает всё, что вычислено по старым весам: кратчайшие пути, массив весов и кэш фитнеса.
+        """
+        if a == b:
+            raise ValueError("Вес пути вершины к самой себе всегда равен 0")
+        if a > b:
+            a, b = b, a
+        if self.backend == "sparse":
+            self.graph = self.graph.with_weight(a, b, weight)
+        else:
+            self.graph[a][b] = weight
+        self.source = None  # Граф больше не совпадает с файлом
+        self.invalidate()
+
+    def invalidate(self):
+        """Сбрасывает данные, вычисленные по весам графа."""
+        self.calculated = False
+        self.dist_matrix = None
+        self.next_node = None
+        self._weight_array = None
+        self._adjacency = None
+        self._neighbors = None
+        self._shortest_paths.clear()
+        if self.fitness_cache is not None:
+            self.fitness_cache.clear()
+
+    def lookup_weights(self, a, b):
+        """
+        Векторный аналог get_weight для массивов вершин a и b.
+        :return: массив весов, -1 там, где ребра нет
+        """
+        lo = np.minimum(a, b)
+        hi = np.maximum(a, b)
+        if self.backend == "sparse":
+            return self.graph.lookup(lo, hi)
+        return self.weight_array().take(lo * self.size + hi)
+
+    def weight_array(self):
+        """Матрица весов dense-сети в виде массива int64 (-1 - ребра нет), строится один раз."""
+        if self._weight_array is None:
+            weights = np.array([[-1 if w is None else w for w in row] for row in self.graph], dtype=np.int64)
+            self._weight_array = weights
+        return self._weight_array
+
+    def adjacency(self):
+        """Списки смежности в формате CSR: (indptr, indices, weights), строятся один раз."""
+        if self._adjacency is None:
+            if self.backend == "sparse":
+                self._adjacency = (self.graph.indptr, self.graph.indices, self.graph.weights)
+            else:
+                self._adjacency = sssp.dense_adjacency(self.weight_array())
+        return self._adjacency
+
+    def prepare_shared(self):
+        """
+        Заранее строит данные, общие для процессов-исполнителей (матрица весов dense-сети,
+        списки смежности), чтобы процессы получили их готовыми, а не строили каждый сам.
+        """
+        if self.backend == "dense":
+            self.weight_array()
+        self.adjacency()
+
+    def neighbor_index(self):
+        """Соседи вершин без учёта направления (NeighborIndex), строятся один раз."""
+        if self._neighbors is None:
+            indptr, indices, _ = self.adjacency()
+            self._neighbors = NeighborIndex.from_adjacency(self.size, indptr, indices)
+        return self._neighbors
+
+    def shortest_paths(self, source):
+        """
+        Кратчайшие пути из вершины source (Дейкстра), запоминаются для последних
+        SHORTEST_PATHS_CACHE источников.
+        :return: (dist, prev) - см. sssp.dijkstra
+        """
+        result = self._shortest_paths.get(source)
+        if result is None:
+            result = sssp.dijkstra(*self.adjacency(), source)
+            self._shortest_paths[source] = result
+            if len(self._shortest_paths) > self.SHORTEST_PATHS_CACHE:
+                self._shortest_paths.popitem(last=False)
+        else:
+            self._shortest_paths.move_to_end(source)
+        return result
+
+    def shortest_distance(self, start, end):
+        """
+        Длина кратчайшего пути start -> end (sys.maxsize, если пути нет), как dist_matrix[start][end].
+        Если Флойд уже посчитан, берётся его результат, иначе - Дейкстра из start.
+        """
+        if self.calculated:
+            return int(self.dist_matrix[start][end])
+        dist, _ = self.shortest_paths(start)
+        return sssp.distance(dist, end)
+
+    def shortest_path(self, start, end):
+        """Кратчайший путь start -> end ([] - пути нет); Флойд не запускается, если ещё не посчитан."""
+        if self.calculated:
+            return self.reconstruct_path(start, end, self.next_node)
+        _, prev = self.shortest_paths(start)
+        return sssp.path_to(prev, start, end)
+
     def print_graph_with_vertices(self):
         """Выводит граф (матрицу смежности) с подписями вершин."""
         # Заголовок (номера столбцов)
@@ -55,57 +264,133 @@ class Network:
             row = [self.graph[i][j] if self.graph[i][j] is not None else "-" for j in range(self.size)]
             print(f"{i:2} | " + " ".join(f"{x:4}" if x != "-" else "   -" for x in row))
 
-    def floyd(self):
-        dist_matrix = [[sys.maxsize] * self.size for _ in range(self.size)]
-        next_node = [[None] * self.size for _ in range(self.size)]
-
+    def edges(self):
+        """
+        Возвращает рёбра верхнего треугольника в виде трёх массивов (rows, cols, weights).
+        """
+        if self.backend == "sparse":
+            return self.graph.edges()
+        rows, cols, weights = [], [], []
         for i in range(self.size):
-            for j in range(self.size):
-                if i == j:
-                    dist_matrix[i][j] = 0
-                elif self.graph[i][j] is not None:
-                    dist_matrix[i][j] = self.graph[i][j]
-                    next_node[i][j] = j
-
-        for k in range(self.size):
-            for i in range(self.size):
-                for j in range(self.size):
-                    if (dist_matrix[i][k] != sys.maxsize and
-                            dist_matrix[k][j] != sys.maxsize and
-                            dist_matrix[i][j] > dist_matrix[i][k] + dist_matrix[k][j]):
-                        dist_matrix[i][j] = dist_matrix[i][k] + dist_matrix[k][j]
-                        next_node[i][j] = next_node[i][k]
-
-        self.dist_matrix = dist_matrix
-        self.next_node = next_node
+            row = self.graph[i]
+            for j in range(i + 1, self.size):
+                if row[j] is not None:
+                    rows.append(i)
+                    cols.append(j)
+                    weights.append(row[j])
+        return (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64),
+                np.array(weights, dtype=np.int64))
+
+    def floyd(self, block_rows=None):
+        """
+        Кратчайшие пути между всеми парами вершин (алгоритм Флойда на NumPy).
+        Результат кэшируется в dist_matrix и next_node, повторный вызов его переиспользует.
+        :param block_rows: размер блока строк для варианта с разбиением на блоки;
+                           если None, выбирается автоматически по размеру графа
+        """
+        if self.calculated:
+            return self.dist_matrix, self.next_node
+
+        if block_rows is None and self.size * self.size * 8 > apsp.BLOCK_BYTES:
+            block_rows = apsp.tiled_block_rows(self.size)
+
+        dist = apsp.weight_matrix(self.size, self.edges())
+        dist, next_node = apsp.floyd_warshall(dist, block_rows)
+
+        self.dist_matrix, self.next_node = apsp.to_lists(dist, next_node)
         self.calculated = True
 
-        return dist_matrix, next_node
+        return self.dist_matrix, self.next_node
 
     def reconstruct_path(self, start, end, next_node):
+        # next_node - списки с None или массив с -1 (загруженный из файла, см. load)
         path = [start]
-        if next_node[start][end] is None:
+        if next_node[start][end] is None or next_node[start][end] < 0:
             return []
         while start != end:
             next_step = next_node[start][end]
-            if next_step is None:
+            if next_step is None or next_step < 0:
                 return []  # Нет пути
-            start = next_step
+            start = int(next_step)
             path.append(start)
         return path
 
     def print_optimal_solution(self):
         """
-        Выводит оптимальный путь и его длину, используя алгоритм Флойда.
+        Выводит оптимальный путь и его длину (Дейкстра из начальной вершины или готовый результат Флойда).
         """
-        # Вычисляем кратчайшие пути
-        dist_matrix, next_node = self.floyd()
-
-        # Восстанавливаем оптимальный путь
-        optimal_path = self.reconstruct_path(self.start, self.end, next_node)
-        optimal_fitness = dist_matrix[self.start][self.end]
+        optimal_path = self.shortest_path(self.start, self.end)
+        optimal_fitness = self.shortest_distance(self.start, self.end)
 
         # Выводим результат
-        print("\nОптимальное решение по Флойду:")
+        print("\nОптимальное решение:")
         print(f"Путь: {optimal_path}")
         print(f"Длина: {optimal_fitness}")
+
+
+class Route:
+    """
+    Запрос маршрута start -> end на общей сети. Для Chromosome и Generation ведёт себя как Network,
+    но ничего не копирует: веса, кратчайшие пути и кэш фитнеса берутся у исходной сети,
+    поэтому Дейкстра из одной вершины (или Флойд) считается один раз на все запросы.
+    """
+
+    def __init__(self, network, start, end):
+        """
+        :param network: исходная сеть
+        :param start: начальная вершина
+        :param end: конечная вершина; мутация выбирает промежуточные вершины строго между
+                    start и end, поэтому нужно start + 2 <= end
+        """
+        if not 0 <= start < end < network.size or end - start < 2:
+            raise ValueError(f"Нужно 0 <= start, start + 2 <= end < {network.size}: {start} -> {end}")
+        self.base = network
+        self.size = network.size
+        self.backend = network.backend
+        self.start = start
+        self.end = end
+        self.fitness_cache = network.fitness_cache
+        for name in _SHARED_METHODS:
+            setattr(self, name, getattr(network, name))
+        self._chromosome_classes = {}
+
+    @property
+    def graph(self):
+        return self.base.graph
+
+    @property
+    def calculated(self):
+        return self.base.calculated
+
+    @property
+    def dist_matrix(self):
+        return self.base.dist_matrix
+
+    @property
+    def next_node(self):
+        return self.base.next_node
+
+    reconstruct_path = Network.reconstruct_path
+    print_optimal_solution = Network.print_optimal_solution
+    print_graph_with_vertices = Network.print_graph_with_vertices
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Связанные методы исходной сети восстанавливаются по ней самой
+        for name in _SHARED_METHODS:
+            del state[name]
+        state["_chromosome_classes"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in _SHARED_METHODS:
+            setattr(self, name, getattr(self.base, name))
+
+    def __repr__(self):
+        return f"Route(start={self.start}, end={self.end}, size={self.size})"
+
+
+# Методы исходной сети, которые Route использует как свои
+_SHARED_METHODS = ("get_weight", "lookup_weights", "weight_array", "edges", "floyd", "adjacency",
+                   "neighbor_index", "shortest_paths", "shortest_distance", "shortest_path")
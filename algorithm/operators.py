@@ -0,0 +1,85 @@
+import numpy as np
+
+from algorithm.fitness import pack_flat
+from algorithm.population import PackedPopulation
+
+
+def draw_cut_lines(rng, first_lengths, second_lengths):
+    """
+    Точки разбиения для пар, как при crossover(random_or_not=True): случайная позиция
+    0..max_length-1 среди промежуточных вершин (0, если их нет), затем 0 заменяется на 2.
+    :param rng: numpy.random.Generator
+    :param first_lengths: длины полных путей первых родителей
+    :param second_lengths: длины полных путей вторых родителей
+    """
+    max_length = np.maximum(first_lengths, second_lengths) - 2
+    lines = rng.integers(0, np.maximum(max_length, 1))
+    lines[lines == 0] = 2
+    return lines
+
+
+def crossover_packed(network, first, second, lines):
+    """
+    Кроссовер всех пар одним векторным шагом, по тем же правилам, что Chromosome.crossover.
+    Потомок 1 наследует длину пути первого родителя, потомок 2 - второго; промежуточные
+    позиции line..m-1 (m - длина более короткого промежуточного пути) берутся у другого
+    родителя, концы пути - начальная и конечная вершины сети.
+    :param first: пути первых родителей
+    :param second: пути вторых родителей
+    :param lines: точки разбиения (см. draw_cut_lines)
+    :return: PackedPopulation потомков в порядке потомок 1, потомок 2 для каждой пары
+    """
+    buffer1, offsets1 = pack_flat(first)
+    buffer2, offsets2 = pack_flat(second)
+    pairs = len(first)
+    lengths1 = np.diff(offsets1)
+    lengths2 = np.diff(offsets2)
+    # Оба буфера родителей подряд: начала путей второго буфера сдвинуты на длину первого
+    parents = np.concatenate([buffer1, buffer2])
+    starts1 = offsets1[:-1]
+    starts2 = offsets2[:-1] + len(buffer1)
+
+    # Потомки чередуются: 2 * i - потомок 1 пары i, 2 * i + 1 - потомок 2
+    lengths = np.empty(2 * pairs, dtype=np.int64)
+    lengths[0::2] = lengths1
+    lengths[1::2] = lengths2
+    own = np.empty(2 * pairs, dtype=np.int64)
+    own[0::2] = starts1
+    own[1::2] = starts2
+    foreign = np.empty(2 * pairs, dtype=np.int64)
+    foreign[0::2] = starts2
+    foreign[1::2] = starts1
+    swap_to = np.repeat(np.minimum(lengths1, lengths2) - 2, 2)
+    swap_from = np.repeat(np.asarray(lines, dtype=np.int64), 2)
+
+    offsets = np.zeros(2 * pairs + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    owners = np.repeat(np.arange(2 * pairs), lengths)
+    positions = np.arange(offsets[-1]) - offsets[owners]
+    inner = positions - 1  # Индекс среди промежуточных вершин
+    swapped = (inner >= swap_from[owners]) & (inner < swap_to[owners])
+    source = np.where(swapped, foreign[owners], own[owners]) + positions
+    buffer = parents[source]
+    buffer[offsets[:-1]] = network.start
+    buffer[offsets[1:] - 1] = network.end
+    return PackedPopulation(buffer, offsets)
+
+
+def mutate_packed(network, packed, mutation_probability, rng):
+    """
+    Мутация всех путей одним векторным шагом, как Chromosome.mutation: каждая промежуточная
+    вершина с вероятностью mutation_probability заменяется случайной вершиной от start + 1
+    до end - 1, концы пути становятся начальной и конечной вершинами сети.
+    Все случайные числа берутся из rng одним вызовом на маску и одним на новые вершины.
+    :return: PackedPopulation с изменёнными путями (буфер packed не меняется)
+    """
+    buffer = packed.buffer.copy()
+    firsts = packed.offsets[:-1]
+    lasts = packed.offsets[1:] - 1
+    mask = rng.random(len(buffer)) < mutation_probability
+    mask[firsts] = False
+    mask[lasts] = False
+    buffer[mask] = rng.integers(network.start + 1, network.end, size=int(mask.sum()))
+    buffer[firsts] = network.start
+    buffer[lasts] = network.end
+    return PackedPopulation(buffer, packed.offsets)
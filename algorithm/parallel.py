@@ -0,0 +1,10 @@
+import multiprocessing
+
+
+def pool_context():
+    """
+    Контекст multiprocessing для процессов-исполнителей: fork, если он доступен (сеть и всё
+    посчитанное заранее достаётся процессам из снимка памяти без копирования), иначе spawn.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
@@ -0,0 +1,76 @@
+from array import array
+
+import numpy as np
+
+from algorithm.chromosome import Chromosome
+from algorithm.fitness import evaluate_flat, pack_flat
+
+
+class PackedPopulation:
+    """
+    Популяция в виде структуры массивов: вершины всех путей подряд в одном буфере int32,
+    смещения начала путей и параллельный вектор фитнеса. Занимает 4 байта на вершину и
+    16 байт на путь вместо отдельного объекта-хромосомы со своим списком.
+    """
+
+    def __init__(self, buffer, offsets, fitness=None):
+        """
+        :param buffer: вершины всех путей подряд (int32)
+        :param offsets: смещения начала путей в buffer, на один элемент длиннее числа путей (int64)
+        :param fitness: фитнес путей (int64); None - ещё не посчитан
+        """
+        self.buffer = buffer
+        self.offsets = offsets
+        self.fitness = fitness
+
+    @classmethod
+    def from_paths(cls, paths, fitness=None):
+        buffer, offsets = pack_flat(paths)
+        if fitness is not None:
+            fitness = np.asarray(fitness, dtype=np.int64)
+        return cls(buffer, offsets, fitness)
+
+    @classmethod
+    def from_chromosomes(cls, chromosomes):
+        return cls.from_paths([chromosome.path for chromosome in chromosomes],
+                              [chromosome.fitness for chromosome in chromosomes])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lengths(self):
+        """Длины путей."""
+        return np.diff(self.offsets)
+
+    def path(self, i):
+        """Путь i (копия в виде array('i'))."""
+        return array("i", self.buffer[self.offsets[i]:self.offsets[i + 1]].tobytes())
+
+    def paths(self):
+        """Все пути в виде array('i')."""
+        return [self.path(i) for i in range(len(self))]
+
+    def evaluate(self, network):
+        """Считает фитнес всех путей одним векторным вызовом."""
+        self.fitness = evaluate_flat(network, self.buffer, self.offsets)
+        return self.fitness
+
+    def to_chromosomes(self, network, incremental=False):
+        """Хромосомы с уже посчитанным фитнесом (пути без фитнеса оцениваются сначала)."""
+        if self.fitness is None:
+            self.evaluate(network)
+        chromosomes = []
+        for path, fitness in zip(self.paths(), self.fitness.tolist()):
+            chromosome = Chromosome(path, network, evaluate=False, incremental=incremental)
+            chromosome.fitness = fitness
+            chromosomes.append(chromosome)
+        return chromosomes
+
+    @property
+    def nbytes(self):
+        """Объём буферов в байтах."""
+        fitness_bytes = self.fitness.nbytes if self.fitness is not None else 0
+        return self.buffer.nbytes + self.offsets.nbytes + fitness_bytes
+
+    def __repr__(self):
+        return f"PackedPopulation(size={len(self)}, vertices={len(self.buffer)})"
@@ -0,0 +1,93 @@
+import json
+import tracemalloc
+from collections import deque
+from time import perf_counter_ns
+
+# Фазы одного поколения в порядке выполнения
+PHASES = ("selection", "crossover", "mutation", "evaluation", "survivors")
+# Сколько последних записей по поколениям хранит профайлер по умолчанию
+DEFAULT_KEEP = 1000
+
+
+class GenerationProfiler:
+    """
+    Счётчики времени и операций по фазам поколения.
+    Generation вызывает lap() на границах фаз; если профайлер не задан, эти вызовы
+    не выполняются вовсе. Итог каждого поколения - словарь из простых типов (JSON).
+    """
+
+    def __init__(self, trace_memory=False, keep=DEFAULT_KEEP):
+        """
+        :param trace_memory: снимать текущий и пиковый объём памяти через tracemalloc в каждом поколении
+        :param keep: сколько последних записей хранить (None - все, память растёт с числом поколений)
+        """
+        self.trace_memory = trace_memory
+        self.records = deque(maxlen=keep)
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._reset()
+
+    def _reset(self):
+        self.generation_number = None
+        self.times = dict.fromkeys(PHASES, 0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.allocated = 0
+        self.evaluated = 0
+        self._started = perf_counter_ns()
+
+    def start_generation(self, generation_number):
+        """Начинает запись нового поколения; возвращает отметку времени для lap()."""
+        self._reset()
+        self.generation_number = generation_number
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        return self._started
+
+    def lap(self, phase, since):
+        """Добавляет к фазе время с отметки since; возвращает новую отметку."""
+        now = perf_counter_ns()
+        self.times[phase] += now - since
+        self.calls[phase] += 1
+        return now
+
+    def count(self, allocated=0, evaluated=0):
+        """Учитывает созданные и оценённые хромосомы."""
+        self.allocated += allocated
+        self.evaluated += evaluated
+
+    def finish_generation(self, population_size):
+        """Завершает запись поколения и возвращает её."""
+        record = {
+            "generation": self.generation_number,
+            "total_ns": perf_counter_ns() - self._started,
+            "phase_ns": self.times,
+            "phase_calls": self.calls,
+            "chromosomes_allocated": self.allocated,
+            "chromosomes_evaluated": self.evaluated,
+            "population_size": population_size,
+        }
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            record["memory_current"] = current
+            record["memory_peak"] = peak
+        self.records.append(record)
+        return record
+
+    def last(self):
+        """Последняя запись или None."""
+        return self.records[-1] if self.records else None
+
+    def write_jsonl(self, path):
+        """Сохраняет записи в файл, по одной JSON-строке на поколение."""
+        with open(path, "w", encoding="utf-8") as file:
+            for record in self.records:
+                file.write(json.dumps(record))
+                file.write("\n")
+
+    def close(self):
+        """Останавливает tracemalloc, если его запускал этот профайлер."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
@@ -0,0 +1,91 @@
+import os
+import random
+import time
+
+from algorithm.controller import OptimumReached, RunController, Stagnation
+from algorithm.generation import Generation
+from algorithm.parallel import pool_context
+
+# Сеть и параметры запуска в процессе-исполнителе (задаются один раз при старте процесса)
+_worker_state = None
+
+
+def solve_queries(network, queries, workers=None, max_generations=200, stagnation_window=30,
+                  mutation_probability=0.5, seed=None, chunksize=None, **generation_kwargs):
+    """
+    Решает набор запросов маршрута на одной сети.
+    Граф, массив весов и списки смежности готовятся один раз до запуска процессов и достаются
+    им из снимка памяти (fork); кэш фитнеса и кратчайшие пути из уже встреченных начальных
+    вершин (Дейкстра) у каждого процесса свои и общие для всех его запросов.
+    Каждый запрос - отдельный запуск ГА до оптимума, застоя или max_generations поколений.
+    :param network: сеть (Network)
+    :param queries: список пар (start, end); запрос end -> start решается как start -> end
+                    с разворотом найденного пути
+    :param workers: количество процессов (None - по числу ядер, 1 - без процессов, в текущем)
+    :param max_generations: предельное число поколений на запрос
+    :param stagnation_window: остановка, если лучший фитнес не улучшался столько поколений
+    :param mutation_probability: вероятность мутации вершины
+    :param seed: зерно; у каждого запроса своё производное зерно, поэтому результат
+                 не зависит от числа процессов и порядка выполнения
+    :param chunksize: сколько запросов отдавать процессу за раз (None - автоматически)
+    :param generation_kwargs: параметры Generation для каждого запроса
+    :return: список словарей (по одному на запрос, в порядке queries) с путём, фитнесом,
+             оптимумом (кратчайший путь), числом поколений и причиной остановки
+    """
+    tasks = []
+    seeder = random.Random(seed)
+    for start, end in queries:
+        reverse = start > end
+        if reverse:
+            start, end = end, start
+        network.route(start, end)  # Проверка запроса до запуска процессов
+        tasks.append((start, end, reverse, seeder.getrandbits(32)))
+
+    network.prepare_shared()
+    settings = (max_generations, stagnation_window, mutation_probability, generation_kwargs)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(tasks)))
+    if workers == 1:
+        _init_worker(network, settings)
+        try:
+            return [_solve_one(task) for task in tasks]
+        finally:
+            _init_worker(None, None)
+
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (workers * 4))
+    with pool_context().Pool(workers, initializer=_init_worker, initargs=(network, settings)) as pool:
+        return pool.map(_solve_one, tasks, chunksize)
+
+
+def _init_worker(network, settings):
+    global _worker_state
+    _worker_state = (network, settings) if network is not None else None
+
+
+def _solve_one(task):
+    """Один запрос в процессе-исполнителе."""
+    start, end, reverse, task_seed = task
+    network, (max_generations, stagnation_window, mutation_probability, generation_kwargs) = _worker_state
+    started = time.perf_counter()
+    random.seed(task_seed)
+    route = network.route(start, end)
+    generation = Generation(route, **generation_kwargs)
+    result = RunController(generation, [OptimumReached(), Stagnation(stagnation_window)],
+                           max_generations=max_generations, mutation_probability=mutation_probability).run()
+    path = result["best_path"]
+    if reverse:
+        path.reverse()
+        start, end = end, start
+    return {
+        "start": start,
+        "end": end,
+        "best_path": path,
+        "best_fitness": result["best_fitness"],
+        "optimal_fitness": generation.optimal_fitness,
+        "generations": result["generations"],
+        "reason": result["reason"],
+        "elapsed": time.perf_counter() - started,
+    }
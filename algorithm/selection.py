@@ -0,0 +1,139 @@
+import random
+
+import numpy as np
+
+# До такого числа хромосом обычная сортировка быстрее накладных расходов numpy
+PARTIAL_SELECTION_MIN = 128
+
+
+def fitness_array(chromosomes):
+    """Фитнес хромосом в виде вектора int64."""
+    return np.fromiter((chromosome.fitness for chromosome in chromosomes), dtype=np.int64,
+                       count=len(chromosomes))
+
+
+def smallest_order(fitness, count):
+    """
+    Индексы count наименьших значений fitness в том же порядке, что дал бы устойчивый sorted:
+    по возрастанию, равные - в исходном порядке. Частичный отбор (np.partition) за O(n),
+    сортируются только значения меньше порогового (их меньше count); равные порогу берутся
+    первыми по порядку, поэтому много равных (например, sys.maxsize в начале запуска)
+    сортировку не удлиняют.
+    """
+    n = len(fitness)
+    if count <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if count >= n:
+        return np.argsort(fitness, kind="stable")
+    threshold = np.partition(fitness, count - 1)[count - 1]
+    below = np.flatnonzero(fitness < threshold)
+    ties = np.flatnonzero(fitness == threshold)[:count - len(below)]
+    return np.concatenate((below[np.argsort(fitness[below], kind="stable")], ties))
+
+
+def smallest(chromosomes, count, fitness=None):
+    """count лучших хромосом (как sorted(chromosomes, key=fitness)[:count])."""
+    if fitness is None and len(chromosomes) < PARTIAL_SELECTION_MIN:
+        return sorted(chromosomes, key=_fitness)[:max(count, 0)]
+    if fitness is None:
+        fitness = fitness_array(chromosomes)
+    return [chromosomes[i] for i in smallest_order(fitness, count).tolist()]
+
+
+def best_unique(chromosomes, count, fitness=None):
+    """
+    count лучших хромосом с разными путями - то же, что устойчивая сортировка по фитнесу
+    с последующим удалением повторов и срезом [:count].
+    Кандидаты берутся частичным отбором; если из-за повторов уникальных не хватило,
+    окно кандидатов удваивается, и просмотр продолжается с места остановки.
+    """
+    n = len(chromosomes)
+    unique = []
+    seen_paths = set()
+    if fitness is None and n < PARTIAL_SELECTION_MIN:
+        for chromosome in sorted(chromosomes, key=_fitness):
+            if len(unique) >= count:
+                break
+            path_key = chromosome.path.tobytes()
+            if path_key not in seen_paths:
+                seen_paths.add(path_key)
+                unique.append(chromosome)
+        return unique
+    if fitness is None:
+        fitness = fitness_array(chromosomes)
+    scanned = 0
+    window = count
+    while count > 0:
+        order = smallest_order(fitness, window).tolist()
+        # Порядок меньшего окна - начало порядка большего, поэтому просмотренное не повторяем
+        for i in order[scanned:]:
+            path_key = chromosomes[i].path.tobytes()
+            if path_key not in seen_paths:
+                seen_paths.add(path_key)
+                unique.append(chromosomes[i])
+                if len(unique) == count:
+                    return unique
+        scanned = len(order)
+        if window >= n:
+            break
+        window = min(n, window * 2)
+    return unique
+
+
+def tournament(chromosomes, count, size=3):
+    """
+    Турнирный отбор: каждый из count родителей - лучший из size случайно выбранных хромосом.
+    O(count * size), сортировка не нужна.
+    """
+    n = len(chromosomes)
+    if n == 0:
+        return []
+    selected = []
+    for _ in range(count):
+        best = chromosomes[random.randrange(n)]
+        for _ in range(size - 1):
+            candidate = chromosomes[random.randrange(n)]
+            if candidate.fitness < best.fitness:
+                best = candidate
+        selected.append(best)
+    return selected
+
+
+def rank(chromosomes, count, fitness=None):
+    """
+    Ранговый отбор: вероятность выбора линейно убывает с рангом (лучшая хромосома - вес n,
+    худшая - вес 1), так что выбор не зависит от масштаба фитнеса и от sys.maxsize у неправильных путей.
+    Ранги не вычисляются: с вероятностью n / (n + 1) берётся лучшая из двух случайных хромосом
+    (равные - с меньшим индексом, как в устойчивой сортировке), иначе - случайная. Хромосома ранга r
+    (0 - лучшая) выбирается так с вероятностью 2 (n - r) / (n (n + 1)), как при весах n .. 1;
+    O(count), без сортировки.
+    """
+    n = len(chromosomes)
+    if n == 0:
+        return []
+    values = None if fitness is None else np.asarray(fitness).tolist()
+    selected = []
+    for _ in range(count):
+        i = random.randrange(n)
+        if random.random() * (n + 1) < n:
+            j = random.randrange(n)
+            if values is None:
+                better = (chromosomes[j].fitness, j) < (chromosomes[i].fitness, i)
+            else:
+                better = (values[j], j) < (values[i], i)
+            if better:
+                i = j
+        selected.append(chromosomes[i])
+    return selected
+
+
+def _fitness(chromosome):
+    return chromosome.fitness
+
+
+# Способы отбора родителей для Generation(selection=...)
+SELECTIONS = {
+    "truncation": smallest,  # Лучшие по фитнесу, как раньше
+    "tournament": tournament,
+    "rank": rank,
+}
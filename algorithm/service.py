@@ -0,0 +1,431 @@
+"""
+Локальный HTTP/JSON сервис поиска маршрутов на загруженных сетях.
+
+Запуск:
+    python -m algorithm.service city.net --port 8080
+
+Запросы:
+    POST /route     {"network": "city", "start": 3, "end": 40, "budget": 0.5, "stream": true}
+                    "budget" - сколько секунд от приёма запроса можно искать путь, "seed" - зерно
+                    (необязательно). Без "stream" ответ - итог поиска, со "stream" - строки JSON
+                    (NDJSON) с улучшениями лучшего пути по мере их нахождения, последняя строка -
+                    {"result": итог}. Одинаковые одновременные запросы решаются одной задачей.
+    GET /networks   загруженные сети
+    GET /metrics    счётчики запросов и задержки (p50, p99)
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from algorithm.controller import OptimumReached, RunController, TimeBudget
+from algorithm.generation import Generation
+from algorithm.network import Network
+from algorithm.parallel import pool_context
+
+# Наибольший размер тела запроса
+MAX_BODY = 1 << 16
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+# Сети и очередь улучшений в процессе-исполнителе (задаются один раз при старте процесса)
+_worker_networks = None
+_worker_updates = None
+
+
+class HTTPError(Exception):
+    """Ошибка запроса: отвечается кодом status и {"error": message}."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _Job:
+    """Задача поиска маршрута; на неё подписаны все совпавшие запросы."""
+
+    def __init__(self, job_id, key, loop):
+        self.id = job_id
+        self.key = key
+        self.updates = []  # Улучшения по порядку, чтобы подписавшийся позже получил их все
+        self.subscribers = set()  # asyncio.Queue подписанных запросов
+        self.result = loop.create_future()
+
+    def publish(self, message):
+        for queue in self.subscribers:
+            queue.put_nowait(message)
+
+
+class RouteService:
+    """
+    Сервис маршрутов: сети загружены один раз, задачи ГА выполняются в пуле процессов,
+    а цикл событий только принимает запросы и пересылает улучшения. Процессы отправляют
+    улучшения и итог в одну очередь, которую читает отдельный поток.
+    Приём ограничен: одновременно не больше workers + max_pending разных задач,
+    лишние запросы получают 503.
+    """
+
+    def __init__(self, networks, workers=None, max_pending=16, max_budget=60.0, max_generations=None,
+                 mutation_probability=0.5, latency_window=10000, **generation_kwargs):
+        """
+        :param networks: словарь {имя: Network или путь к файлу сети (см. Network.save)}
+        :param workers: количество процессов (None - по числу ядер)
+        :param max_pending: сколько задач может ждать свободного процесса
+        :param max_budget: наибольший бюджет запроса в секундах
+        :param max_generations: предельное число поколений задачи (None - только бюджет и оптимум)
+        :param mutation_probability: вероятность мутации вершины
+        :param latency_window: по скольким последним запросам считать p50/p99
+        :param generation_kwargs: параметры Generation для каждой задачи
+        """
+        self.networks = {name: Network.load(network) if isinstance(network, str) else network
+                         for name, network in networks.items()}
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.max_budget = max_budget
+        self.settings = (max_generations, mutation_probability, generation_kwargs)
+        self.latencies = deque(maxlen=latency_window)
+        self.counters = {"requests": 0, "completed": 0, "coalesced": 0, "rejected": 0, "failed": 0}
+        self._jobs = {}  # Активные задачи: {ключ: _Job}
+        self._by_id = {}
+        self._ids = itertools.count()
+        self._loop = None
+        self._server = None
+        self._pool = None
+        self._updates = None
+        self._drain_thread = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Запускает пул процессов и HTTP-сервер.
+        :param port: порт (0 - любой свободный)
+        :return: порт, на котором слушает сервер
+        """
+        self._loop = asyncio.get_running_loop()
+        for network in self.networks.values():
+            network.prepare_shared()
+        context = pool_context()
+        self._updates = context.Queue()
+        self._pool = concurrent.futures.ProcessPoolExecutor(
+            self.workers, mp_context=context, initializer=_init_worker,
+            initargs=(self.networks, self._updates))
+        self._drain_thread = threading.Thread(target=self._drain, daemon=True)
+        self._drain_thread.start()
+        # Процессы запускаются до открытия сокета сервера: иначе при fork они унаследуют
+        # слушающий сокет и открытые соединения, и закрытие соединения сервером не дойдёт до клиента
+        await asyncio.gather(*(self._loop.run_in_executor(self._pool, _ready) for _ in range(self.workers)))
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Останавливает сервер, пул процессов и поток чтения улучшений."""
+        self._server.close()
+        await self._server.wait_closed()
+        await self._loop.run_in_executor(None, lambda: self._pool.shutdown(cancel_futures=True))
+        self._updates.put(None)
+        self._drain_thread.join()
+
+    def metrics(self):
+        """Счётчики запросов, число активных задач и задержки запросов /route в секундах."""
+        latency = {"count": len(self.latencies), "p50": None, "p99": None}
+        if self.latencies:
+            latency["p50"], latency["p99"] = np.percentile(np.fromiter(self.latencies, float), [50, 99]).tolist()
+        return {**self.counters, "active_jobs": len(self._jobs), "latency": latency}
+
+    def submit(self, network, start, end, budget, seed=None):
+        """
+        Задача маршрута start -> end на сети network с бюджетом budget секунд: уже идущая
+        с теми же параметрами или новая.
+        :return: задача (_Job)
+        """
+        # Типы проверяются до всего остального: иначе неверный запрос упал бы в процессе-исполнителе
+        if not isinstance(network, str):
+            raise HTTPError(400, "network должен быть строкой")
+        for name, value in (("start", start), ("end", end)):
+            if not _is_int(value):
+                raise HTTPError(400, f"{name} должен быть целым числом")
+        if seed is not None and not _is_int(seed):
+            raise HTTPError(400, "seed должен быть целым числом")
+        if not (_is_int(budget) or isinstance(budget, float)) or not 0 < budget <= self.max_budget:
+            raise HTTPError(400, f"budget должен быть числом в (0, {self.max_budget}]")
+        if network not in self.networks:
+            raise HTTPError(404, f"Нет сети {network!r}")
+        try:
+            self.networks[network].route(min(start, end), max(start, end))
+        except (TypeError, ValueError) as error:
+            raise HTTPError(400, str(error))
+
+        key = (network, start, end, budget, seed)
+        job = self._jobs.get(key)
+        if job is not None:
+            self.counters["coalesced"] += 1
+            return job
+        if len(self._jobs) >= self.workers + self.max_pending:
+            self.counters["rejected"] += 1
+            raise HTTPError(503, "Очередь задач заполнена")
+
+        job = _Job(next(self._ids), key, self._loop)
+        self._jobs[key] = job
+        self._by_id[job.id] = job
+        if seed is None:
+            seed = random.getrandbits(32)
+        future = self._loop.run_in_executor(self._pool, _run_job, job.id, network, start, end,
+                                            time.time() + budget, seed, self.settings)
+        future.add_done_callback(lambda done: self._job_done(job, done))
+        return job
+
+    def _drain(self):
+        """Поток: пересылает сообщения процессов в цикл событий."""
+        while True:
+            message = self._updates.get()
+            if message is None:
+                return
+            self._loop.call_soon_threadsafe(self._on_message, *message)
+
+    def _on_message(self, job_id, kind, data):
+        job = self._by_id.get(job_id)
+        if job is None:
+            return
+        if kind == "update":
+            job.updates.append(data)
+            job.publish(("update", data))
+        else:
+            self._finish(job, data, None)
+
+    def _job_done(self, job, future):
+        # Итог приходит через очередь вслед за улучшениями; здесь - только сбой процесса
+        if not future.cancelled() and future.exception() is not None:
+            self._finish(job, None, future.exception())
+
+    def _finish(self, job, result, error):
+        if job.result.done():
+            return
+        self._jobs.pop(job.key, None)
+        self._by_id.pop(job.id, None)
+        if error is not None:
+            self.counters["failed"] += 1
+            job.result.set_exception(error)
+            job.publish(("error", str(error)))
+        else:
+            job.result.set_result(result)
+            job.publish(("result", result))
+
+    async def _handle(self, reader, writer):
+        received = time.perf_counter()
+        try:
+            method, target, body = await _read_request(reader)
+            if target == "/route":
+                if method != "POST":
+                    raise HTTPError(405, "Нужен POST")
+                await self._route(_parse_json(body), writer)
+                self.counters["completed"] += 1
+                self.latencies.append(time.perf_counter() - received)
+            elif target == "/metrics" and method == "GET":
+                await _respond(writer, 200, self.metrics())
+            elif target == "/networks" and method == "GET":
+                await _respond(writer, 200, {name: {"size": network.size, "start": network.start, "end": network.end}
+                                             for name, network in self.networks.items()})
+            else:
+                raise HTTPError(404, f"Нет ресурса {target}")
+        except HTTPError as error:
+            await _respond(writer, error.status, {"error": error.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as error:
+            await _respond(writer, 500, {"error": str(error)})
+        finally:
+            writer.close()
+
+    async def _route(self, request, writer):
+        self.counters["requests"] += 1
+        try:
+            job = self.submit(request["network"], request["start"], request["end"], request["budget"],
+                              request.get("seed"))
+        except KeyError as error:
+            raise HTTPError(400, f"Нет поля {error}")
+        if not request.get("stream"):
+            await _respond(writer, 200, await job.result)
+            return
+
+        queue = asyncio.Queue()
+        job.subscribers.add(queue)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                         b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+            for update in job.updates:
+                _write_chunk(writer, {"update": update})
+            if job.result.done():
+                queue.put_nowait(("result", job.result.result()))
+            while True:
+                kind, data = await queue.get()
+                _write_chunk(writer, {kind: data})
+                await writer.drain()
+                if kind != "update":
+                    break
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            job.subscribers.discard(queue)
+
+
+def _is_int(value):
+    """Целое ли число (bool из JSON целым не считается)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+async def _read_request(reader):
+    """Запрос HTTP/1.x: (метод, путь, тело)."""
+    line = await reader.readline()
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Неверная строка запроса")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY:
+        raise HTTPError(413, "Слишком большое тело запроса")
+    body = await reader.readexactly(length) if length else b""
+    return method, target.split("?", 1)[0], body
+
+
+def _parse_json(body):
+    try:
+        request = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Тело запроса - не JSON")
+    if not isinstance(request, dict):
+        raise HTTPError(400, "Тело запроса - не объект JSON")
+    return request
+
+
+async def _respond(writer, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    headers = [f"HTTP/1.1 {status} {_REASONS[status]}", "Content-Type: application/json; charset=utf-8",
+               f"Content-Length: {len(body)}", "Connection: close"]
+    if status == 503:
+        headers.append("Retry-After: 1")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+
+def _write_chunk(writer, payload):
+    line = json.dumps(payload, ensure_ascii=False).encode() + b"\n"
+    writer.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+
+
+def _init_worker(networks, updates):
+    global _worker_networks, _worker_updates
+    _worker_networks = networks
+    _worker_updates = updates
+
+
+def _ready():
+    """Пустая задача: заставляет пул запустить процессы."""
+    return os.getpid()
+
+
+def _fitness(value):
+    """Фитнес для JSON: None - пути нет."""
+    return None if value >= sys.maxsize else value
+
+
+def _run_job(job_id, name, start, end, deadline, seed, settings):
+    """
+    Задача в процессе-исполнителе: ГА до оптимума или срока deadline (time.time()).
+    Улучшения лучшего пути и итог отправляются в очередь сервиса.
+    """
+    max_generations, mutation_probability, generation_kwargs = settings
+    reverse = start > end
+    started = time.perf_counter()
+    random.seed(seed)
+    route = _worker_networks[name].route(min(start, end), max(start, end))
+    generation = Generation(route, **generation_kwargs)
+    best = [sys.maxsize]
+
+    def oriented(path):
+        path = list(path)
+        if reverse:
+            path.reverse()
+        return path
+
+    def publish(generation_number):
+        chromosome = generation.get_best_chromosome()
+        if chromosome.fitness < best[0]:
+            best[0] = chromosome.fitness
+            _worker_updates.put((job_id, "update", {
+                "path": oriented(chromosome.path),
+                "fitness": chromosome.fitness,
+                "generation": generation_number,
+                "elapsed": time.perf_counter() - started,
+            }))
+
+    publish(0)
+    result = RunController(generation, [OptimumReached(), TimeBudget(round(max(0.0, deadline - time.time()), 3))],
+                           max_generations=max_generations, mutation_probability=mutation_probability).run(publish)
+    summary = {
+        "start": start,
+        "end": end,
+        "best_path": oriented(result["best_path"]) if result["best_fitness"] < sys.maxsize else None,
+        "best_fitness": _fitness(result["best_fitness"]),
+        "optimal_fitness": _fitness(generation.optimal_fitness),
+        "generations": result["generations"],
+        "evaluations": result["evaluations"],
+        "reason": result["reason"],
+        "elapsed": time.perf_counter() - started,
+    }
+    _worker_updates.put((job_id, "result", summary))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервис поиска маршрутов")
+    parser.add_argument("networks", nargs="+", help="файлы сетей (имя сети - имя файла без расширения)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="количество процессов")
+    parser.add_argument("--max-pending", type=int, default=16, help="сколько задач может ждать процесса")
+    parser.add_argument("--max-budget", type=float, default=60.0, help="наибольший бюджет запроса, с")
+    args = parser.parse_args()
+
+    networks = {os.path.splitext(os.path.basename(path))[0]: path for path in args.networks}
+    service = RouteService(networks, workers=args.workers, max_pending=args.max_pending,
+                           max_budget=args.max_budget)
+
+    async def serve():
+        port = await service.start(args.host, args.port)
+        print(f"Сервис маршрутов: http://{args.host}:{port} ({', '.join(networks)})")
+        try:
+            await service.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import math
+import random
+
+import numpy as np
+
+
+class CSRGraph:
+    """
+    Разреженная верхняя треугольная матрица смежности в формате CSR.
+    Строка i хранит рёбра (i, j) с j > i: столбцы indices[indptr[i]:indptr[i + 1]]
+    (по возрастанию) и их веса weights[...]. Диагональ неявно равна 0.
+    """
+
+    def __init__(self, size, indptr, indices, weights):
+        self.size = size
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        # Быстрый поиск ребра: ключ i * size + j -> вес (скалярный и векторный);
+        # строится при первом обращении, чтобы граф из файла открывался за O(1)
+        self._key_array = None
+        self._lookup_dict = None
+
+    @property
+    def _keys(self):
+        if self._key_array is None:
+            self._key_array = self.keys()
+        return self._key_array
+
+    @property
+    def _lookup(self):
+        if self._lookup_dict is None:
+            self._lookup_dict = dict(zip(self._keys.tolist(), self.weights.tolist()))
+        return self._lookup_dict
+
+    @classmethod
+    def from_edges(cls, size, rows, cols, weights):
+        """Создаёт граф из рёбер (rows[k], cols[k]) с rows[k] < cols[k]."""
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.int64)
+        order = np.argsort(rows * size + cols, kind="stable")
+        rows, cols, weights = rows[order], cols[order], weights[order]
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+        return cls(size, indptr, cols.astype(np.int32), weights)
+
+    @classmethod
+    def generate(cls, size, density, max_weight):
+        """
+        Случайный граф G(n, p) на верхнем треугольнике за O(V + E).
+        Вместо перебора всех пар пропускаем геометрически распределённое число
+        кандидатов (метод Батагеля-Брандеса), обходя пары построчно.
+        """
+        rows, cols, weights = [], [], []
+        if density > 0:
+            log_q = math.log(1.0 - density) if density < 1 else None
+            i, j = 0, 0
+            while i < size:
+                skip = 0 if log_q is None else int(math.log(1.0 - random.random()) / log_q)
+                j += 1 + skip
+                while j >= size and i < size:
+                    # Переходим на следующую строку, перенося остаток пропуска
+                    j = j - size + i + 2
+                    i += 1
+                if i < size:
+                    rows.append(i)
+                    cols.append(j)
+                    weights.append(random.randint(1, max_weight))
+        return cls.from_edges(size, rows, cols, weights)
+
+    def keys(self):
+        """Отсортированные ключи рёбер i * size + j."""
+        rows = np.repeat(np.arange(self.size, dtype=np.int64), np.diff(self.indptr))
+        return rows * self.size + self.indices
+
+    def edges(self):
+        """Рёбра в виде трёх массивов (rows, cols, weights)."""
+        rows = np.repeat(np.arange(self.size, dtype=np.int64), np.diff(self.indptr))
+        return rows, self.indices.astype(np.int64), self.weights
+
+    def weight(self, a, b):
+        """Вес ребра (a, b) при a <= b или None, если ребра нет."""
+        if a == b:
+            return 0
+        return self._lookup.get(a * self.size + b)
+
+    def with_weight(self, a, b, weight):
+        """
+        Граф с изменённым весом ребра (a, b) при a < b (None - без ребра).
+        Вес существующего ребра меняется на месте, добавление и удаление перестраивают CSR.
+        """
+        key = a * self.size + b
+        if weight is not None and key in self._lookup:
+            pos = int(np.searchsorted(self._keys, key))
+            if not self.weights.flags.writeable:
+                self.weights = self.weights.copy()  # Веса отображены из файла только для чтения
+            self.weights[pos] = weight
+            self._lookup[key] = weight
+            return self
+        rows, cols, weights = self.edges()
+        keep = self._keys != key
+        rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        if weight is not None:
+            rows = np.append(rows, a)
+            cols = np.append(cols, b)
+            weights = np.append(weights, weight)
+        return CSRGraph.from_edges(self.size, rows, cols, weights)
+
+    def lookup(self, a, b):
+        """
+        Векторный поиск весов рёбер (a[k], b[k]) при a <= b.
+        :return: массив весов, -1 для отсутствующих рёбер
+        """
+        keys = a * self.size + b
+        if len(self._keys) == 0:
+            result = np.full(keys.shape, -1, dtype=np.int64)
+        else:
+            pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+            result = np.where(self._keys[pos] == keys, self.weights[pos], -1)
+        result[a == b] = 0
+        return result
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return _CSRRow(self, i)
+
+
+class _CSRRow:
+    """Строка CSR-матрицы с доступом graph[i][j], как у списка списков."""
+
+    def __init__(self, graph, i):
+        self.graph = graph
+        self.i = i
+
+    def __getitem__(self, j):
+        if j < self.i:
+            return None
+        return self.graph.weight(self.i, j)
+
+    def __len__(self):
+        return self.graph.size
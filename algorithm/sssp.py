@@ -0,0 +1,74 @@
+import heapq
+import sys
+
+import numpy as np
+
+from algorithm.apsp import INF
+
+
+def dense_adjacency(weights):
+    """
+    Списки смежности (CSR) из матрицы весов dense-сети.
+    :param weights: матрица int64, -1 - ребра нет (см. Network.weight_array)
+    :return: (indptr, indices, weights) рёбер i -> j с i < j
+    """
+    size = weights.shape[0]
+    rows, cols = np.nonzero(np.triu(weights >= 0, 1))
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, cols.astype(np.int32), weights[rows, cols]
+
+
+def dijkstra(indptr, indices, weights, source):
+    """
+    Кратчайшие пути из одной вершины (Дейкстра с двоичной кучей).
+    Рёбра вершины релаксируются одним векторным шагом по её строке CSR.
+    Как и у Флойда, ребро (i, j) из верхнего треугольника ведёт от i к j.
+    :return: (dist, prev) - массивы int64; INF - вершина недостижима, prev -1 - предшественника нет
+    """
+    size = len(indptr) - 1
+    dist = np.full(size, INF, dtype=np.int64)
+    prev = np.full(size, -1, dtype=np.int64)
+    done = np.zeros(size, dtype=bool)
+    dist[source] = 0
+    heap = [(0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if done[u]:
+            continue
+        done[u] = True
+        lo, hi = indptr[u], indptr[u + 1]
+        if lo == hi:
+            continue
+        neighbors = indices[lo:hi]
+        candidate = d + weights[lo:hi]
+        better = candidate < dist[neighbors]
+        if better.any():
+            neighbors = neighbors[better]
+            candidate = candidate[better]
+            dist[neighbors] = candidate
+            prev[neighbors] = u
+            for item in zip(candidate.tolist(), neighbors.tolist()):
+                heapq.heappush(heap, item)
+    return dist, prev
+
+
+def distance(dist, end):
+    """Расстояние до end в формате Флойда: sys.maxsize, если пути нет."""
+    value = int(dist[end])
+    return sys.maxsize if value >= INF else value
+
+
+def path_to(prev, start, end):
+    """
+    Восстанавливает путь start -> end по массиву предшественников ([] - пути нет).
+    Для start == end тоже [], как у Network.reconstruct_path по результату Флойда.
+    """
+    if start == end or prev[end] < 0:
+        return []
+    path = [end]
+    while end != start:
+        end = int(prev[end])
+        path.append(end)
+    path.reverse()
+    return path
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import mmap
+import struct
+
+import numpy as np
+
+# Файл сети: заголовок (сигнатура, число вершин, start, end, число разделов, хеш графа),
+# таблица разделов (имя, dtype, смещение, строки, столбцы) и сами массивы,
+# выровненные по ALIGN байт. Граф хранится как CSR верхнего треугольника
+# (разделы indptr, indices, weights), остальные разделы - вычисленные по нему данные.
+MAGIC = b"GANET1\0\0"
+HEADER = struct.Struct("<8sQqqI16s")
+SECTION = struct.Struct("<16s4sQQQ")
+ALIGN = 64
+
+GRAPH_SECTIONS = ("indptr", "indices", "weights")
+
+# Сколько байт читать за раз при подсчёте хеша раздела
+_CHUNK = 1 << 20
+
+
+def checksum_path(path):
+    """Путь к файлу контрольных сумм для файла сети path."""
+    return f"{path}.sum"
+
+
+def _digest(arrays):
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        data = memoryview(np.ascontiguousarray(array)).cast("B")
+        for start in range(0, len(data), _CHUNK):
+            digest.update(data[start:start + _CHUNK])
+    return digest.digest()
+
+
+def _graph_sections(network):
+    """Граф сети в виде разделов файла: CSR верхнего треугольника."""
+    indptr, indices, weights = network.adjacency()
+    return {"indptr": np.asarray(indptr, dtype=np.int64), "indices": np.asarray(indices, dtype=np.int32),
+            "weights": np.asarray(weights, dtype=np.int64)}
+
+
+def graph_digest(network):
+    """Хеш графа сети (тот же, что в заголовке файла сети): ключ для кэшей, зависящих от графа."""
+    sections = _graph_sections(network)
+    return _digest(sections[name] for name in GRAPH_SECTIONS).hex()
+
+
+def _cached_sections(network):
+    """Вычисленные по графу данные, которые уже есть у сети: {имя: массив}."""
+    sections = {}
+    if network.calculated:
+        dist = np.asarray(network.dist_matrix, dtype=np.int64)
+        next_node = network.next_node
+        if not isinstance(next_node, np.ndarray):
+            next_node = np.array([[-1 if v is None else v for v in row] for row in next_node], dtype=np.int64)
+        sections["dist"] = dist
+        sections["next"] = next_node
+    if network._neighbors is not None:
+        sections["neighbor_indptr"] = network._neighbors.indptr
+        sections["neighbor_indices"] = network._neighbors.indices
+    return sections
+
+
+def save_network(network, path, indexes=True):
+    """
+    Сохраняет сеть в двоичный файл path и контрольные суммы разделов рядом (см. checksum_path).
+    :param indexes: сохранять ли уже вычисленные данные (Флойд, индекс соседей)
+    """
+    sections = _graph_sections(network)
+    if indexes:
+        sections.update(_cached_sections(network))
+
+    graph_digest = _digest(sections[name] for name in GRAPH_SECTIONS)
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, array in sections.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        rows, cols = (array.shape[0], array.shape[1]) if array.ndim == 2 else (array.shape[0], 0)
+        table.append((name, array, offset, rows, cols))
+        offset += array.nbytes
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, network.size, network.start, network.end, len(sections), graph_digest))
+        for name, array, offset, rows, cols in table:
+            file.write(SECTION.pack(name.encode(), array.dtype.str.encode(), offset, rows, cols))
+        for name, array, offset, rows, cols in table:
+            file.write(b"\0" * (offset - file.tell()))
+            file.write(np.ascontiguousarray(array).tobytes())
+        size = file.tell()
+
+    checksums = {
+        "graph": graph_digest.hex(),
+        "file_size": size,
+        "sections": {name: _digest([array]).hex() for name, array in sections.items()},
+    }
+    with open(checksum_path(path), "w") as file:
+        json.dump(checksums, file, indent=1)
+
+
+class NetworkFile:
+    """
+    Файл сети, отображённый в память только для чтения: массивы разделов - представления
+    одного отображения, поэтому процессы, открывшие один файл, делят одну копию страниц.
+    """
+
+    def __init__(self, path, verify=False):
+        """
+        :param verify: если True, хеши всех разделов пересчитываются (O(размер файла));
+                       иначе сверяются только заголовок и файл контрольных сумм
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, self.start, self.end, count, graph_digest = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: не файл сети")
+        self.graph_digest = graph_digest
+        self.sections = {}
+        for i in range(count):
+            name, dtype, offset, rows, cols = SECTION.unpack_from(self._map, HEADER.size + SECTION.size * i)
+            shape = (rows, cols) if cols else (rows,)
+            dtype = np.dtype(dtype.rstrip(b"\0").decode())
+            if rows == 0:
+                array = np.empty(shape, dtype=dtype)
+            else:
+                array = np.frombuffer(self._map, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+            self.sections[name.rstrip(b"\0").decode()] = array
+        self.stale = self._check(verify)
+
+    def _check(self, verify):
+        """
+        Проверяет файл контрольных сумм. Вычисленные разделы, которые не подтверждены им,
+        считаются устаревшими. Несовпадение хеша графа при verify - ошибка.
+        :return: множество имён устаревших разделов
+        """
+        cached = set(self.sections) - set(GRAPH_SECTIONS)
+        if verify and _digest(self.sections[name] for name in GRAPH_SECTIONS) != self.graph_digest:
+            raise ValueError(f"{self.path}: граф повреждён (хеш не совпадает с заголовком)")
+        try:
+            with open(checksum_path(self.path)) as file:
+                checksums = json.load(file)
+        except (OSError, ValueError):
+            return cached
+        if checksums.get("graph") != self.graph_digest.hex() or checksums.get("file_size") != len(self._map):
+            return cached
+        expected = checksums.get("sections", {})
+        stale = {name for name in cached if name not in expected}
+        if verify:
+            stale |= {name for name in cached - stale if _digest([self.sections[name]]).hex() != expected[name]}
+        return stale
+
+    def get(self, name):
+        """Массив раздела или None, если его нет или он устарел."""
+        if name in self.stale:
+            return None
+        return self.sections.get(name)
+
+    def close(self):
+        """Освобождает отображение файла; массивы разделов после этого использовать нельзя."""
+        self.sections = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # На отображение ещё ссылаются массивы разделов (например, сети из Network.load);
+            # оно закроется, когда освободится последний из них
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,219 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+
+from algorithm.controller import OptimumReached, RunController, Stagnation
+from algorithm.generation import Generation
+from algorithm.history import numeric_fitness
+from algorithm.network import Network
+from algorithm.parallel import pool_context
+from algorithm.storage import NetworkFile
+
+# Параметры запуска (RunController); остальные параметры конфигурации передаются Generation
+RUN_PARAMETERS = {"mutation_probability": 0.5, "max_generations": 200, "stagnation_window": 30}
+# Столбцы результата ячейки после столбцов с параметрами
+RESULT_COLUMNS = ("best_fitness", "optimal_fitness", "gap", "generations", "converged_generation",
+                  "evaluations", "elapsed", "reason")
+
+# Сети, уже открытые процессом-исполнителем: {путь: Network}
+_worker_networks = {}
+_worker_cache_size = None
+
+
+def grid(**parameters):
+    """
+    Все сочетания значений параметров.
+    Пример: grid(k=[1, 2], mutation_probability=[0.2, 0.5]) - четыре конфигурации.
+    :return: список словарей параметров
+    """
+    names = sorted(parameters)
+    return [dict(zip(names, values)) for values in itertools.product(*(parameters[name] for name in names))]
+
+
+def random_sample(count, seed=None, **parameters):
+    """
+    Случайные конфигурации: значение из списка выбирается равновероятно, кортеж (low, high)
+    задаёт отрезок (целые числа - randint, иначе uniform).
+    :param count: число конфигураций
+    :param seed: зерно выборки
+    :return: список словарей параметров
+    """
+    rng = random.Random(seed)
+    names = sorted(parameters)
+    configurations = []
+    for _ in range(count):
+        configuration = {}
+        for name in names:
+            values = parameters[name]
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    configuration[name] = rng.randint(low, high)
+                else:
+                    configuration[name] = rng.uniform(low, high)
+            else:
+                configuration[name] = rng.choice(list(values))
+        configurations.append(configuration)
+    return configurations
+
+
+def network_key(path):
+    """Ключ сети в файле path: хеш графа и start/end из заголовка (не зависит от пути к файлу)."""
+    with NetworkFile(path) as data:
+        return f"{data.graph_digest.hex()}:{data.start}:{data.end}"
+
+
+def cell_key(network, configuration, seed):
+    """Идентификатор ячейки перебора по ключу сети (см. network_key), параметрам и зерну."""
+    text = json.dumps([network, configuration, seed], sort_keys=True, default=repr)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def run_sweep(networks, configurations, output_path, seeds=(0,), workers=None, fitness_cache_size=None):
+    """
+    Перебор параметров ГА: каждая конфигурация запускается на каждой сети с каждым зерном
+    (одна ячейка - один запуск до оптимума, застоя или max_generations поколений).
+    Ячейки распределяются по не более чем workers процессам, результаты по мере готовности
+    дописываются строками в CSV output_path. Если файл уже есть, ячейки из него пропускаются,
+    поэтому прерванный перебор продолжается повторным вызовом с теми же аргументами.
+    :param networks: пути к файлам сетей (см. Network.save); процессы открывают их сами,
+                     страницы отображённых файлов общие
+    :param configurations: словари параметров (см. grid и random_sample): параметры Generation
+                           и параметры запуска RUN_PARAMETERS
+    :param output_path: файл результатов (CSV: ячейка, сеть, зерно, параметры, RESULT_COLUMNS)
+    :param seeds: зёрна; при одном зерне конфигурации стартуют с одинаковых случайных чисел
+    :param workers: количество процессов (None - по числу ядер, 1 - без процессов, в текущем)
+    :param fitness_cache_size: размер кэша фитнеса сети в процессе (None - без кэша)
+    :return: сколько ячеек выполнено в этом вызове
+    """
+    keys = {path: network_key(path) for path in networks}
+    names = sorted({name for configuration in configurations for name in configuration})
+    columns = ["cell", "network", "seed", *names, *RESULT_COLUMNS]
+    done = _finished_cells(output_path, columns)
+
+    cells = []
+    for path in networks:
+        for configuration in configurations:
+            for seed in seeds:
+                key = cell_key(keys[path], configuration, seed)
+                if key not in done:
+                    done.add(key)  # Повторяющиеся конфигурации считаются один раз
+                    cells.append((key, path, configuration, seed))
+    if not cells:
+        return 0
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(cells)))
+    new_file = not os.path.exists(output_path)
+    with open(output_path, "a", newline="") as file:
+        writer = csv.DictWriter(file, columns, restval="")
+        if new_file:
+            writer.writeheader()
+        if workers == 1:
+            _init_worker(fitness_cache_size)
+            try:
+                _write_rows(file, writer, map(_run_cell, cells))
+            finally:
+                _init_worker(None)
+        else:
+            with pool_context().Pool(workers, initializer=_init_worker, initargs=(fitness_cache_size,)) as pool:
+                _write_rows(file, writer, pool.imap_unordered(_run_cell, cells))
+    return len(cells)
+
+
+def read_results(path):
+    """Строки файла результатов (словари строк, как в CSV)."""
+    with open(path, newline="") as file:
+        return list(csv.DictReader(file))
+
+
+def _finished_cells(path, columns):
+    """
+    Ячейки, уже записанные в файл результатов. Недописанная последняя строка (прерванная запись)
+    отрезается.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as file:
+        data = file.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            file.truncate(end)
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            os.remove(path)  # Пустой файл: заголовок запишется заново
+            return set()
+        if header != columns:
+            raise ValueError(f"{path}: столбцы не совпадают с параметрами перебора")
+        return {row[0] for row in reader if row}
+
+
+def _write_rows(file, writer, rows):
+    for row in rows:
+        writer.writerow(row)
+        file.flush()
+
+
+def _init_worker(fitness_cache_size):
+    global _worker_cache_size
+    _worker_networks.clear()
+    _worker_cache_size = fitness_cache_size
+
+
+def _run_cell(cell):
+    """Одна ячейка перебора в процессе-исполнителе."""
+    key, path, configuration, seed = cell
+    network = _worker_networks.get(path)
+    if network is None:
+        network = Network.load(path, fitness_cache_size=_worker_cache_size)
+        _worker_networks[path] = network
+    settings = dict(RUN_PARAMETERS)
+    generation_kwargs = {}
+    for name, value in configuration.items():
+        if name in settings:
+            settings[name] = value
+        else:
+            generation_kwargs[name] = value
+
+    started = time.perf_counter()
+    random.seed(seed)
+    generation = Generation(network, **generation_kwargs)
+    best = [numeric_fitness(generation.get_best_chromosome().fitness), 0]
+
+    def track(generation_number):
+        fitness = numeric_fitness(generation.get_best_chromosome().fitness)
+        if fitness < best[0]:
+            best[:] = [fitness, generation_number]
+
+    result = RunController(generation, [OptimumReached(), Stagnation(settings["stagnation_window"])],
+                           max_generations=settings["max_generations"],
+                           mutation_probability=settings["mutation_probability"]).run(track)
+    best_fitness = numeric_fitness(result["best_fitness"])
+    optimal_fitness = numeric_fitness(generation.optimal_fitness)
+    if optimal_fitness == float("inf"):
+        gap = float("nan")  # Пути нет, отставание не определено
+    elif optimal_fitness == 0:
+        gap = 0.0 if best_fitness == 0 else float("inf")
+    else:
+        gap = (best_fitness - optimal_fitness) / optimal_fitness
+    return {
+        "cell": key,
+        "network": path,
+        "seed": seed,
+        **configuration,
+        "best_fitness": best_fitness,
+        "optimal_fitness": optimal_fitness,
+        "gap": gap,
+        "generations": result["generations"],
+        "converged_generation": best[1],
+        "evaluations": generation.evaluations,
+        "elapsed": time.perf_counter() - started,
+        "reason": result["reason"],
+    }
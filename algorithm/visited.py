@@ -0,0 +1,92 @@
+import numpy as np
+
+from algorithm.fitness import pack_flat
+
+# Основание полиномиального хеша пути (нечётное 64-битное число) и множитель длины пути;
+# те же отпечатки считает PopulationBuffers (algorithm.buffers)
+FINGERPRINT_BASE = np.uint64(0x9E3779B97F4A7C15)
+FINGERPRINT_LENGTH = np.uint64(0xC2B2AE3D27D4EB4F)
+
+
+def fingerprints(paths):
+    """
+    64-битные отпечатки путей: полиномиальный хеш sum((v_i + 1) * BASE^i) + длина * LENGTH
+    по модулю 2^64, считается для всех путей одним векторным проходом по упакованному буферу.
+    :return: массив uint64
+    """
+    buffer, offsets = pack_flat(paths)
+    count = len(offsets) - 1
+    if count == 0:
+        return np.empty(0, dtype=np.uint64)
+    lengths = np.diff(offsets)
+    positions = np.arange(len(buffer)) - np.repeat(offsets[:-1], lengths)
+    powers = fingerprint_powers(int(lengths.max()) if len(buffer) else 0)
+    with np.errstate(over="ignore"):
+        terms = (buffer.astype(np.uint64) + np.uint64(1)) * powers[positions]
+        sums = np.zeros(count, dtype=np.uint64)
+        nonempty = lengths > 0
+        sums[nonempty] = np.add.reduceat(terms, offsets[:-1][nonempty]) if len(terms) else 0
+        return sums + lengths.astype(np.uint64) * FINGERPRINT_LENGTH
+
+
+def fingerprint_powers(length):
+    """BASE^0 .. BASE^(length - 1) по модулю 2^64."""
+    powers = np.ones(max(length, 1), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for i in range(1, length):
+            powers[i] = powers[i - 1] * FINGERPRINT_BASE
+    return powers
+
+
+class VisitedIndex:
+    """
+    Ограниченный по памяти индекс уже оценённых путей на весь запуск: множество 64-битных
+    отпечатков (см. fingerprints) в двух поколениях. Когда текущее поколение набирает
+    capacity // 2 отпечатков, оно становится старым, а прежнее старое отбрасывается,
+    поэтому давно не встречавшиеся пути постепенно забываются, а в памяти не больше
+    capacity отпечатков. Совпадение отпечатков разных путей маловероятно (около 2^-64 на пару);
+    в худшем случае новый путь будет ошибочно сочтён уже виденным.
+    """
+
+    def __init__(self, capacity=1_000_000):
+        """
+        :param capacity: сколько отпечатков хранить не больше
+        """
+        if capacity < 2:
+            raise ValueError("capacity должен быть не меньше 2")
+        self.capacity = capacity
+        self._current = set()
+        self._previous = set()
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._current or fingerprint in self._previous
+
+    def contains(self, paths):
+        """Для каждого пути - встречался ли он раньше (список bool)."""
+        return [fingerprint in self for fingerprint in fingerprints(paths).tolist()]
+
+    def add(self, fingerprint):
+        """Запоминает отпечаток (повторное добавление освежает его возраст)."""
+        current = self._current
+        if fingerprint in current:
+            return
+        current.add(fingerprint)
+        self._previous.discard(fingerprint)
+        if len(current) >= self.capacity // 2:
+            self._previous = current
+            self._current = set()
+
+    def add_paths(self, paths):
+        """Запоминает пути; возвращает, сколько из них встретилось впервые."""
+        novel = 0
+        for fingerprint in fingerprints(paths).tolist():
+            if fingerprint not in self:
+                novel += 1
+            self.add(fingerprint)
+        return novel
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+    def __repr__(self):
+        return f"VisitedIndex(size={len(self)}, capacity={self.capacity})"
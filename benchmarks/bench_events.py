@@ -0,0 +1,46 @@
+"""
+Скорость эволюции (поколений в секунду) без вывода и с прежним подробным выводом.
+
+Запуск: python -m benchmarks.bench_events [--size 60] [--generations 200] [--seed 0]
+Те же замеры входят в общий набор: python -m benchmarks.suite --only evolve_output
+Подробный вывод пишется в os.devnull, поэтому замер показывает стоимость форматирования
+и записи, а не скорость терминала.
+"""
+import argparse
+import os
+import random
+import time
+
+from algorithm.events import EventLevel, PrintSink
+from algorithm.generation import Generation
+from algorithm.network import Network
+
+
+def generations_per_second(size, generations, seed, level):
+    random.seed(seed)
+    network = Network(size, start=1, end=size - 2)
+    generation = Generation(network)
+    with open(os.devnull, "w") as devnull:
+        if level > EventLevel.OFF:
+            PrintSink(level, devnull).attach(generation)
+        started = time.perf_counter()
+        for gen in range(generations):
+            generation.evolve(gen + 1)
+        elapsed = time.perf_counter() - started
+    return generations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=60)
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for level in (EventLevel.OFF, EventLevel.SUMMARY, EventLevel.OPERATIONS):
+        rate = generations_per_second(args.size, args.generations, args.seed, level)
+        print(f"{level.name:<10} {rate:10.1f} поколений/с")
+
+
+if __name__ == "__main__":
+    main()
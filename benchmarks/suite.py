@@ -0,0 +1,391 @@
+"""
+Набор воспроизводимых замеров производительности Network, Chromosome и Generation.
+
+Запуск:
+    python -m benchmarks.suite --output baseline.json          # сохранить замеры
+    python -m benchmarks.suite --compare baseline.json         # сравнить с базовыми замерами
+    python -m benchmarks.suite --quick --only floyd            # быстрый прогон части замеров
+
+Каждый замер - фиксированная нагрузка с заданным зерном; сохраняется медиана времени
+по нескольким повторам. При сравнении замедление больше порога (--threshold) считается
+регрессией, и программа завершается с кодом 1. Так же сравнивается память, выделяемая
+за поколение эволюции (tracemalloc): рост больше порога и больше ALLOCATION_SLACK байт - регрессия.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from algorithm.chromosome import Chromosome
+from algorithm.controller import OptimumReached, RunController
+from algorithm.events import EventLevel, PrintSink
+from algorithm.fitness import evaluate_paths
+from algorithm.generation import Generation
+from algorithm.network import Network
+from algorithm.routes import solve_queries
+
+# Формы нагрузки: (вершин, плотность); в быстром режиме берутся только первые
+NETWORK_SHAPES = [(100, 0.5), (300, 0.1), (1000, 0.01)]
+SPARSE_SHAPES = [(10000, 0.0003), (100000, 0.00003)]
+FLOYD_SHAPES = [(100, 0.5), (300, 0.1), (600, 0.05)]
+EVOLVE_SHAPES = [(50, 0.5, 100), (200, 0.2, 200), (500, 0.05, 1000)]
+# Режимы эволюции, для которых замеряется память на поколение
+ALLOCATION_MODES = {"default": {}, "batch_operators": {"batch_operators": True}, "buffered": {"buffered": True}}
+# Рост памяти на поколение меньше стольких байт регрессией не считается (шум временных массивов)
+ALLOCATION_SLACK = 16384
+
+
+def make_network(size, density, seed, backend="dense"):
+    random.seed(seed)
+    return Network(size, density, start=1, end=size - 2, backend=backend)
+
+
+def random_paths(network, count, seed, max_length=20):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        length = rng.randint(3, max_length)
+        paths.append([network.start] + rng.sample(range(network.size), length - 2) + [network.end])
+    return paths
+
+
+def case_network(size, density, seed, backend):
+    def run():
+        make_network(size, density, seed, backend)
+    return run, 1, "сеть"
+
+
+def case_load(size, density, seed):
+    """Открытие сохранённой сети: отображение файла в память, без чтения массивов."""
+    network = make_network(size, density, seed, "sparse")
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "network.bin")
+    network.save(path)
+
+    def run():
+        Network.load(path)
+    return run, 1, "загрузка", directory.cleanup
+
+
+def case_floyd(size, density, seed):
+    network = make_network(size, density, seed)
+
+    def run():
+        network.calculated = False
+        network.floyd()
+    return run, 1, "вызов"
+
+
+def case_dijkstra(size, density, seed):
+    """Кратчайшее расстояние start -> end Дейкстрой; invalidate сбрасывает запомненные результаты."""
+    network = make_network(size, density, seed)
+
+    def run():
+        network.invalidate()
+        network.shortest_distance(network.start, network.end)
+    return run, 1, "вызов"
+
+
+def case_fitness(size, density, seed, count, batch):
+    network = make_network(size, density, seed)
+    paths = random_paths(network, count, seed)
+
+    def run():
+        if batch:
+            evaluate_paths(network, paths)
+        else:
+            for path in paths:
+                Chromosome(path, network)
+    return run, count, "хромосома"
+
+
+def case_mutation(size, density, seed, count):
+    network = make_network(size, density, seed)
+    chromosomes = [Chromosome(path, network) for path in random_paths(network, count, seed)]
+
+    def run():
+        random.seed(seed)
+        for chromosome in chromosomes:
+            chromosome.mutation(0.5)
+    return run, count, "мутация"
+
+
+def case_crossover(size, density, seed, count):
+    network = make_network(size, density, seed)
+    chromosomes = [Chromosome(path, network) for path in random_paths(network, count * 2, seed)]
+
+    def run():
+        random.seed(seed)
+        for i in range(0, len(chromosomes), 2):
+            chromosomes[i].crossover(chromosomes[i + 1], random_or_not=True)
+    return run, count, "пара"
+
+
+def case_startup(size, density, seed, backend):
+    """Время до первого поколения: оптимум (Дейкстра) и начальная популяция на свежей сети."""
+    network = make_network(size, density, seed, backend)
+
+    def run():
+        network.invalidate()
+        random.seed(seed)
+        Generation(network)
+    return run, 1, "запуск"
+
+
+def case_evolve(size, density, seed, population, generations, **generation_kwargs):
+    network = make_network(size, density, seed)
+    network.shortest_distance(network.start, network.end)
+
+    def run():
+        random.seed(seed)
+        generation = Generation(network, max_population=population, **generation_kwargs)
+        for gen in range(generations):
+            generation.evolve(gen + 1)
+    return run, generations, "поколение"
+
+
+def case_novel_evaluations(size, density, seed, population, generations):
+    """Полезная скорость: оценки впервые встреченных путей в секунду (с индексом виденных путей)."""
+    network = make_network(size, density, seed)
+    network.shortest_distance(network.start, network.end)
+    random.seed(seed)
+    generation = Generation(network, max_population=population, visited_capacity=1_000_000)
+    novel = 0
+    for gen in range(generations):
+        generation.evolve(gen + 1)
+        novel += generation.get_novelty()["novel"]
+
+    def run():
+        random.seed(seed)
+        generation = Generation(network, max_population=population, visited_capacity=1_000_000)
+        for gen in range(generations):
+            generation.evolve(gen + 1)
+    return run, novel, "новая оценка"
+
+
+def case_evolve_output(size, seed, generations, level):
+    """Эволюция с выводом событий в os.devnull: стоимость форматирования, а не скорость терминала."""
+    network = make_network(size, 0.5, seed)
+    network.shortest_distance(network.start, network.end)
+
+    def run():
+        random.seed(seed)
+        generation = Generation(network)
+        with open(os.devnull, "w") as devnull:
+            if level > EventLevel.OFF:
+                PrintSink(level, devnull).attach(generation)
+            for gen in range(generations):
+                generation.evolve(gen + 1)
+    return run, generations, "поколение"
+
+
+def case_queries(size, density, seed, count, workers):
+    """Пакет запросов маршрута на одной сети: скорость в запросах в секунду."""
+    network = make_network(size, density, seed)
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        start = rng.randrange(size - 2)
+        queries.append((start, rng.randrange(start + 2, size)))
+
+    def run():
+        solve_queries(network, queries, workers=workers, max_generations=50, seed=seed)
+    return run, count, "запрос"
+
+
+def time_to_optimum(size, density, seed, population, max_generations, **generation_kwargs):
+    """Время и число поколений до достижения optimal_fitness (или до лимита поколений)."""
+    network = make_network(size, density, seed)
+    network.shortest_distance(network.start, network.end)
+    random.seed(seed)
+    started = time.perf_counter()
+    generation = Generation(network, max_population=population, **generation_kwargs)
+    result = RunController(generation, [OptimumReached()], max_generations=max_generations).run()
+    return time.perf_counter() - started, result["generations"], result["criterion"] == "OptimumReached"
+
+
+def allocation_peak(size, density, seed, population, generations, **generation_kwargs):
+    """Наибольший объём памяти (байт), выделенный за одно поколение после первого, по tracemalloc."""
+    network = make_network(size, density, seed)
+    network.shortest_distance(network.start, network.end)
+    random.seed(seed)
+    generation = Generation(network, max_population=population, **generation_kwargs)
+    generation.evolve(1)  # Лениво создаваемые массивы сети и буферы
+    tracemalloc.start()
+    try:
+        peak = 0
+        for gen in range(2, generations + 2):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            generation.evolve(gen)
+            generation.get_best_chromosome()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def build_cases(quick, seed):
+    """Словарь имя -> фабрика замера. Фабрики вызываются лениво, чтобы --only не строил лишние сети."""
+    take = (lambda shapes: shapes[:1]) if quick else (lambda shapes: shapes)
+    scale = 10 if quick else 1
+    cases = {}
+    for size, density in take(NETWORK_SHAPES):
+        cases[f"network_dense_{size}_{density}"] = lambda s=size, d=density: case_network(s, d, seed, "dense")
+    for size, density in take(SPARSE_SHAPES):
+        cases[f"network_sparse_{size}_{density}"] = lambda s=size, d=density: case_network(s, d, seed, "sparse")
+        cases[f"load_sparse_{size}_{density}"] = lambda s=size, d=density: case_load(s, d, seed)
+    for size, density in take(FLOYD_SHAPES):
+        cases[f"floyd_{size}_{density}"] = lambda s=size, d=density: case_floyd(s, d, seed)
+        cases[f"dijkstra_{size}_{density}"] = lambda s=size, d=density: case_dijkstra(s, d, seed)
+    for batch in (False, True):
+        name = "fitness_batch" if batch else "fitness_object"
+        cases[f"{name}_300_1.0"] = lambda b=batch: case_fitness(300, 1.0, seed, 20000 // scale, b)
+        cases[f"{name}_300_0.1"] = lambda b=batch: case_fitness(300, 0.1, seed, 20000 // scale, b)
+    cases["mutation_300_0.5"] = lambda: case_mutation(300, 0.5, seed, 20000 // scale)
+    cases["crossover_300_0.5"] = lambda: case_crossover(300, 0.5, seed, 10000 // scale)
+    for size, density in take(SPARSE_SHAPES):
+        cases[f"startup_sparse_{size}_{density}"] = lambda s=size, d=density: case_startup(s, d, seed, "sparse")
+    for size, density, population in take(EVOLVE_SHAPES):
+        cases[f"evolve_{size}_{density}_{population}"] = \
+            lambda s=size, d=density, p=population: case_evolve(s, d, seed, p, 200 // scale)
+        cases[f"evolve_batch_operators_{size}_{density}_{population}"] = \
+            lambda s=size, d=density, p=population: case_evolve(s, d, seed, p, 200 // scale, batch_operators=True)
+        cases[f"evolve_buffered_{size}_{density}_{population}"] = \
+            lambda s=size, d=density, p=population: case_evolve(s, d, seed, p, 200 // scale, buffered=True)
+    for size, density, population in take(EVOLVE_SHAPES):
+        cases[f"novel_evaluations_{size}_{density}_{population}"] = \
+            lambda s=size, d=density, p=population: case_novel_evaluations(s, d, seed, p, 200 // scale)
+    for level in (EventLevel.OFF, EventLevel.SUMMARY, EventLevel.OPERATIONS):
+        cases[f"evolve_output_{level.name.lower()}_60"] = lambda l=level: case_evolve_output(60, seed, 200 // scale, l)
+    for workers in (1, 4):
+        cases[f"queries_100_0.3_w{workers}"] = lambda w=workers: case_queries(100, 0.3, seed, 200 // scale, w)
+    return cases
+
+
+def measure(factory, repeat):
+    """
+    Медианное время repeat запусков замера. Фабрика возвращает (run, операций, единица)
+    и, если замеру нужны временные файлы, функцию их удаления четвёртым элементом.
+    """
+    run, operations, unit, *cleanup = factory()
+    timings = []
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+    finally:
+        for remove in cleanup:
+            remove()
+    seconds = statistics.median(timings)
+    return {"seconds": seconds, "operations": operations, "unit": unit,
+            "rate": operations / seconds if seconds > 0 else float("inf")}
+
+
+def run_suite(quick=False, seed=0, repeat=3, only=None):
+    results = {}
+    for name, factory in build_cases(quick, seed).items():
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = measure(factory, repeat)
+        print(f"{name:<36} {results[name]['rate']:14.1f} {results[name]['unit']}/с", file=sys.stderr)
+
+    optimum_shapes = [(40, 0.3, 100)] if quick else [(40, 0.3, 100), (150, 0.3, 100), (300, 0.03, 100), (500, 0.02, 100)]
+    optimum_cases = []
+    for size, density, population in optimum_shapes:
+        optimum_cases.append((f"time_to_optimum_{size}_{density}_{population}", size, density, population, {}))
+        # Те же сети с операторами, учитывающими рёбра (см. algorithm.neighbors)
+        optimum_cases.append((f"time_to_optimum_adjacent_{size}_{density}_{population}", size, density, population,
+                              {"initialization": "walk", "mutation": "adjacent", "repair": True}))
+    for name, size, density, population, generation_kwargs in optimum_cases:
+        if only and not any(part in name for part in only):
+            continue
+        seconds, generations, reached = time_to_optimum(size, density, seed, population, 2000, **generation_kwargs)
+        results[name] = {"seconds": seconds, "operations": generations, "unit": "поколение",
+                         "rate": generations / seconds if seconds > 0 else float("inf"), "reached": reached}
+        print(f"{name:<36} {seconds:14.3f} с, поколений: {generations}, оптимум: {reached}", file=sys.stderr)
+
+    allocations = {}
+    for size, density, population in (EVOLVE_SHAPES[:1] if quick else EVOLVE_SHAPES):
+        for mode, generation_kwargs in ALLOCATION_MODES.items():
+            name = f"allocations_{mode}_{size}_{density}_{population}"
+            if only and not any(part in name for part in only):
+                continue
+            allocations[name] = allocation_peak(size, density, seed, population, 20, **generation_kwargs)
+            print(f"{name:<36} {allocations[name]:14d} байт/поколение", file=sys.stderr)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": seed,
+            "repeat": repeat,
+            "quick": quick,
+        },
+        "results": results,
+        "allocations": allocations,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Сравнивает замеры по времени. Возвращает список регрессий (имя, было, стало, отношение).
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or base["seconds"] <= 0:
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        marker = "  РЕГРЕССИЯ" if ratio > 1 + threshold else ""
+        print(f"{name:<36} {base['seconds']:10.4f} -> {result['seconds']:10.4f} с  x{ratio:5.2f}{marker}")
+        if marker:
+            regressions.append((name, base["seconds"], result["seconds"], ratio))
+    for name, allocated in current.get("allocations", {}).items():
+        base = baseline.get("allocations", {}).get(name)
+        if base is None:
+            continue
+        grown = allocated > base * (1 + threshold) and allocated - base > ALLOCATION_SLACK
+        marker = "  РЕГРЕССИЯ" if grown else ""
+        print(f"{name:<36} {base:10d} -> {allocated:10d} байт{marker}")
+        if grown:
+            regressions.append((name, base, allocated, allocated / base if base else float("inf")))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="куда сохранить замеры (JSON)")
+    parser.add_argument("--compare", help="файл базовых замеров для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление (0.2 = 20%%)")
+    parser.add_argument("--quick", action="store_true", help="уменьшенные размеры для быстрой проверки")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="запускать только замеры, имя которых содержит одну из строк")
+    args = parser.parse_args()
+
+    current = run_suite(args.quick, args.seed, args.repeat, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(current, file, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\nРегрессий: {len(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 # main.py
+from algorithm.controller import OptimumReached, RunController, Stagnation
+from algorithm.events import EventLevel, format_stats
 from algorithm.generation import Generation
+from algorithm.history import HistoryReader, HistoryWriter
 from algorithm.network import Network
 from visualization.visualizer import visualize
 import sys
@@ -13,82 +16,55 @@ def main():
     min_population = 10
     max_population = 100
     max_generations = 200
+    stagnation_window = 50  # Останавливаемся, если лучший фитнес не улучшался столько поколений
     mutation_probability = 0.5
+    fitness_cache_size = 10000  # Сколько путей помнить в кэше фитнеса
+    history_path = "history.bin"  # Файл истории запуска (рядом пишется индекс history.bin.idx)
+    checkpoint_path = "checkpoint.pkl"  # Контрольная точка (продолжение: RunController.resume)
+    checkpoint_every = 25  # Через сколько поколений обновлять контрольную точку
 
     # Создаём сеть
-    network = Network(size=size, start=start, end=end)
+    network = Network(size=size, start=start, end=end, fitness_cache_size=fitness_cache_size)
 
     # Выводим граф (матрицу смежности)
     print("Граф:")
     network.print_graph_with_vertices()
 
-    # Выводим оптимальное решение по Флойду
+    # Выводим оптимальное решение (кратчайший путь)
     network.print_optimal_solution()
 
-    # Создаём начальное поколение
-    generation = Generation(network, k=k, min_population=min_population, max_population=max_population)
+    # Создаём начальное поколение (печатаем только заголовок и итог каждого поколения)
+    generation = Generation(network, k=k, min_population=min_population, max_population=max_population,
+                            verbosity=EventLevel.SUMMARY)
 
-    # Список для хранения данных по поколениям
-    history = []
+    # История пишется потоково на диск, в памяти держится только текущее поколение
+    history_writer = HistoryWriter(history_path).attach(generation)
 
-    # Перехватываем данные о кроссовере и мутациях
-    crossover_data = []
-    mutation_data = []
+    def print_stats(gen):
+        stats = format_stats(generation.get_numeric_stats())
+        print(f"\nСтатистика по поколению {gen}:")
+        print(f"  Лучший фитнес: {stats['best_fitness']}")
+        print(f"  Худший фитнес: {stats['worst_fitness']}")
+        print(f"  Средний фитнес: {stats['average_fitness']}")
 
-    def capture_crossover(parent1, parent2, child1, child2, cross_line):
-        crossover_data.append({
-            "parent1": (parent1.path, parent1.fitness),
-            "parent2": (parent2.path, parent2.fitness),
-            "child1": (child1.path, child1.fitness),
-            "child2": (child2.path, child2.fitness),
-            "cross_line": cross_line
-        })
-
-    def capture_mutation(old_path, old_fitness, new_path, new_fitness):
-        mutation_data.append({
-            "old": (old_path, old_fitness),
-            "new": (new_path, new_fitness)
-        })
-
-    # Сохраняем оригинальный метод evolve
-    original_evolve = generation.evolve
-
-    # Модифицированная эволюция
-    def modified_evolve(gen_num, mut_prob):
-        crossover_data.clear()
-        mutation_data.clear()
-        # Передаём callback'и в оригинальный evolve
-        original_evolve(gen_num, mut_prob, crossover_callback=capture_crossover, mutation_callback=capture_mutation)
-        # Сохраняем статистику
-        stats = generation.get_population_stats()
-        history.append({
-            "gen": gen_num,
-            "stats": stats,
-            "population": [(chrom.path, chrom.fitness) for chrom in generation.population],
-            "crossover": crossover_data.copy(),
-            "mutation": mutation_data.copy()
-        })
-
-    # Переопределяем evolve один раз
-    generation.evolve = modified_evolve
-
-    # Основной цикл генетического алгоритма
-    for gen in range(max_generations):
-        generation.evolve(gen + 1, mutation_probability)
-        print(f"\nСтатистика по поколению {gen + 1}:")
-        print(f"  Лучший фитнес: {history[gen]['stats']['best_fitness']}")
-        print(f"  Худший фитнес: {history[gen]['stats']['worst_fitness']}")
-        print(f"  Средний фитнес: {history[gen]['stats']['average_fitness']}")
+    # Основной цикл генетического алгоритма: до оптимума, застоя или max_generations поколений
+    controller = RunController(generation, [OptimumReached(), Stagnation(stagnation_window)],
+                               max_generations=max_generations, mutation_probability=mutation_probability,
+                               checkpoint_path=checkpoint_path, checkpoint_every=checkpoint_every)
+    result = controller.run(print_stats)
+    history_writer.close()
+    print(f"\nОстановка после {result['generations']} поколений: {result['reason']}")
 
     # Лучшее решение
     best_solution = generation.get_best_chromosome()
     print("\nЛучшее решение:")
-    print(f"Путь: {best_solution.path}")
+    print(f"Путь: {list(best_solution.path)}")
     fitness_str = "-" if best_solution.fitness >= sys.maxsize else f"{best_solution.fitness}"
     print(f"Длина: {fitness_str}")
 
-    # Запускаем визуализацию
-    visualize(network, history)
+    # Запускаем визуализацию по сохранённой истории
+    with HistoryReader(history_path) as history:
+        visualize(network, history)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
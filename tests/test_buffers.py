@@ -0,0 +1,100 @@
+import random
+import sys
+
+import numpy as np
+import pytest
+
+from algorithm.buffers import PopulationBuffers
+from algorithm.chromosome import Chromosome
+from algorithm.generation import Generation
+from algorithm.network import Network
+from algorithm.selection import best_unique
+from algorithm.visited import fingerprints
+from benchmarks.suite import allocation_peak
+
+# Наибольший объём памяти (байт), который буферизованное поколение может выделить по tracemalloc:
+# мелкие объекты Python и numpy, но не массивы размером с популяцию
+GENERATION_ALLOCATION_LIMIT = 8192
+
+
+def make_network(size, density, seed):
+    random.seed(seed)
+    return Network(size, density, start=1, end=size - 2)
+
+
+@pytest.mark.parametrize("size, density, population", [(50, 0.5, 100), (500, 0.05, 1000)])
+def test_buffered_generation_allocations(size, density, population):
+    assert allocation_peak(size, density, 1, population, 10, buffered=True) < GENERATION_ALLOCATION_LIMIT
+
+
+def chromosomes_with_repeats(network, count, seed):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        if paths and rng.random() < 0.3:
+            paths.append(rng.choice(paths))
+        else:
+            middle = rng.sample(range(network.size), rng.randint(1, 6))
+            paths.append([network.start, *middle, network.end])
+    return [Chromosome(path, network) for path in paths]
+
+
+def survivors(network, chromosomes, count):
+    buffers = PopulationBuffers(network, len(chromosomes), 2, 8)
+    buffers.load(chromosomes)
+    buffers.survive(count)
+    return [(list(c.path), c.fitness) for c in buffers.chromosomes()]
+
+
+def test_survive_matches_best_unique():
+    network = make_network(30, 0.5, 2)
+    chromosomes = chromosomes_with_repeats(network, 200, 3)
+    for count in (1, 50, 200):
+        expected = [(list(c.path), c.fitness) for c in best_unique(chromosomes, count)]
+        assert survivors(network, chromosomes, count) == expected
+
+
+def test_survive_with_fitness_beyond_key():
+    # Фитнес больше помещающегося в ключ отбора: отбор без упакованных ключей
+    network = make_network(30, 0.5, 2)
+    chromosomes = chromosomes_with_repeats(network, 100, 4)
+    for chromosome in chromosomes:
+        if chromosome.fitness != sys.maxsize and len(chromosome.path) % 2 == 0:
+            chromosome.fitness += 1 << 60
+    expected = [(list(c.path), c.fitness) for c in best_unique(chromosomes, 40)]
+    assert survivors(network, chromosomes, 40) == expected
+
+
+@pytest.mark.parametrize("option, text", [({"mutation": "adjacent"}, "mutation='adjacent'"),
+                                          ({"selection": "tournament"}, "selection='tournament'"),
+                                          ({"repair": True}, "repair=True"),
+                                          ({"visited_capacity": 100}, "visited_capacity=100")])
+def test_buffered_rejects_unsupported_options(option, text):
+    network = make_network(30, 0.5, 2)
+    with pytest.raises(ValueError, match=text):
+        Generation(network, buffered=True, **option)
+
+
+def test_buffered_population_is_built_once_per_step():
+    network = make_network(50, 0.5, 1)
+    random.seed(0)
+    generation = Generation(network, buffered=True)
+    generation.evolve(1)
+    stats = generation.get_population_stats()
+    generation.get_numeric_stats()
+    generation.get_best_chromosome()
+    assert generation._population is None  # Статистика и лучшая хромосома берутся из буфера
+    population = generation.population
+    assert generation.population is population
+    assert stats["best_fitness"] == str(min(c.fitness for c in population))
+    generation.evolve(2)
+    assert generation.population is not population
+
+
+def test_hashes_are_visited_fingerprints():
+    network = make_network(30, 0.5, 2)
+    chromosomes = chromosomes_with_repeats(network, 50, 5)
+    buffers = PopulationBuffers(network, len(chromosomes), 2, 8)
+    buffers.load(chromosomes)
+    expected = fingerprints([c.path for c in chromosomes]).view(np.int64)
+    assert np.array_equal(buffers.pool[3][:buffers.count], expected)
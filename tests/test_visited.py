@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from algorithm.generation import Generation
+from algorithm.network import Network
+
+
+def make_generation(**kwargs):
+    random.seed(4)
+    network = Network(40, 0.3, start=1, end=38)
+    random.seed(5)
+    return Generation(network, max_population=60, visited_capacity=10000, **kwargs)
+
+
+@pytest.mark.parametrize("mutation_probability", [0.0, 0.05, 0.5])
+def test_unchanged_novel_offspring_are_kept(mutation_probability):
+    generation = make_generation()
+    known = {bytes(c.path) for c in generation.population}
+    children = []
+    generation.evolve(1, mutation_probability,
+                      crossover_callback=lambda p1, p2, c1, c2, line: children.extend([bytes(c1.path), bytes(c2.path)]))
+    novelty = generation.get_novelty()
+    assert novelty["novel_rate"] == 1.0
+    assert novelty["evaluated"] + novelty["rejected"] == len(children)
+    if mutation_probability == 0.0:
+        # Без мутации отбрасываются ровно потомки с путями, известными до поколения
+        assert novelty["rejected"] == sum(path in known for path in children)
+
+
+def test_offspring_are_scored_once_without_listeners():
+    generation = make_generation()
+    evaluations = generation.evaluations
+    generation.evolve(1, 0.5)
+    # Потомки до мутации не оцениваются: каждая оценка - итоговый, новый путь
+    assert generation.evaluations - evaluations == generation.get_novelty()["evaluated"]
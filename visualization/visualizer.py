@@ -1,102 +1,254 @@
+import base64
+import hashlib
+import io
+import os
 import sys
-import matplotlib.pyplot as plt
+from collections import deque
+
 import networkx as nx
-import tkinter as tk
-from tkinter import ttk
-
-
-def plot_fitness(history):
-    """Отрисовка графика фитнеса по поколениям."""
-    best_fitness = [float(h["stats"]["best_fitness"]) if h["stats"]["best_fitness"] != "-" else float("inf") for h in
-                    history]
-    worst_fitness = [float(h["stats"]["worst_fitness"]) if h["stats"]["worst_fitness"] != "-" else float("inf") for h in
-                     history]
-    avg_fitness = [float(h["stats"]["average_fitness"]) if h["stats"]["average_fitness"] != "-" else float("inf") for h
-                   in history]
-
-    plt.figure(figsize=(12, 8))
-    plt.subplot(2, 1, 1)
-    plt.plot(range(1, len(history) + 1), best_fitness, label="Лучший фитнес", color="green")
-    plt.plot(range(1, len(history) + 1), avg_fitness, label="Средний фитнес", color="blue")
-    plt.plot(range(1, len(history) + 1), worst_fitness, label="Худший фитнес", color="red")
-    plt.xlabel("Поколение")
-    plt.ylabel("Фитнес")
-    plt.legend()
-    plt.title("Статистика фитнеса по поколениям")
-
-
-def draw_network(network):
-    """Отрисовка графа сети."""
-    plt.subplot(2, 1, 2)
-    G = nx.DiGraph()
-    for i in range(network.size):
-        for j in range(network.size):
-            weight = network.get_weight(i, j)
-            if weight is not None and weight != 0:
-                G.add_edge(i, j, weight=weight)
-
-    pos = nx.spring_layout(G)
-    nx.draw(G, pos, with_labels=True, node_color="lightblue", node_size=500, font_size=10, arrows=True)
-    edge_labels = nx.get_edge_attributes(G, "weight")
-    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels)
-    plt.title("Граф сети")
-
-
-def visualize(network, history):
-    """Основная функция визуализации с интерфейсом."""
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from algorithm.events import format_fitness, format_stats
+from algorithm.history import fitness_series, numeric_stats
+from algorithm.storage import graph_digest
+
+# Графы больше этого числа вершин рисуются окрестностью лучшего пути
+MAX_DRAWN_NODES = 300
+# Подписи весов рёбер рисуются, только если рёбер не больше этого
+MAX_LABELED_EDGES = 200
+# Каталог кэша раскладок графа (файл на граф и набор вершин)
+LAYOUT_CACHE_DIR = ".layout_cache"
+
+
+def plot_fitness(ax, history):
+    """Отрисовка графика фитнеса по поколениям (числовые ряды, inf - нет пути)."""
+    series = fitness_series(history)
+    generations = np.arange(1, len(series["best_fitness"]) + 1)
+    ax.plot(generations, series["best_fitness"], label="Лучший фитнес", color="green")
+    ax.plot(generations, series["average_fitness"], label="Средний фитнес", color="blue")
+    ax.plot(generations, series["worst_fitness"], label="Худший фитнес", color="red")
+    ax.set_xlabel("Поколение")
+    ax.set_ylabel("Фитнес")
+    ax.legend()
+    ax.set_title("Статистика фитнеса по поколениям")
+
+
+def best_path(history):
+    """Лучший путь последнего поколения истории (None, если история пуста)."""
+    if len(history) == 0:
+        return None
+    population = history[len(history) - 1]["population"]
+    path, _ = min(population, key=lambda item: item[1])
+    return list(path)
+
+
+def select_nodes(network, path, hops=1, max_nodes=MAX_DRAWN_NODES):
+    """
+    Вершины для отрисовки: все, если граф небольшой, иначе окрестность пути радиусом hops рёбер
+    (обход в ширину от вершин пути, не больше max_nodes вершин).
+    :return: отсортированный список вершин или None - рисовать весь граф
+    """
+    if network.size <= max_nodes:
+        return None
+    neighbors = network.neighbor_index()
+    seeds = list(dict.fromkeys(path or [network.start, network.end]))[:max_nodes]
+    selected = set(seeds)
+    queue = deque((v, 0) for v in seeds)
+    while queue and len(selected) < max_nodes:
+        v, depth = queue.popleft()
+        if depth >= hops:
+            continue
+        for u in neighbors.neighbors(v).tolist():
+            if u not in selected:
+                selected.add(u)
+                queue.append((u, depth + 1))
+                if len(selected) >= max_nodes:
+                    break
+    return sorted(selected)
+
+
+def build_graph(network, nodes=None):
+    """Граф networkx из списка рёбер сети (только рёбра между nodes, если они заданы)."""
+    rows, cols, weights = network.edges()
+    graph = nx.Graph()
+    if nodes is None:
+        graph.add_nodes_from(range(network.size))
+    else:
+        graph.add_nodes_from(nodes)
+        keep = np.isin(rows, nodes) & np.isin(cols, nodes)
+        rows, cols, weights = rows[keep], cols[keep], weights[keep]
+    graph.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), weights.tolist()))
+    return graph
+
+
+def layout(network, graph, cache_dir=LAYOUT_CACHE_DIR):
+    """
+    Раскладка вершин (spring_layout) с кэшем на диске: ключ - хеш графа сети и набор вершин,
+    поэтому повторная отрисовка той же сети не пересчитывает раскладку.
+    :param cache_dir: каталог кэша (None - без кэша)
+    """
+    nodes = np.array(sorted(graph.nodes), dtype=np.int64)
+    path = None
+    if cache_dir is not None:
+        key = hashlib.blake2b(nodes.tobytes(), digest_size=8).hexdigest()
+        path = os.path.join(cache_dir, f"layout-{graph_digest(network)}-{key}.npz")
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                if np.array_equal(cached["nodes"], nodes):
+                    return dict(zip(nodes.tolist(), cached["positions"]))
+
+    positions = nx.spring_layout(graph, seed=0)
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, nodes=nodes, positions=np.array([positions[v] for v in nodes.tolist()]))
+    return positions
+
+
+def draw_network(ax, network, path=None, hops=1, max_nodes=MAX_DRAWN_NODES, cache_dir=LAYOUT_CACHE_DIR):
+    """
+    Отрисовка графа сети с выделенным путём path. Большой граф рисуется окрестностью пути
+    (см. select_nodes).
+    """
+    nodes = select_nodes(network, path, hops, max_nodes)
+    graph = build_graph(network, nodes)
+    positions = layout(network, graph, cache_dir)
+    small = graph.number_of_nodes() <= 100
+    nx.draw(graph, positions, ax=ax, with_labels=small, node_color="lightblue", node_size=500 if small else 30,
+            font_size=10, width=1.0 if small else 0.3)
+    if path:
+        path_edges = [edge for edge in zip(path, path[1:]) if graph.has_edge(*edge)]
+        nx.draw_networkx_edges(graph, positions, edgelist=path_edges, ax=ax, edge_color="red", width=2.5)
+    if graph.number_of_edges() <= MAX_LABELED_EDGES:
+        edge_labels = nx.get_edge_attributes(graph, "weight")
+        nx.draw_networkx_edge_labels(graph, positions, edge_labels=edge_labels, ax=ax)
+    title = "Граф сети" if nodes is None else f"Граф сети: окрестность лучшего пути ({len(nodes)} из {network.size} вершин)"
+    ax.set_title(title)
+
+
+def render_overview(network, history, hops=1, max_nodes=MAX_DRAWN_NODES, cache_dir=LAYOUT_CACHE_DIR):
+    """Рисунок с графиком фитнеса и графом сети (без pyplot и без дисплея)."""
+    figure = Figure(figsize=(12, 8))
+    FigureCanvasAgg(figure)
+    plot_fitness(figure.add_subplot(2, 1, 1), history)
+    draw_network(figure.add_subplot(2, 1, 2), network, best_path(history), hops, max_nodes, cache_dir)
+    figure.tight_layout()
+    return figure
+
+
+def write_stats_csv(history, path):
+    """Числовая статистика по поколениям в CSV (inf - нет пути)."""
+    series = fitness_series(history)
+    table = np.column_stack([np.arange(1, len(series["best_fitness"]) + 1), series["best_fitness"],
+                             series["worst_fitness"], series["average_fitness"]])
+    np.savetxt(path, table, delimiter=",", fmt=["%d", "%.17g", "%.17g", "%.17g"],
+               header="generation,best_fitness,worst_fitness,average_fitness", comments="")
+
+
+def save_overview(network, history, output_dir=".", **render_kwargs):
+    """
+    Безоконная отрисовка: overview.png и stats.csv в каталоге output_dir.
+    :return: список путей к записанным файлам
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    image_path = os.path.join(output_dir, "overview.png")
+    stats_path = os.path.join(output_dir, "stats.csv")
+    render_overview(network, history, **render_kwargs).savefig(image_path)
+    write_stats_csv(history, stats_path)
+    return [image_path, stats_path]
+
+
+def generation_text(history, gen):
+    """Текст о поколении gen (с нуля) для окна просмотра; поколение декодируется только здесь."""
+    h = history[gen]
+    # Статистика хранится числами (индекс истории) и форматируется только здесь
+    stats = h.get("stats") or numeric_stats([fitness for _, fitness in h["population"]])
+    text = format_stats(stats)
+    lines = [f"Поколение {gen + 1}:", f"Лучший фитнес: {text['best_fitness']}, "
+             f"худший: {text['worst_fitness']}, средний: {text['average_fitness']}", "", "Кроссовер:"]
+    for c in h["crossover"]:
+        lines.append(f"Родитель 1: {c['parent1'][0]}, фитнес: {format_fitness(c['parent1'][1])}")
+        lines.append(f"Родитель 2: {c['parent2'][0]}, фитнес: {format_fitness(c['parent2'][1])}")
+        lines.append(f"Линия кроссовера: {c['cross_line']}")
+        lines.append(f"Потомок 1: {c['child1'][0]}, фитнес: {format_fitness(c['child1'][1])}")
+        lines.append(f"Потомок 2: {c['child2'][0]}, фитнес: {format_fitness(c['child2'][1])}")
+        lines.append("")
+
+    lines.append("Мутации:")
+    for m in h["mutation"]:
+        lines.append(f"Было: {m['old'][0]}, фитнес: {format_fitness(m['old'][1])}")
+        lines.append(f"Стало: {m['new'][0]}, фитнес: {format_fitness(m['new'][1])}")
+        lines.append("")
+
+    lines.append("Финальная популяция:")
+    for i, (path, fitness) in enumerate(h["population"]):
+        lines.append(f"Хромосома {i + 1}: {path}, фитнес: {format_fitness(fitness)}")
+    return "\n".join(lines) + "\n"
+
+
+def has_display():
+    """Можно ли открыть окно Tk."""
+    if sys.platform.startswith("win") or sys.platform == "darwin":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def visualize(network, history, headless=None, output_dir=".", **render_kwargs):
+    """
+    Основная функция визуализации с интерфейсом.
+    :param headless: True - только записать файлы (см. save_overview), False - окно Tk,
+                     None - окно, если есть дисплей
+    :param output_dir: каталог для файлов безоконного режима
+    :return: список записанных файлов в безоконном режиме, иначе None
+    """
+    if headless is None:
+        headless = not has_display()
+    if headless:
+        return save_overview(network, history, output_dir, **render_kwargs)
+
+    import tkinter as tk
+
     root = tk.Tk()
     root.title("Визуализация генетического алгоритма")
 
-    # Функция для форматирования фитнеса
-    def format_fitness(fitness):
-        return "-" if fitness >= sys.maxsize else f"{fitness}"
-
-    # Отрисовка графиков
-    plot_fitness(history)
-    draw_network(network)
-    plt.tight_layout()
-    plt.savefig("overview.png")
-    plt.close()
-
-    # Отображение графиков в Tkinter
-    overview_img = tk.PhotoImage(file="overview.png")
+    # Рисунок передаётся в Tk из памяти, без временного файла
+    buffer = io.BytesIO()
+    render_overview(network, history, **render_kwargs).savefig(buffer, format="png")
+    overview_img = tk.PhotoImage(data=base64.b64encode(buffer.getvalue()))
     overview_label = tk.Label(root, image=overview_img)
     overview_label.pack()
 
-    # Выбор поколения
+    # Выбор поколения: счётчик вместо списка, чтобы не строить список из миллионов номеров
     tk.Label(root, text="Выберите поколение:").pack()
     gen_var = tk.IntVar(value=1)
-    gen_selector = ttk.Combobox(root, textvariable=gen_var, values=list(range(1, len(history) + 1)))
+    gen_selector = tk.Spinbox(root, textvariable=gen_var, from_=1, to=max(len(history), 1))
     gen_selector.pack()
 
     # Текстовое поле для информации
     info_text = tk.Text(root, height=20, width=80)
     info_text.pack()
 
-    def update_info(*args):
-        gen = gen_var.get() - 1
+    pending = []
+
+    def show_generation():
+        pending.clear()
+        try:
+            gen = gen_var.get() - 1
+        except tk.TclError:
+            return  # В поле ещё не число
+        if not 0 <= gen < len(history):
+            return
         info_text.delete(1.0, tk.END)
-        h = history[gen]
-
-        info_text.insert(tk.END, f"Поколение {gen + 1}:\n\n")
-        info_text.insert(tk.END, "Кроссовер:\n")
-        for c in h["crossover"]:
-            info_text.insert(tk.END, f"Родитель 1: {c['parent1'][0]}, фитнес: {format_fitness(c['parent1'][1])}\n")
-            info_text.insert(tk.END, f"Родитель 2: {c['parent2'][0]}, фитнес: {format_fitness(c['parent2'][1])}\n")
-            info_text.insert(tk.END, f"Линия кроссовера: {c['cross_line']}\n")
-            info_text.insert(tk.END, f"Потомок 1: {c['child1'][0]}, фитнес: {format_fitness(c['child1'][1])}\n")
-            info_text.insert(tk.END, f"Потомок 2: {c['child2'][0]}, фитнес: {format_fitness(c['child2'][1])}\n\n")
-
-        info_text.insert(tk.END, "Мутации:\n")
-        for m in h["mutation"]:
-            info_text.insert(tk.END, f"Было: {m['old'][0]}, фитнес: {format_fitness(m['old'][1])}\n")
-            info_text.insert(tk.END, f"Стало: {m['new'][0]}, фитнес: {format_fitness(m['new'][1])}\n\n")
-
-        info_text.insert(tk.END, "Финальная популяция:\n")
-        for i, (path, fitness) in enumerate(h["population"]):
-            info_text.insert(tk.END, f"Хромосома {i + 1}: {path}, фитнес: {format_fitness(fitness)}\n")
-
-    gen_var.trace("w", update_info)
-    update_info()  # Начальный вызов
-
-    root.mainloop()
\ No newline at end of file
+        info_text.insert(tk.END, generation_text(history, gen))
+
+    def update_info(*args):
+        # Поколение декодируется, когда выбор перестал меняться, а не на каждое нажатие
+        if pending:
+            root.after_cancel(pending.pop())
+        pending.append(root.after(100, show_generation))
+
+    gen_var.trace_add("write", update_info)
+    show_generation()  # Начальный вызов
+
+    root.mainloop()